@@ -0,0 +1,92 @@
+import math
+
+
+class DeviceAggregate:
+    """
+    Running RSSI statistics for one device within one reporting window.
+    `latest` is the most recent sample object (e.g. an Advertisement).
+    """
+
+    __slots__ = ("address", "count", "rssi_count", "rssi_min", "rssi_max", "rssi_sum", "rssi_sum_sq",
+                 "rssi_last", "first_seen", "last_seen", "latest")
+
+    def __init__(self, address, timestamp, latest):
+        self.address = address
+        self.count = 0
+        self.rssi_count = 0
+        self.rssi_min = None
+        self.rssi_max = None
+        self.rssi_sum = 0.0
+        self.rssi_sum_sq = 0.0
+        self.rssi_last = None
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.latest = latest
+
+    @property
+    def rssi_mean(self):
+        return self.rssi_sum / self.rssi_count if self.rssi_count else None
+
+    @property
+    def rssi_variance(self):
+        if self.rssi_count < 2:
+            return 0.0
+        mean = self.rssi_sum / self.rssi_count
+        return max(0.0, self.rssi_sum_sq / self.rssi_count - mean * mean)
+
+    @property
+    def rssi_stddev(self):
+        return math.sqrt(self.rssi_variance)
+
+
+class WindowAggregator:
+    """
+    Incremental per-address aggregation of advertisements.
+
+    Each sample updates its device's DeviceAggregate in O(1) (count,
+    min/max/sum/sum of squares/last RSSI, first/last seen), so memory is
+    bounded by the number of devices active in the window rather than by the
+    number of advertisements. drain() hands out the window and starts a new one.
+    """
+
+    def __init__(self):
+        self.devices = {}
+        self.samples = 0
+
+    def __len__(self):
+        return len(self.devices)
+
+    def add(self, address, rssi, timestamp, latest=None):
+        aggregate = self.devices.get(address)
+        if aggregate is None:
+            aggregate = self.devices[address] = DeviceAggregate(address, timestamp, latest)
+        else:
+            if timestamp < aggregate.first_seen:
+                aggregate.first_seen = timestamp
+            if timestamp >= aggregate.last_seen:
+                aggregate.last_seen = timestamp
+                aggregate.latest = latest
+        aggregate.count += 1
+        self.samples += 1
+        if isinstance(rssi, (int, float)):
+            aggregate.rssi_count += 1
+            aggregate.rssi_sum += rssi
+            aggregate.rssi_sum_sq += rssi * rssi
+            aggregate.rssi_last = rssi
+            if aggregate.rssi_min is None or rssi < aggregate.rssi_min:
+                aggregate.rssi_min = rssi
+            if aggregate.rssi_max is None or rssi > aggregate.rssi_max:
+                aggregate.rssi_max = rssi
+        return aggregate
+
+    def add_advertisement(self, advertisement):
+        return self.add(advertisement.address, advertisement.rssi, advertisement.timestamp, advertisement)
+
+    def drain(self):
+        """
+        Return the current window's aggregates and start a new window.
+        """
+        aggregates = list(self.devices.values())
+        self.devices = {}
+        self.samples = 0
+        return aggregates
@@ -0,0 +1,197 @@
+import argparse
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from contextlib import contextmanager
+
+import ble
+from capture import ReplayScanner, churn_scenario, read_capture, synthetic_advertisements
+from scheduler import AdaptiveScheduler
+from uploader import Uploader
+from serialization import encode_payload
+
+CROWDS = (100, 1000, 10000)
+
+# Entry points whose cold start --startup measures, and modules none of them
+# may import up front (they are loaded only on the paths that use them)
+STARTUP_MODULES = ("cli", "ble", "find_near_airtags", "proximity", "ring", "history")
+HEAVY_MODULES = ("numpy", "requests", "bleak", "cryptography", "nest_asyncio", "filterpy",
+                 "m1", "m2", "m3", "m4", "m5", "m6", "m7", "m8")
+STARTUP_BUDGET_MS = 150.0
+
+
+@contextmanager
+def offline_metadata():
+    """
+    Keep a benchmark away from iwconfig: the Wi-Fi fields stay unknown.
+    """
+    import host_metadata
+
+    get_wifi_info = host_metadata.get_wifi_info
+    host_metadata.get_wifi_info = lambda: dict(host_metadata.NO_WIFI_INFO)
+    try:
+        yield
+    finally:
+        host_metadata.get_wifi_info = get_wifi_info
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else 0.0
+
+
+async def run_pipeline(advertisements, max_batch_size):
+    """
+    Replay advertisements at max speed through the ble.py pipeline (device
+    list, payload, serialization). Returns (advertisement count, per-cycle
+    latencies in seconds, elapsed seconds).
+    """
+    scanner = ReplayScanner(advertisements, speed=None, flush_interval=0.05, max_batch_size=max_batch_size)
+    latencies = []
+    count = 0
+    started = time.perf_counter()
+    async with scanner:
+        async for batch in scanner.batches():
+            if not batch:
+                continue
+            cycle_started = time.perf_counter()
+            payload = ble.build_payload(ble.build_device_list(batch))
+            encode_payload(payload)
+            latencies.append(time.perf_counter() - cycle_started)
+            count += len(batch)
+    return count, latencies, time.perf_counter() - started
+
+
+class MeasuringUploader(Uploader):
+    """
+    Uploader stand-in that counts payloads and records when each device was
+    first reported, relative to the replay clock.
+    """
+
+    def __init__(self, scanner, first_seen):
+        super().__init__("http://127.0.0.1:9/unused")
+        self.scanner = scanner
+        self.first_seen = first_seen
+        self.flush_times = []
+        self.latencies = {}
+
+    def submit(self, payload):
+        loop = asyncio.get_running_loop()
+        now = loop.time() - self.scanner.replay_started
+        self.flush_times.append(now)
+        for record in payload["devices"]:
+            if record.address not in self.latencies:
+                self.latencies[record.address] = now - (self.first_seen[record.address] - self.scanner.first_timestamp)
+
+    async def run(self):
+        pass
+
+
+async def run_churn(advertisements, scheduler):
+    first_seen = {}
+    for advertisement in advertisements:
+        first_seen.setdefault(advertisement.address, advertisement.timestamp)
+    scanner = ReplayScanner(advertisements, speed=1.0, flush_interval=ble.FLUSH_INTERVAL)
+    uploader = MeasuringUploader(scanner, first_seen)
+    # The pipeline's metadata task would run iwconfig
+    with offline_metadata():
+        await ble.stream_and_list_devices(uploader, scanner=scanner, scheduler=scheduler, capture_path=None)
+    latencies = list(uploader.latencies.values())
+    radio_on = 1.0 - scanner.missed / len(advertisements)
+    return uploader.flush_times, radio_on, latencies
+
+
+def churn_demo():
+    """
+    Replay a quiet/burst/quiet scenario in real time with the fixed flush
+    interval and with the adaptive scheduler, and compare work and
+    detection latency.
+    """
+    quiet = 60.0
+    advertisements = list(churn_scenario(quiet=quiet))
+    for label, scheduler in (("fixed", None), ("adaptive", AdaptiveScheduler())):
+        flush_times, radio_on, latencies = asyncio.run(run_churn(advertisements, scheduler))
+        quiet_flushes = sum(1 for t in flush_times if t < quiet)
+        print(f"{label:>14}: {quiet_flushes} flushes while quiet, {len(flush_times) - quiet_flushes} during/after "
+              f"the burst, radio on {radio_on * 100:.0f}%, detection latency "
+              f"mean {sum(latencies) / len(latencies):.2f} s, max {max(latencies):.2f} s")
+
+
+def report(label, count, latencies, elapsed):
+    max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{label:>14}: {count / elapsed:10.0f} adv/s, cycle p50 {percentile(latencies, 0.5) * 1000:7.2f} ms, "
+          f"p95 {percentile(latencies, 0.95) * 1000:7.2f} ms, {len(latencies)} cycles, max RSS {max_rss_mb:.1f} MB")
+
+
+def time_startup(code, runs):
+    """
+    Run `python -c code` in a fresh interpreter `runs` times. Returns the
+    median wall time in seconds and the output of the last run.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    times = []
+    output = ""
+    for _ in range(runs):
+        started = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", code], cwd=here, capture_output=True, text=True,
+                                check=True).stdout
+        times.append(time.perf_counter() - started)
+    return percentile(times, 0.5), output.strip()
+
+
+def startup_check(runs=5, budget_ms=STARTUP_BUDGET_MS):
+    """
+    Measure the import time of each entry point over a bare interpreter and
+    check that none of them imports a heavy module up front. Returns False
+    on a regression.
+    """
+    baseline, _ = time_startup("pass", runs)
+    print(f"{'interpreter':>18}: {baseline * 1000:6.1f} ms")
+    ok = True
+    for module in STARTUP_MODULES:
+        elapsed, output = time_startup(
+            f"import sys, {module}; print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))", runs)
+        overhead_ms = (elapsed - baseline) * 1000
+        problems = []
+        if overhead_ms > budget_ms:
+            problems.append(f"over the {budget_ms:.0f} ms budget (see python -X importtime -c 'import {module}')")
+        if output:
+            problems.append(f"imports {output.replace(' ', ', ')}")
+        ok = ok and not problems
+        print(f"{module:>18}: +{overhead_ms:5.1f} ms" + (f"  FAIL: {'; '.join(problems)}" if problems else ""))
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the BLE scan pipeline")
+    parser.add_argument("--capture", help="replay this capture file instead of synthetic crowds")
+    parser.add_argument("--crowds", type=int, nargs="+", default=list(CROWDS), help="synthetic crowd sizes")
+    parser.add_argument("--advertisements-per-device", type=int, default=20)
+    parser.add_argument("--max-batch-size", type=int, default=ble.MAX_BATCH_SIZE)
+    parser.add_argument("--churn", action="store_true",
+                        help="compare fixed vs adaptive scheduling on a replayed quiet/burst scenario (~3 min)")
+    parser.add_argument("--startup", action="store_true",
+                        help="check entry point import times and lazy imports; exits 1 on a regression")
+    parser.add_argument("--startup-budget", type=float, default=STARTUP_BUDGET_MS,
+                        help="allowed import time per entry point over a bare interpreter, in ms")
+    args = parser.parse_args()
+
+    if args.startup:
+        sys.exit(0 if startup_check(budget_ms=args.startup_budget) else 1)
+    if args.churn:
+        churn_demo()
+        return
+    if args.capture:
+        report("capture", *asyncio.run(run_pipeline(read_capture(args.capture), args.max_batch_size)))
+        return
+    for crowd in args.crowds:
+        advertisements = list(synthetic_advertisements(crowd, crowd * args.advertisements_per_device))
+        report(f"{crowd} devices", *asyncio.run(run_pipeline(advertisements, args.max_batch_size)))
+
+
+if __name__ == "__main__":
+    main()
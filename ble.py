@@ -1,68 +1,119 @@
-import requests
 import asyncio
 import json
-import subprocess
-import hashlib
-from bleak import BleakScanner
 from datetime import datetime
-import uuid
-import socket
-from filterpy.kalman import KalmanFilter
-import numpy as np
-
-# Import manufacturer codes from the external files
-from m1 import manufacturer_codes_1
-from m2 import manufacturer_codes_2
-from m3 import manufacturer_codes_3
-from m4 import manufacturer_codes_4
-from m5 import manufacturer_codes_5
-from m6 import manufacturer_codes_6
-from m7 import manufacturer_codes_7
-
-# Merge all manufacturer codes into a single dictionary
-manufacturer_codes = {}
-manufacturer_codes.update(manufacturer_codes_1)
-manufacturer_codes.update(manufacturer_codes_2)
-manufacturer_codes.update(manufacturer_codes_3)
-manufacturer_codes.update(manufacturer_codes_4)
-manufacturer_codes.update(manufacturer_codes_5)
-manufacturer_codes.update(manufacturer_codes_6)
-manufacturer_codes.update(manufacturer_codes_7)
+import os
+
+from manufacturers import registry as manufacturer_codes
+from payloads import beacon_info, decoders as payload_decoders
+from scanner import advertisement_from_bleak
+from device_tracker import DeviceTracker
+from distance import DEFAULT_TX_POWER, ratio_distance
+from delta import DeltaReporter
+from rules import RuleEngine
+from metrics import metrics
+from serialization import DeviceRecord
+from aggregator import WindowAggregator
+from processing import ProcessingStage
+
+# Backends (ring, multi-adapter, spool, history, capture, scheduler), the
+# uploader and the pipeline state below are loaded on first use, so importing
+# ble stays cheap for the CLI and the tools that only need its helpers
+
+# Upload endpoint, overridable for testing against a local stub (see stub_server.py)
+WEBHOOK_URL = os.environ.get("BLE_WEBHOOK_URL", "https://ble-listener-286f94459e57.herokuapp.com/api/devices")
+
+# Unsent batches are spooled here so they survive uplink outages and restarts
+SPOOL_PATH = os.environ.get("BLE_SPOOL_PATH", "ble_spool.db")
+
+# Keep a local, queryable history of every flush here when set (see history.py)
+HISTORY_PATH = os.environ.get("BLE_HISTORY_PATH")
+
+# Streaming scan settings: flush a batch every FLUSH_INTERVAL seconds or once
+# MAX_BATCH_SIZE advertisements are waiting, whichever comes first
+FLUSH_INTERVAL = 5.0
+MAX_BATCH_SIZE = 500
+
+# Prometheus-format metrics: served on BLE_METRICS_PORT and/or written to
+# BLE_METRICS_FILE every flush; disabled when neither is set
+METRICS_PORT = int(os.environ.get("BLE_METRICS_PORT", "0"))
+METRICS_FILE = os.environ.get("BLE_METRICS_FILE")
+
+# Upload device lists as rows (list of objects) or "columns" (parallel arrays)
+PAYLOAD_LAYOUT = os.environ.get("BLE_PAYLOAD_LAYOUT", "rows")
+
+# Opt-in wire format changes, for receivers that support them: send up to
+# BLE_UPLOAD_COALESCE payloads per request as a JSON array, and gzip bodies
+UPLOAD_COALESCE = int(os.environ.get("BLE_UPLOAD_COALESCE", "1"))
+UPLOAD_GZIP = os.environ.get("BLE_UPLOAD_GZIP", "") not in ("", "0")
+
+# Record every advertisement to this capture file (see capture.py) when set
+CAPTURE_PATH = os.environ.get("BLE_CAPTURE_PATH")
+
+# Declarative classification/skip rules
+RULES_PATH = os.environ.get("BLE_RULES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules.json"))
+
+# HCI controllers to scan on, e.g. "hci0,hci1"; empty means the default adapter
+ADAPTERS = [adapter for adapter in os.environ.get("BLE_ADAPTERS", "").split(",") if adapter]
+
+# Consume the advertisement ring published by `python ring.py publish` instead
+# of scanning, so several consumers can share one radio
+RING_PATH = os.environ.get("BLE_RING_PATH")
+
+# Salt for the MAC -> UUID derivation (empty keeps the original UUIDs), and an
+# optional JSON file of identity address -> IRK for resolving rotating addresses
+UUID_SALT = os.environ.get("BLE_UUID_SALT", "").encode()
+IRK_PATH = os.environ.get("BLE_IRK_PATH")
+
+# Where per-batch processing runs: "inline" on the event loop, "thread" in
+# one worker thread, or "process" sharded over BLE_PROCESSING_WORKERS processes
+PROCESSING_MODE = os.environ.get("BLE_PROCESSING_MODE", "inline")
+PROCESSING_WORKERS = int(os.environ.get("BLE_PROCESSING_WORKERS", "2"))
+PROCESSING_MAX_PENDING = int(os.environ.get("BLE_PROCESSING_MAX_PENDING", "4"))
+
+# Let the adaptive scheduler tune flush cadence and scan duty cycle from
+# observed churn instead of using FLUSH_INTERVAL
+ADAPTIVE = os.environ.get("BLE_ADAPTIVE", "") not in ("", "0")
+
+# "full" uploads every device every flush; "delta" only uploads devices that
+# appeared, changed or disappeared, plus a periodic full snapshot
+REPORT_MODE = os.environ.get("BLE_REPORT_MODE", "full")
+
+# Device classification and skip rules, reloaded when the rules file changes
+rule_engine = None
+
+# Function to get the rule engine, loading RULES_PATH on first use
+def get_rule_engine():
+    global rule_engine
+    if rule_engine is None:
+        rule_engine = RuleEngine(RULES_PATH)
+    return rule_engine
 
 # Function to categorize devices based on a pattern in their serial numbers
 def categorize_device(name):
-    if name and name.startswith("HRM"):  # Example pattern for Heart Rate Monitors
-        return "Heart Rate Monitor"
-    elif name and name.startswith("TMP"):  # Example pattern for Thermometers
-        return "Thermometer"
-    elif name and name.startswith("BPM"):  # Example pattern for Blood Pressure Monitors
-        return "Blood Pressure Monitor"
-    elif name and "ENVY" in name:  # Additional pattern for ENVY devices
-        return "ENVY Device"
-    elif name and "Samsung" in name:  # Additional pattern for Samsung devices
-        return "Samsung Device"
-    elif name and "Bose" in name:  # Additional pattern for Bose devices
-        return "Bose Device"
-    else:
-        return "Unknown Device"
+    return get_rule_engine().categorize(name=name)
+
+# Per-device RSSI filters, kept across scans
+device_tracker = None
 
-# Function to estimate distance using Kalman filter
-def estimate_distance_kalman(rssi):
-    kf = KalmanFilter(dim_x=1, dim_z=1)
-    kf.x = np.array([0.0])  # Initial state estimate
-    kf.F = np.array([[1.0]])  # State transition matrix
-    kf.H = np.array([[1.0]])  # Measurement function
-    kf.P *= 1000.0  # Covariance matrix
-    kf.R = 5.0  # Measurement noise
-    kf.Q = 0.1  # Process noise
+# Function to get the per-device RSSI filters, created on first use
+def get_device_tracker():
+    global device_tracker
+    if device_tracker is None:
+        device_tracker = DeviceTracker()
+    return device_tracker
 
-    tx_power = -59  # This is a common value, but it may vary
+# Per-device RSSI statistics for the current batch
+aggregator = None
 
-    # Kalman filter update with the RSSI value
-    kf.predict()
-    kf.update(np.array([rssi]))
-    rssi_estimate = kf.x[0]
+# Function to get the batch aggregator, created on first use
+def get_aggregator():
+    global aggregator
+    if aggregator is None:
+        aggregator = WindowAggregator()
+    return aggregator
 
+# Function to convert a (smoothed) RSSI into a distance estimate
+def distance_from_rssi(rssi_estimate, tx_power=-59):  # -59 is a common value, but it may vary
     if rssi_estimate == 0:
         return -1.0  # if we cannot determine accuracy, return -1.
     ratio = rssi_estimate * 1.0 / tx_power
@@ -71,96 +122,142 @@ def estimate_distance_kalman(rssi):
     else:
         return (0.89976 * (ratio ** 7.7095)) + 0.111
 
-# Function to get the manufacturer name from manufacturer data
+# Function to get the manufacturer name from manufacturer data, preferring the first known company ID
 def get_manufacturer_name(manufacturer_data):
     if manufacturer_data:
         for code in manufacturer_data.keys():
-            return manufacturer_codes.get(code, f"Unknown Manufacturer (Code: {code})")
+            name = manufacturer_codes.get(code)
+            if name is not None:
+                return name
+        return f"Unknown Manufacturer (Code: {next(iter(manufacturer_data))})"
     return "N/A"
 
+# Memoized MAC -> UUID derivation, resolving rotating private addresses
+device_ids = None
+
+# Function to get the MAC -> UUID cache, loading IRK_PATH on first use
+def get_device_ids():
+    global device_ids
+    if device_ids is None:
+        from device_ids import DeviceIdCache, load_irks
+
+        device_ids = DeviceIdCache(salt=UUID_SALT, irks=load_irks(IRK_PATH) if IRK_PATH else None)
+    return device_ids
+
 # Function to generate a consistent UUID from the device's MAC address
 def generate_uuid_from_mac(mac_address):
-    # Use SHA-256 hash of the MAC address to generate a UUID
-    return str(uuid.UUID(hashlib.sha256(mac_address.encode()).hexdigest()[0:32]))
-
-# Function to get detailed Wi-Fi information
-def get_wifi_info():
-    wifi_info = {
-        "ssid": None,
-        "mac_address": None,
-        "signal_level": None
-    }
-    try:
-        result = subprocess.run(['iwconfig'], capture_output=True, text=True)
-        for line in result.stdout.split('\n'):
-            if 'ESSID' in line:
-                wifi_info['ssid'] = line.split('ESSID:')[1].strip().strip('"')
-            if 'Access Point' in line:
-                wifi_info['mac_address'] = line.split('Access Point:')[1].strip()
-            if 'Signal level' in line:
-                wifi_info['signal_level'] = line.split('Signal level=')[1].split(' ')[0].strip()
-    except Exception as e:
-        print(f"Error retrieving Wi-Fi info: {e}")
-    return wifi_info
-
-# Function to get the Linux device UUID
-def get_device_uuid():
-    try:
-        with open("/etc/machine-id", "r") as f:
-            return f.read().strip()
-    except Exception as e:
-        print(f"Error retrieving device UUID: {e}")
-        return "Unknown"
+    return get_device_ids().get(mac_address)
+
+# Cached host/network metadata, refreshed off the event loop by its run() task
+metadata_provider = None
+
+# Function to get the host metadata cache, created on first use
+def get_metadata_provider():
+    global metadata_provider
+    if metadata_provider is None:
+        from host_metadata import MetadataProvider
+
+        metadata_provider = MetadataProvider()
+    return metadata_provider
 
 # Function to get internet connection metadata
 def get_connection_metadata():
-    hostname = socket.gethostname()
-    ip_address = socket.gethostbyname(hostname)
-    wifi_info = get_wifi_info()
-    device_uuid = get_device_uuid()
-
-    connection_metadata = {
-        "hostname": hostname,
-        "ip_address": ip_address,
-        "network_name": wifi_info['ssid'] if wifi_info['ssid'] else "Unknown",
-        "network_type": "Wi-Fi" if wifi_info['ssid'] else "Unknown",
-        "mac_address": wifi_info['mac_address'] if wifi_info['mac_address'] else "Unknown",
-        "signal_level": wifi_info['signal_level'] if wifi_info['signal_level'] else "Unknown",
-        "device_uuid": device_uuid
-    }
-    return connection_metadata
+    return get_metadata_provider().get()
+
+# Function to build the flattened device list from a batch of advertisements, excluding specific devices
+def build_device_list(advertisements, timestamp=None):
+    # One timestamp for the whole batch, shared by every record
+    if timestamp is None:
+        timestamp = datetime.now().isoformat()
+
+    aggregator = get_aggregator()
+    device_tracker = get_device_tracker()
+    rule_engine = get_rule_engine()
+
+    # Aggregate the batch per address and feed every RSSI sample to that
+    # device's filter
+    with metrics.time("filter"):
+        for advertisement in advertisements:
+            aggregator.add_advertisement(advertisement)
+            if isinstance(advertisement.rssi, int):
+                device_tracker.update(advertisement.address, advertisement.rssi)
+        aggregates = aggregator.drain()
 
-# Function to scan for devices and list them grouped by type, excluding specific devices
-async def scan_and_list_devices():
-    devices = await BleakScanner.discover()
     flattened_devices = []
+    ranged = []  # indices into flattened_devices that have an RSSI
+    smoothed_rssi = []
+    tx_powers = []  # advertised calibrated 1 m power, or the default
+    # Manufacturer lookup, payload decoding, rule evaluation and UUID derivation
+    with metrics.time("classify"):
+        for aggregate in aggregates:
+            advertisement = aggregate.latest
+            rssi = advertisement.rssi if advertisement.rssi is not None else 'N/A'
+            manufacturer_name = get_manufacturer_name(advertisement.manufacturer_data)
+
+            # Skip devices matched by the skip rules (e.g. specific manufacturers or name patterns)
+            skip, device_type = rule_engine.evaluate(
+                name=advertisement.name,
+                address=advertisement.address,
+                manufacturer_name=manufacturer_name,
+                manufacturer_ids=advertisement.manufacturer_data.keys(),
+                service_uuids=advertisement.service_uuids,
+                rssi=advertisement.rssi,
+            )
+            if skip:
+                continue
+
+            beacon_type, tx_power = beacon_info(
+                payload_decoders.decode_all(advertisement.manufacturer_data, advertisement.service_data))
+            device_uuid = generate_uuid_from_mac(advertisement.address)
+            if isinstance(rssi, int):
+                ranged.append(len(flattened_devices))
+                smoothed_rssi.append(device_tracker.get(advertisement.address))
+                tx_powers.append(tx_power if tx_power is not None else DEFAULT_TX_POWER)
+            flattened_devices.append(DeviceRecord(
+                name=advertisement.name,
+                address=advertisement.address,
+                rssi=rssi,
+                distance='N/A',
+                manufacturer=manufacturer_name,
+                uuid=device_uuid,  # Use the consistent UUID
+                timestamp=timestamp,  # Batch timestamp
+                category=device_type,  # Add category as a field
+                count=aggregate.count,
+                rssi_min=aggregate.rssi_min,
+                rssi_max=aggregate.rssi_max,
+                rssi_mean=round(aggregate.rssi_mean, 1) if aggregate.rssi_count else None,
+                first_seen=round(aggregate.first_seen, 3),
+                last_seen=round(aggregate.last_seen, 3),
+                beacon_type=beacon_type
+            ))
+
+    # Estimate all distances for the batch in one vectorized pass
+    if ranged:
+        with metrics.time("distance"):
+            for index, distance in zip(ranged, ratio_distance(smoothed_rssi, tx_powers).tolist()):
+                flattened_devices[index].distance = distance
+    return flattened_devices
+
+# Function run by the processing stage for each batch (possibly in a worker); the
+# caches live wherever it runs, so their counters are recorded here as deltas
+def process_batch(advertisements, timestamp):
+    get_rule_engine().reload_if_changed()
+    device_ids = get_device_ids()
+    uuid_hits, uuid_misses = device_ids.hits, device_ids.misses
+    payload_hits, payload_misses = payload_decoders.hits, payload_decoders.misses
+    flattened_devices = build_device_list(advertisements, timestamp)
+    metrics.inc("uuid_cache_hits_total", device_ids.hits - uuid_hits)
+    metrics.inc("uuid_cache_misses_total", device_ids.misses - uuid_misses)
+    metrics.inc("payload_cache_hits_total", payload_decoders.hits - payload_hits)
+    metrics.inc("payload_cache_misses_total", payload_decoders.misses - payload_misses)
+    # A gauge: not merged back from worker processes, so absent in process mode
+    metrics.set("uuid_cache_size", len(device_ids))
+    return flattened_devices
 
-    for device in devices:
-        advertisement_data = device.details.get("props", {})
-        rssi = advertisement_data.get('RSSI', 'N/A')
-        distance = estimate_distance_kalman(rssi) if isinstance(rssi, int) else 'N/A'
-        manufacturer_data = advertisement_data.get("ManufacturerData", {})
-        manufacturer_name = get_manufacturer_name(manufacturer_data)
-
-        # Skip devices with specific manufacturer names or name patterns
-        if manufacturer_name in ["Apple, Inc.", "Microsoft"] or \
-                any(x in device.name for x in ["Microsoft", "Lynk", "Samsung"]):
-            continue
-
-        device_type = categorize_device(device.name)
-        device_uuid = generate_uuid_from_mac(device.address)
-        flattened_devices.append({
-            "name": device.name,
-            "address": device.address,
-            "rssi": rssi,
-            "distance": distance,
-            "manufacturer": manufacturer_name,
-            "uuid": device_uuid,  # Use the consistent UUID
-            "timestamp": datetime.now().isoformat(),  # Current timestamp
-            "category": device_type  # Add category as a field
-        })
-
-    connection_metadata = get_connection_metadata()
+# Function to wrap the device list with the connection metadata
+def build_payload(flattened_devices):
+    with metrics.time("metadata"):
+        connection_metadata = get_connection_metadata()
     result = {
         "timestamp": datetime.now().isoformat(),
         "hostname": connection_metadata["hostname"],
@@ -172,16 +269,175 @@ async def scan_and_list_devices():
         "device_uuid": connection_metadata["device_uuid"],
         "devices": flattened_devices
     }
+    return result
+
+# Function to build a change-only payload; returns None when nothing changed
+def build_delta_payload(flattened_devices, reporter):
+    report_type, devices, removed = reporter.diff(flattened_devices)
+    if report_type == "snapshot":
+        result = build_payload(devices)
+    elif devices or removed:
+        # Host metadata is only repeated in snapshots
+        result = {
+            "timestamp": datetime.now().isoformat(),
+            "device_uuid": get_connection_metadata()["device_uuid"],
+            "devices": devices
+        }
+    else:
+        return None
+    result["report_type"] = report_type
+    result["removed"] = removed
+    return result
+
+# Function to scan for devices once and upload them, excluding specific devices
+async def scan_and_list_devices(uploader):
+    from bleak import BleakScanner
+
+    # No run() task in this mode: fill the metadata cache while scanning
+    metadata_task = asyncio.create_task(get_metadata_provider().refresh())
+    with metrics.time("scan"):
+        discovered = await BleakScanner.discover(return_adv=True)
+    await metadata_task
+    advertisements = [advertisement_from_bleak(device, advertisement_data)
+                      for device, advertisement_data in discovered.values()]
+    uploader.submit(build_payload(build_device_list(advertisements)))
+    await uploader.flush()
+
+# Function to create the scanner for the configured adapters
+def create_scanner(flush_interval=FLUSH_INTERVAL, max_batch_size=MAX_BATCH_SIZE, adapters=ADAPTERS):
+    if RING_PATH:
+        from ring import RingScanner
+
+        return RingScanner(RING_PATH, flush_interval=flush_interval, max_batch_size=max_batch_size)
+    from scanner import MultiAdapterScanner, StreamingScanner
+
+    if len(adapters) > 1:
+        return MultiAdapterScanner(adapters, flush_interval=flush_interval, max_batch_size=max_batch_size)
+    return StreamingScanner(flush_interval=flush_interval, max_batch_size=max_batch_size,
+                            adapter=adapters[0] if adapters else None)
 
-    # Send JSON structure to the webhook
-    response = requests.post("https://ble-listener-286f94459e57.herokuapp.com/api/devices", json=result)
-    print(f"Posted data to webhook, response status: {response.status_code}")
+# Function to record per-flush counters and gauges
+def record_cycle_metrics(scanner, batch, uploader):
+    metrics.inc("advertisements_total", len(batch))
+    metrics.set("advertisements_dropped_total", scanner.dropped)
+    metrics.set("scanner_queue_depth", scanner.queue.qsize())
+    metrics.set("upload_queue_depth", uploader.pending())
+    if METRICS_FILE:
+        metrics.write_file(METRICS_FILE)
 
-# Main function to run the scanning and listing every 5 seconds
-async def main():
-    while True:
-        await scan_and_list_devices()
-        await asyncio.sleep(5)
+# Function to build the payload for a processed batch and queue it for upload
+def publish_devices(flattened_devices, reporter, uploader, history=None):
+    metrics.observe("devices_per_cycle", len(flattened_devices))
+    if history is not None:
+        # Full sightings go to the local history even in delta mode
+        with metrics.time("history"):
+            history.insert_records(flattened_devices)
+            history.maybe_compact()
+    if reporter is None:
+        payload = build_payload(flattened_devices)
+    else:
+        payload = build_delta_payload(flattened_devices, reporter)
+    # Never waits on the network; the uploader task does that
+    if payload is not None:
+        uploader.submit(payload)
+
+# Function to scan continuously and hand a batch to the uploader every flush interval
+# (pass a capture.ReplayScanner as `scanner` to run the pipeline without a radio)
+async def stream_and_list_devices(uploader, flush_interval=FLUSH_INTERVAL, max_batch_size=MAX_BATCH_SIZE,
+                                  report_mode=REPORT_MODE, scanner=None, capture_path=CAPTURE_PATH,
+                                  stage=None, scheduler=None, history=None):
+    reporter = DeltaReporter() if report_mode == "delta" else None
+    if scanner is None:
+        scanner = create_scanner(flush_interval, max_batch_size)
+    if stage is None:
+        stage = ProcessingStage(process_batch)
+
+    def publish(flattened_devices):
+        if scheduler is not None:
+            scheduler.observe_records(flattened_devices)
+        publish_devices(flattened_devices, reporter, uploader, history)
+
+    # Results are published as soon as their batch finishes, not on the next flush
+    stage.on_result = publish
+    if capture_path:
+        from capture import CaptureWriter
+
+        capture = CaptureWriter(capture_path)
+    else:
+        capture = None
+    upload_task = asyncio.create_task(uploader.run())
+    metadata_task = asyncio.create_task(get_metadata_provider().run())
+    duty_task = None
+    if scheduler is not None:
+        scheduler.attach(scanner)
+    try:
+        async with scanner:
+            if scheduler is not None:
+                duty_task = asyncio.create_task(scheduler.run_duty_cycle(scanner))
+            async for batch in scanner.batches():
+                if capture is not None:
+                    capture.write_batch(batch)
+                if metrics.enabled:
+                    record_cycle_metrics(scanner, batch, uploader)
+                if scheduler is not None:
+                    scheduler.observe_batch(batch)
+                if batch:
+                    await stage.submit(batch, datetime.now().isoformat())
+                elif reporter is not None and not stage.pending:
+                    # Nothing new this tick and nothing in flight: still report
+                    # removals and the periodic snapshot
+                    publish_devices([], reporter, uploader)
+                if scheduler is not None:
+                    scanner.flush_interval = scheduler.decide(uploader.pending())[0]
+        await stage.drain()
+    finally:
+        upload_task.cancel()
+        metadata_task.cancel()
+        if duty_task is not None:
+            duty_task.cancel()
+        if capture is not None:
+            capture.close()
+
+# Main function to run the streaming scanner and the uploader; `once` does a single
+# discovery instead, and a `scanner` (e.g. capture.ReplayScanner) replaces the radio
+async def main(once=False, scanner=None):
+    if METRICS_PORT or METRICS_FILE:
+        metrics.enabled = True
+        if METRICS_PORT:
+            metrics.serve(METRICS_PORT)
+    from spool import Spool
+    from uploader import Uploader
+
+    spool = Spool(SPOOL_PATH)
+    uploader = Uploader(WEBHOOK_URL, max_coalesce=UPLOAD_COALESCE, compress=UPLOAD_GZIP, spool=spool,
+                        layout=PAYLOAD_LAYOUT)
+    stage = ProcessingStage(process_batch, PROCESSING_MODE, PROCESSING_WORKERS, PROCESSING_MAX_PENDING)
+    if HISTORY_PATH:
+        from history import HistoryStore
+
+        history = HistoryStore(HISTORY_PATH)
+    else:
+        history = None
+    if ADAPTIVE:
+        from scheduler import AdaptiveScheduler
+
+        scheduler = AdaptiveScheduler()
+    else:
+        scheduler = None
+    try:
+        if once:
+            await scan_and_list_devices(uploader)
+        else:
+            await stream_and_list_devices(uploader, stage=stage, scanner=scanner,
+                                          scheduler=scheduler, history=history)
+            # A replayed capture ends; upload what it produced before exiting
+            await uploader.flush()
+    finally:
+        if history is not None:
+            history.close()
+        stage.close()
+        uploader.close()
+        spool.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,209 @@
+import asyncio
+import json
+import random
+import time
+
+from scanner import Advertisement, StreamingScanner
+
+# Capture files are line-delimited JSON, one advertisement per line:
+# {"t": 1718000000.123, "a": "AA:BB:..", "n": "name", "r": -60,
+#  "m": {"76": "0215..."}, "s": ["0000180d-..."], "p": -59, "h": "hci0",
+#  "d": {"0000feaa-...": "00e8..."}}
+
+
+def encode_advertisement(advertisement):
+    record = {"t": round(advertisement.timestamp, 3), "a": advertisement.address, "r": advertisement.rssi}
+    if advertisement.name is not None:
+        record["n"] = advertisement.name
+    if advertisement.manufacturer_data:
+        record["m"] = {str(code): bytes(data).hex() for code, data in advertisement.manufacturer_data.items()}
+    if advertisement.service_uuids:
+        record["s"] = advertisement.service_uuids
+    if advertisement.tx_power is not None:
+        record["p"] = advertisement.tx_power
+    if advertisement.adapter is not None:
+        record["h"] = advertisement.adapter
+    if advertisement.service_data:
+        record["d"] = {service: bytes(data).hex() for service, data in advertisement.service_data.items()}
+    return json.dumps(record, separators=(",", ":"))
+
+
+def decode_advertisement(line):
+    record = json.loads(line)
+    return Advertisement(
+        timestamp=record["t"],
+        address=record["a"],
+        name=record.get("n"),
+        rssi=record.get("r"),
+        manufacturer_data={int(code): bytes.fromhex(data) for code, data in record.get("m", {}).items()},
+        service_uuids=record.get("s", []),
+        tx_power=record.get("p"),
+        adapter=record.get("h"),
+        service_data={service: bytes.fromhex(data) for service, data in record.get("d", {}).items()},
+    )
+
+
+class CaptureWriter:
+    """
+    Appends advertisements to a capture file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "a", encoding="utf-8")
+        self.count = 0
+
+    def write(self, advertisement):
+        self.file.write(encode_advertisement(advertisement) + "\n")
+        self.count += 1
+
+    def write_batch(self, advertisements):
+        self.file.writelines(encode_advertisement(advertisement) + "\n" for advertisement in advertisements)
+        self.count += len(advertisements)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def read_capture(path):
+    """
+    Yield the advertisements stored in a capture file, in order.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield decode_advertisement(line)
+
+
+def synthetic_advertisements(num_devices, num_advertisements, duration=10.0, seed=0):
+    """
+    Generate a synthetic crowd of `num_devices` devices sending
+    `num_advertisements` advertisements in total over `duration` seconds.
+    """
+    rng = random.Random(seed)
+    manufacturer_ids = [0x004C, 0x0006, 0x0075, 0x089A, 0x0105, 0x000F, 0x0134, 0xFFFF]
+    names = [None, None, "HRM-{}", "TMP-{}", "BPM-{}", "ENVY {}", "Bose {}", "Tag {}"]
+    devices = []
+    for index in range(num_devices):
+        address = ":".join(f"{rng.randrange(256):02X}" for _ in range(6))
+        name = rng.choice(names)
+        devices.append((
+            address,
+            name.format(index) if name else None,
+            rng.choice(manufacturer_ids),
+            rng.uniform(-95, -40),
+        ))
+
+    start = time.time()
+    for index in range(num_advertisements):
+        address, name, manufacturer_id, mean_rssi = devices[rng.randrange(num_devices)]
+        yield Advertisement(
+            timestamp=start + duration * index / num_advertisements,
+            address=address,
+            name=name,
+            rssi=int(rng.gauss(mean_rssi, 4)),
+            manufacturer_data={manufacturer_id: rng.randbytes(8)},
+            service_uuids=[],
+            tx_power=None,
+        )
+
+
+def churn_scenario(quiet=60.0, burst=5.0, tail=15.0, stable_devices=20, burst_devices=30, interval=1.0, seed=0):
+    """
+    Generate a quiet period with `stable_devices` steady advertisers, then
+    `burst_devices` new devices arriving during `burst` seconds, then a quiet
+    tail. Each device advertises every `interval` seconds.
+    """
+    rng = random.Random(seed)
+    start = time.time()
+    end = quiet + burst + tail
+    devices = [(f"10:00:00:00:{index // 256:02X}:{index % 256:02X}", 0.0, rng.uniform(-90, -50))
+               for index in range(stable_devices)]
+    devices += [(f"20:00:00:00:{index // 256:02X}:{index % 256:02X}", quiet + rng.uniform(0, burst),
+                 rng.uniform(-90, -50)) for index in range(burst_devices)]
+    events = []
+    for address, arrival, rssi in devices:
+        t = arrival + rng.uniform(0, interval)
+        while t < end:
+            events.append((t, address, rssi))
+            t += interval
+    events.sort()
+    for t, address, rssi in events:
+        yield Advertisement(
+            timestamp=start + t,
+            address=address,
+            name=None,
+            rssi=int(rssi + rng.gauss(0, 1)),
+            manufacturer_data={0x089A: b"\x00"},
+            service_uuids=[],
+            tx_power=None,
+        )
+
+
+class ReplayScanner(StreamingScanner):
+    """
+    Fake scanner backend that replays advertisements (e.g. from read_capture
+    or synthetic_advertisements) through the same batching interface as
+    StreamingScanner. With `speed=None` the advertisements are fed as fast as
+    the consumer takes them; otherwise the original inter-arrival times are
+    kept, scaled by `speed`. batches() ends once the replay is exhausted.
+    When `adapter` is set, replayed advertisements are tagged with it. At
+    real speed, advertisements that arrive while the scanner is paused are
+    counted in `missed` and not delivered, like a radio that is off.
+    """
+
+    def __init__(self, advertisements, speed=1.0, flush_interval=5.0, max_batch_size=500,
+                 max_queue_size=10000, adapter=None):
+        super().__init__(flush_interval, max_batch_size, max_queue_size, adapter)
+        self.advertisements = advertisements
+        self.speed = speed
+        self.finished = False
+        self.missed = 0
+        self.first_timestamp = None
+        self.replay_started = None
+        self._task = None
+
+    async def _replay(self):
+        loop = asyncio.get_running_loop()
+        first_timestamp = None
+        started = self.replay_started = loop.time()
+        try:
+            for advertisement in self.advertisements:
+                if self.adapter is not None:
+                    advertisement = advertisement._replace(adapter=self.adapter)
+                if self.speed is None:
+                    # Max speed: backpressure instead of drops
+                    await self.queue.put(advertisement)
+                    continue
+                if first_timestamp is None:
+                    first_timestamp = self.first_timestamp = advertisement.timestamp
+                delay = (advertisement.timestamp - first_timestamp) / self.speed - (loop.time() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                if self.paused:
+                    self.missed += 1
+                    continue
+                try:
+                    self.queue.put_nowait(advertisement)
+                except asyncio.QueueFull:
+                    self.dropped += 1
+        finally:
+            self.finished = True
+
+    async def start(self):
+        self._task = asyncio.create_task(self._replay())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def pause(self):
+        self.paused = True
+
+    async def resume(self):
+        self.paused = False
+
+    def exhausted(self):
+        return self.finished and self.queue.empty()
@@ -0,0 +1,71 @@
+import argparse
+import sys
+
+# Every command imports what it needs when it runs, so `--help` and the light
+# commands start without bleak, numpy, requests or the manufacturer tables
+
+# Commands that hand their arguments to an existing module's own main()
+MODULE_COMMANDS = {
+    "airtags": ("find_near_airtags", "find nearby trackers, or stream proximity alerts with --watch"),
+    "bench": ("bench", "offline pipeline, churn and startup benchmarks"),
+    "history": ("history", "query the local sighting history"),
+    "ring": ("ring", "publish the advertisement stream to a shared ring, or tail it"),
+    "positions": ("positioning", "aggregate several gateways into device positions"),
+    "stub": ("stub_server", "run a local webhook stub"),
+}
+
+
+def scan(args):
+    import asyncio
+    import ble
+
+    asyncio.run(ble.main(once=args.once))
+
+
+def replay(args):
+    import asyncio
+    import ble
+    from capture import ReplayScanner, read_capture
+
+    scanner = ReplayScanner(list(read_capture(args.capture)), speed=args.speed or None,
+                            flush_interval=ble.FLUSH_INTERVAL, max_batch_size=ble.MAX_BATCH_SIZE)
+    asyncio.run(ble.main(scanner=scanner))
+
+
+def run_module(command, argv):
+    import importlib
+
+    module = importlib.import_module(MODULE_COMMANDS[command][0])
+    # The module parses sys.argv itself
+    sys.argv = [f"{sys.argv[0]} {command}", *argv]
+    module.main()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BLE scanner, uploader and tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    scan_parser = commands.add_parser("scan", help="scan and upload continuously (configured via BLE_* variables)")
+    scan_parser.add_argument("--once", action="store_true", help="one discovery and upload, then exit")
+    replay_parser = commands.add_parser("replay", help="run a capture file through the scan/upload pipeline")
+    replay_parser.add_argument("capture")
+    replay_parser.add_argument("--speed", type=float, default=1.0, help="replay speed factor, 0 for as fast as possible")
+    for command, (_, description) in MODULE_COMMANDS.items():
+        commands.add_parser(command, help=description, add_help=False)
+
+    argv = sys.argv[1:] if argv is None else argv
+    # Module commands keep their own options, including -h
+    if argv and argv[0] in MODULE_COMMANDS:
+        run_module(argv[0], argv[1:])
+        return
+    args = parser.parse_args(argv)
+    try:
+        if args.command == "scan":
+            scan(args)
+        else:
+            replay(args)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
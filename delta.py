@@ -0,0 +1,76 @@
+import time
+
+# Defaults for change detection
+RSSI_HYSTERESIS = 4  # dBm
+DISTANCE_HYSTERESIS = 0.5  # meters
+SNAPSHOT_INTERVAL = 300.0  # seconds between full snapshots
+ABSENT_TIMEOUT = 30.0  # seconds unseen before a device counts as gone
+
+
+def _moved(old, new, hysteresis):
+    if isinstance(old, (int, float)) and isinstance(new, (int, float)):
+        return abs(new - old) > hysteresis
+    return old != new
+
+
+class DeltaReporter:
+    """
+    Change-only reporting of device records.
+
+    Keeps the last reported record per device UUID and only emits devices
+    that appeared, or whose RSSI/distance moved beyond the hysteresis, or
+    whose name, manufacturer or category changed. Devices not seen for
+    `absent_timeout` seconds are reported as removed. Every
+    `snapshot_interval` seconds a full snapshot of every device still present
+    is emitted so the backend can resync. Call diff() on every flush, with an
+    empty list when nothing was heard, so removals and snapshots keep coming
+    on a quiet scan.
+    """
+
+    def __init__(self, rssi_hysteresis=RSSI_HYSTERESIS, distance_hysteresis=DISTANCE_HYSTERESIS,
+                 snapshot_interval=SNAPSHOT_INTERVAL, absent_timeout=ABSENT_TIMEOUT):
+        self.rssi_hysteresis = rssi_hysteresis
+        self.distance_hysteresis = distance_hysteresis
+        self.snapshot_interval = snapshot_interval
+        self.absent_timeout = absent_timeout
+        self.reported = {}  # uuid -> last reported device record
+        self.last_seen = {}  # uuid -> time the device was last in a batch
+        self._next_snapshot = 0.0
+
+    def _changed(self, old, new):
+        return (
+            _moved(old.rssi, new.rssi, self.rssi_hysteresis)
+            or _moved(old.distance, new.distance, self.distance_hysteresis)
+            or old.name != new.name
+            or old.manufacturer != new.manufacturer
+            or old.category != new.category
+        )
+
+    def diff(self, devices, now=None):
+        """
+        Compare a batch of DeviceRecord with the last reported state.
+        Returns (report_type, devices_to_send, removed_uuids), where
+        report_type is "snapshot" or "delta".
+        """
+        now = time.monotonic() if now is None else now
+        for device in devices:
+            self.last_seen[device.uuid] = now
+
+        removed = [uuid for uuid, seen in self.last_seen.items() if now - seen > self.absent_timeout]
+        for uuid in removed:
+            del self.last_seen[uuid]
+            self.reported.pop(uuid, None)
+
+        if now >= self._next_snapshot:
+            self._next_snapshot = now + self.snapshot_interval
+            for device in devices:
+                self.reported[device.uuid] = device
+            return "snapshot", list(self.reported.values()), removed
+
+        changed = []
+        for device in devices:
+            old = self.reported.get(device.uuid)
+            if old is None or self._changed(old, device):
+                self.reported[device.uuid] = device
+                changed.append(device)
+        return "delta", changed, removed
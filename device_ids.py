@@ -0,0 +1,130 @@
+import hashlib
+import json
+import uuid
+from collections import OrderedDict
+
+CACHE_SIZE = 50000
+RPA_CACHE_SIZE = 4096
+
+
+def derive_uuid(address, salt=b""):
+    """
+    Derive the stable device UUID from an address: the first 128 bits of
+    SHA-256(salt + address). With an empty salt this matches the original
+    generate_uuid_from_mac.
+    """
+    return str(uuid.UUID(hashlib.sha256(salt + address.encode()).hexdigest()[0:32]))
+
+
+def parse_address(address):
+    """
+    Return the 6 address bytes (most significant first) of an
+    "AA:BB:CC:DD:EE:FF" address, or None for other formats (e.g. macOS UUIDs).
+    """
+    parts = address.split(":")
+    if len(parts) != 6:
+        return None
+    try:
+        return bytes(int(part, 16) for part in parts)
+    except ValueError:
+        return None
+
+
+def is_resolvable_private_address(address_bytes):
+    # The two most significant bits of a resolvable private address are 0b01
+    return address_bytes is not None and address_bytes[0] >> 6 == 0b01
+
+
+def load_irks(path):
+    """
+    Read a JSON file mapping identity address -> IRK (32 hex digits, most
+    significant byte first). Returns {identity address: 16-byte IRK}.
+    """
+    with open(path, "r") as f:
+        return {address.upper(): bytes.fromhex(irk) for address, irk in json.load(f).items()}
+
+
+class DeviceIdCache:
+    """
+    Bounded LRU cache of address -> derived device UUID, with hit/miss stats.
+
+    With an IRK table (identity address -> IRK), resolvable private addresses
+    are resolved to their identity address first (Bluetooth Core ah():
+    AES-128(IRK, 0...0 || prand) mod 2^24 == hash), so a device that rotates
+    its address keeps one UUID and one cache entry. Resolved rotations are
+    remembered in a small separate map. Resolution needs the optional
+    `cryptography` package; without it RPAs are treated as plain addresses.
+    """
+
+    def __init__(self, max_size=CACHE_SIZE, salt=b"", irks=None, rpa_cache_size=RPA_CACHE_SIZE):
+        self.max_size = max_size
+        self.salt = salt
+        self.rpa_cache_size = rpa_cache_size
+        self.cache = OrderedDict()
+        self.rpa_cache = OrderedDict()  # RPA -> identity address (or None if unresolved)
+        self.hits = 0
+        self.misses = 0
+        self.resolved = 0
+        self._ciphers = []
+        if irks:
+            self.set_irks(irks)
+
+    def __len__(self):
+        return len(self.cache)
+
+    def set_irks(self, irks):
+        try:
+            from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+        except ImportError:
+            print("cryptography is not installed, resolvable private addresses will not be resolved")
+            return
+        self._ciphers = [(identity, Cipher(algorithms.AES(irk), modes.ECB())) for identity, irk in irks.items()]
+        self.rpa_cache.clear()
+
+    def resolve(self, address):
+        """
+        Return the identity address for a resolvable private address, or
+        `address` itself if it is not one or no IRK matches.
+        """
+        if not self._ciphers:
+            return address
+        address_bytes = parse_address(address)
+        if not is_resolvable_private_address(address_bytes):
+            return address
+        if address in self.rpa_cache:
+            self.rpa_cache.move_to_end(address)
+            identity = self.rpa_cache[address]
+            return identity if identity is not None else address
+
+        prand, hash_value = address_bytes[:3], address_bytes[3:]
+        plaintext = bytes(13) + prand
+        identity = None
+        for candidate, cipher in self._ciphers:
+            encryptor = cipher.encryptor()
+            if (encryptor.update(plaintext) + encryptor.finalize())[-3:] == hash_value:
+                identity = candidate
+                self.resolved += 1
+                break
+        self.rpa_cache[address] = identity
+        if len(self.rpa_cache) > self.rpa_cache_size:
+            self.rpa_cache.popitem(last=False)
+        return identity if identity is not None else address
+
+    def get(self, address):
+        """
+        Return the device UUID for an address, deriving it on a cache miss.
+        """
+        address = self.resolve(address)
+        device_uuid = self.cache.get(address)
+        if device_uuid is not None:
+            self.hits += 1
+            self.cache.move_to_end(address)
+            return device_uuid
+        self.misses += 1
+        device_uuid = self.cache[address] = derive_uuid(address, self.salt)
+        if len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
+        return device_uuid
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.cache), "resolved": self.resolved}
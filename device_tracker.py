@@ -0,0 +1,82 @@
+import time
+
+from kalman_filter import KalmanFilter
+
+# Filter tuning, matching the values previously used with filterpy
+PROCESS_VARIANCE = 0.1
+MEASUREMENT_VARIANCE = 5.0
+IDLE_TTL = 300.0
+
+
+def new_filter(rssi, process_variance=PROCESS_VARIANCE, measurement_variance=MEASUREMENT_VARIANCE):
+    """
+    Return a KalmanFilter for one device, started from its first RSSI
+    sample rather than 0 dBm.
+    """
+    kf = KalmanFilter(process_variance, measurement_variance, measurement_variance)
+    kf.posteri_estimate = float(rssi)
+    return kf
+
+
+class DeviceTracker:
+    """
+    Registry of per-device RSSI filters.
+
+    Each device (keyed by address or by the UUID from generate_uuid_from_mac)
+    keeps a persistent scalar Kalman filter, so RSSI is smoothed across scans
+    instead of starting over on every sample. Entries that have not been seen
+    for `idle_ttl` seconds are evicted.
+    """
+
+    def __init__(self, idle_ttl=IDLE_TTL, process_variance=PROCESS_VARIANCE,
+                 measurement_variance=MEASUREMENT_VARIANCE):
+        self.idle_ttl = idle_ttl
+        self.process_variance = process_variance
+        self.measurement_variance = measurement_variance
+        self.entries = {}  # key -> [KalmanFilter, last_seen]
+        self._next_eviction = time.monotonic() + idle_ttl
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def update(self, key, rssi, now=None):
+        """
+        Feed one RSSI sample for `key` and return the smoothed RSSI.
+        """
+        if now is None:
+            now = time.monotonic()
+        entry = self.entries.get(key)
+        if entry is None:
+            kf = new_filter(rssi, self.process_variance, self.measurement_variance)
+            self.entries[key] = [kf, now]
+            estimate = kf.posteri_estimate
+        else:
+            entry[1] = now
+            estimate = entry[0].update(rssi)
+
+        if now >= self._next_eviction:
+            self.evict_idle(now)
+        return estimate
+
+    def get(self, key):
+        """
+        Return the current smoothed RSSI for `key`, or None if it is not tracked.
+        """
+        entry = self.entries.get(key)
+        return entry[0].posteri_estimate if entry is not None else None
+
+    def evict_idle(self, now=None):
+        """
+        Drop entries idle for longer than `idle_ttl`. Returns the number evicted.
+        """
+        if now is None:
+            now = time.monotonic()
+        cutoff = now - self.idle_ttl
+        stale = [key for key, entry in self.entries.items() if entry[1] < cutoff]
+        for key in stale:
+            del self.entries[key]
+        self._next_eviction = now + min(self.idle_ttl, 60.0)
+        return len(stale)
@@ -0,0 +1,75 @@
+# numpy is imported on first use, so modules that only need the constants
+# (e.g. proximity.py) start without it
+
+# Default calibration, matching the scalar estimators in ble.py and find_near_airtags.py
+DEFAULT_TX_POWER = -59
+DEFAULT_PATH_LOSS_EXPONENT = 2.0
+
+
+def log_distance(rssi, tx_power=DEFAULT_TX_POWER, n=DEFAULT_PATH_LOSS_EXPONENT):
+    """
+    Vectorized log-distance path-loss model.
+    Args:
+    - rssi: Array of RSSI values
+    - tx_power: Scalar or per-device array of TxPower values at 1 meter
+    - n: Scalar or per-device array of path-loss exponents
+    Returns:
+    - Array of estimated distances in meters
+    """
+    import numpy as np
+
+    rssi = np.asarray(rssi, dtype=np.float64)
+    tx_power = np.asarray(tx_power, dtype=np.float64)
+    n = np.asarray(n, dtype=np.float64)
+    return np.power(10.0, (tx_power - rssi) / (10.0 * n))
+
+
+def ratio_distance(rssi, tx_power=DEFAULT_TX_POWER):
+    """
+    Vectorized piecewise ratio model (the one used by ble.distance_from_rssi).
+    Args:
+    - rssi: Array of (smoothed) RSSI values
+    - tx_power: Scalar or per-device array of TxPower values at 1 meter
+    Returns:
+    - Array of estimated distances in meters, -1.0 where RSSI is 0
+    """
+    import numpy as np
+
+    rssi = np.asarray(rssi, dtype=np.float64)
+    ratio = rssi / np.asarray(tx_power, dtype=np.float64)
+    distances = np.where(ratio < 1.0, ratio ** 10, 0.89976 * ratio ** 7.7095 + 0.111)
+    return np.where(rssi == 0, -1.0, distances)
+
+
+def kalman_update(estimate, error, measurement, process_variance, measurement_variance):
+    """
+    Vectorized scalar Kalman step, one lane per device (same maths as
+    kalman_filter.KalmanFilter.update).
+    Args:
+    - estimate: Array of posterior estimates
+    - error: Array of posterior error estimates
+    - measurement: Array of new measurements
+    - process_variance, measurement_variance: Scalars or per-device arrays
+    Returns:
+    - (estimate, error) arrays after the update
+    """
+    import numpy as np
+
+    estimate = np.asarray(estimate, dtype=np.float64)
+    priori_error = np.asarray(error, dtype=np.float64) + process_variance
+    blending_factor = priori_error / (priori_error + measurement_variance)
+    estimate = estimate + blending_factor * (np.asarray(measurement, dtype=np.float64) - estimate)
+    error = (1.0 - blending_factor) * priori_error
+    return estimate, error
+
+
+def estimate_distances(rssi, tx_power=DEFAULT_TX_POWER, n=DEFAULT_PATH_LOSS_EXPONENT, model="log"):
+    """
+    Estimate distances for a whole scan result in one pass.
+    `model` is either "log" (log-distance) or "ratio" (piecewise ratio).
+    """
+    if model == "log":
+        return log_distance(rssi, tx_power, n)
+    if model == "ratio":
+        return ratio_distance(rssi, tx_power)
+    raise ValueError(f"Unknown distance model: {model}")
@@ -1,18 +1,14 @@
+import argparse
 import asyncio
-from bleak import BleakScanner
-import nest_asyncio
+import time
 
-# Apply the nest_asyncio patch to allow nested event loops
-nest_asyncio.apply()
-
-manufacturer_codes = {
-    0x004C: "Apple, Inc.",
-    0x089A: "Teltonika",
-    0x0105: "Ubiquitous Computing Technology Corporation", # iTag
-    0x0065: "HP, Inc.",
-    0x03FE: "Littelfuse" # Lynk&Co
-    # Add more manufacturer codes as needed
-}
+from aggregator import WindowAggregator
+from distance import DEFAULT_TX_POWER, log_distance
+from manufacturers import registry as manufacturer_codes
+from payloads import beacon_info, decoders as payload_decoders
+from proximity import ProximityEngine, StdoutSink, UnixSocketSink, Watchlist, WebhookSink
+from ring import POLL_INTERVAL, RingReader
+from scanner import advertisement_from_bleak
 
 def estimate_distance(rssi, tx_power=-59, n=2):
     """
@@ -26,17 +22,44 @@ def estimate_distance(rssi, tx_power=-59, n=2):
     """
     return 10 ** ((tx_power - rssi) / (10 * n))
 
-async def scan_for_ble_devices(scan_duration=1, retries=1):
-    devices = []
+async def discover_on_adapters(scan_duration, adapters):
+    """
+    Run one discovery per HCI adapter concurrently and return every sighting
+    as an Advertisement (one per device per adapter).
+    """
+    from bleak import BleakScanner
+
+    results = await asyncio.gather(*(
+        BleakScanner.discover(timeout=scan_duration, return_adv=True, **({"adapter": adapter} if adapter else {}))
+        for adapter in adapters or [None]
+    ))
+    now = time.time()
+    return [advertisement_from_bleak(device, advertisement_data, timestamp=now, adapter=adapter)
+            for adapter, discovered in zip(adapters or [None], results)
+            for device, advertisement_data in discovered.values()]
+
+async def scan_for_ble_devices(scan_duration=1, retries=1, adapters=None):
+    # Aggregate every sighting per address instead of keeping only the last one
+    aggregator = WindowAggregator()
     for _ in range(retries):
-        found_devices = await BleakScanner.discover(timeout=scan_duration)
-        devices.extend(found_devices)
-        # Use set to remove duplicates based on address
-        devices = list({device.address: device for device in devices}.values())
-
-    for device in devices:
-        distance = estimate_distance(device.rssi)
-        manufacturer_data = device.metadata.get('manufacturer_data', {})
+        for advertisement in await discover_on_adapters(scan_duration, adapters):
+            aggregator.add_advertisement(advertisement)
+    aggregates = [aggregate for aggregate in aggregator.drain() if aggregate.rssi_count]
+
+    # Decode the manufacturer and service data payloads (cached per payload) for the device type and TxPower
+    decoded = [payload_decoders.decode_all(aggregate.latest.manufacturer_data, aggregate.latest.service_data)
+               for aggregate in aggregates]
+    tx_powers = []
+    for results in decoded:
+        tx_power = beacon_info(results)[1]
+        tx_powers.append(tx_power if tx_power is not None else DEFAULT_TX_POWER)
+
+    # Estimate all distances from the mean RSSI in one vectorized pass
+    distances = log_distance([aggregate.rssi_mean for aggregate in aggregates], tx_powers).tolist()
+
+    for aggregate, distance, results in zip(aggregates, distances, decoded):
+        device = aggregate.latest
+        manufacturer_data = device.manufacturer_data
         # print(manufacturer_data)
         
         for key, value in manufacturer_data.items():
@@ -52,12 +75,83 @@ async def scan_for_ble_devices(scan_duration=1, retries=1):
 
             if manufacturer_name.startswith("Unknown"):
                 print(f"Unknown Manufacturer Code: {key}, Data: {value}")
+            # Decoded payload fields, if a decoder recognised it
+            payload = payload_decoders.decode(key, value)
+            details = f", Payload: {payload}" if payload else ""
             # Print information
-            print(f"Device: {device.name or 'Unknown'}, Manufacturer: {manufacturer_name}, Manufactorer Identifier: 0x{manufacturer_identifier_hex}, Address: {device.address}, RSSI: {device.rssi}, Estimated Distance: {distance:.2f} meters")
+            print(f"Device: {device.name or 'Unknown'}, Manufacturer: {manufacturer_name}, Manufactorer Identifier: 0x{manufacturer_identifier_hex}, Address: {device.address}, RSSI: {aggregate.rssi_mean:.1f} (min {aggregate.rssi_min}, max {aggregate.rssi_max}, {aggregate.count} samples), Estimated Distance: {distance:.2f} meters{details}")
+
+def run_ble_scan(scan_duration=2, retries=3, adapters=None):
+    asyncio.run(scan_for_ble_devices(scan_duration, retries, adapters))
+
+async def watch_proximity(engine, adapters=None):
+    """
+    Scan continuously and feed every advertisement straight from the detection
+    callback into a proximity.ProximityEngine, so enter/leave/dwell events
+    fire as soon as a device crosses a threshold. Runs until cancelled.
+    """
+    from bleak import BleakScanner
+
+    scanners = []
+    for adapter in adapters or [None]:
+        def callback(device, advertisement_data, adapter=adapter):
+            engine.observe(advertisement_from_bleak(device, advertisement_data, adapter=adapter))
+        scanners.append(BleakScanner(detection_callback=callback, **({"adapter": adapter} if adapter else {})))
+    await asyncio.gather(*(scanner.start() for scanner in scanners))
+    try:
+        await engine.run()
+    finally:
+        await asyncio.gather(*(scanner.stop() for scanner in scanners), return_exceptions=True)
+
+async def watch_ring(engine, path, poll_interval=POLL_INTERVAL):
+    """
+    Feed a proximity.ProximityEngine from the advertisement ring published by
+    `python ring.py publish` instead of scanning. Runs until cancelled.
+    """
+    reader = RingReader(path)
+    engine_task = asyncio.create_task(engine.run())
+    try:
+        while True:
+            for advertisement in reader.read():
+                engine.observe(advertisement)
+            await asyncio.sleep(poll_interval)
+    finally:
+        engine_task.cancel()
+        reader.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Find nearby trackers, or watch for them with --watch")
+    parser.add_argument("--adapter", action="append", help="HCI adapter to scan on (repeatable)")
+    parser.add_argument("--watch", action="store_true", help="stream enter/leave/dwell events instead of one scan")
+    parser.add_argument("--manufacturer", action="append", default=[], type=lambda value: int(value, 0),
+                        help="watch this company ID, e.g. 0x004C (repeatable)")
+    parser.add_argument("--prefix", action="append", default=[], help="watch this address prefix (repeatable)")
+    parser.add_argument("--enter", type=float, default=2.0, help="enter distance in meters")
+    parser.add_argument("--leave", type=float, default=4.0, help="leave distance in meters")
+    parser.add_argument("--dwell", type=float, default=30.0, help="dwell time in seconds")
+    parser.add_argument("--webhook", help="also POST events to this URL")
+    parser.add_argument("--socket", help="also write events to this Unix socket")
+    parser.add_argument("--json", action="store_true", help="print events as JSON lines")
+    parser.add_argument("--ring", help="read advertisements from this ring (see ring.py) instead of scanning")
+    args = parser.parse_args()
 
-def run_ble_scan(scan_duration=2, retries=3):
-    loop = asyncio.get_event_loop()
-    loop.run_until_complete(scan_for_ble_devices(scan_duration, retries))
+    if not args.watch:
+        run_ble_scan(adapters=args.adapter)
+        return
+    sinks = [StdoutSink(as_json=args.json)]
+    if args.webhook:
+        sinks.append(WebhookSink(args.webhook))
+    if args.socket:
+        sinks.append(UnixSocketSink(args.socket))
+    engine = ProximityEngine(sinks, Watchlist(args.manufacturer, args.prefix), enter_distance=args.enter,
+                             leave_distance=args.leave, dwell_seconds=args.dwell)
+    try:
+        if args.ring:
+            asyncio.run(watch_ring(engine, args.ring))
+        else:
+            asyncio.run(watch_proximity(engine, args.adapter))
+    except KeyboardInterrupt:
+        pass
 
 if __name__ == "__main__":
-    run_ble_scan()
+    main()
@@ -0,0 +1,201 @@
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+# Raw sightings are kept this long before being downsampled into buckets,
+# and everything is dropped after the retention period
+RETENTION = 30 * 24 * 3600.0
+DOWNSAMPLE_AFTER = 24 * 3600.0
+BUCKET = 300.0
+COMPACT_INTERVAL = 3600.0
+
+_COLUMNS = ("uuid", "ts", "address", "name", "category", "count", "rssi_mean", "rssi_min", "rssi_max",
+            "distance", "resolution")
+
+
+class HistoryStore:
+    """
+    Embedded, append-optimized store of aggregated device sightings.
+
+    One row per device per flush goes into a SQLite table (WAL mode, one
+    executemany transaction per flush) indexed on (uuid, ts). compact()
+    downsamples rows older than `downsample_after` into `bucket`-second
+    aggregates and drops rows older than `retention`.
+    """
+
+    def __init__(self, path, retention=RETENTION, downsample_after=DOWNSAMPLE_AFTER, bucket=BUCKET,
+                 compact_interval=COMPACT_INTERVAL):
+        self.path = path
+        self.retention = retention
+        self.downsample_after = downsample_after
+        self.bucket = bucket
+        self.compact_interval = compact_interval
+        self._next_compact = time.monotonic() + compact_interval
+
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS sightings ("
+            "uuid TEXT NOT NULL, ts REAL NOT NULL, address TEXT, name TEXT, category TEXT, "
+            "count INTEGER NOT NULL, rssi_mean REAL, rssi_min INTEGER, rssi_max INTEGER, distance REAL, "
+            "resolution REAL NOT NULL DEFAULT 0)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS sightings_uuid_ts ON sightings (uuid, ts)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS sightings_ts ON sightings (ts)")
+        self.db.commit()
+
+    def insert_records(self, records):
+        """
+        Append one row per DeviceRecord, in a single transaction.
+        """
+        rows = [
+            (record.uuid, record.last_seen, record.address, record.name, record.category, record.count,
+             record.rssi_mean, record.rssi_min, record.rssi_max,
+             record.distance if isinstance(record.distance, (int, float)) else None)
+            for record in records
+        ]
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO sightings (uuid, ts, address, name, category, count, rssi_mean, rssi_min, rssi_max, "
+                "distance) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def maybe_compact(self):
+        if time.monotonic() >= self._next_compact:
+            self._next_compact = time.monotonic() + self.compact_interval
+            self.compact()
+
+    def compact(self, now=None):
+        """
+        Drop rows past retention and downsample older raw rows into buckets.
+        Returns (rows deleted, rows downsampled).
+        """
+        now = time.time() if now is None else now
+        with self.db:
+            deleted = self.db.execute("DELETE FROM sightings WHERE ts < ?", (now - self.retention,)).rowcount
+            # Aligned to the bucket size, so a bucket is never split across two compactions
+            cutoff = (now - self.downsample_after) // self.bucket * self.bucket
+            # Address, name and category from the latest row of each bucket;
+            # mean RSSI weighted by count over the rows that had an RSSI
+            self.db.execute(
+                "INSERT INTO sightings (uuid, ts, address, name, category, count, rssi_mean, rssi_min, rssi_max, "
+                "distance, resolution) "
+                "SELECT uuid, MAX(ts), MAX(latest_address), MAX(latest_name), MAX(latest_category), SUM(count), "
+                "SUM(rssi_mean * count) / SUM(CASE WHEN rssi_mean IS NOT NULL THEN count END), "
+                "MIN(rssi_min), MAX(rssi_max), AVG(distance), ? "
+                "FROM (SELECT *, CAST(ts / ? AS INTEGER) AS bucket, "
+                "FIRST_VALUE(address) OVER latest AS latest_address, FIRST_VALUE(name) OVER latest AS latest_name, "
+                "FIRST_VALUE(category) OVER latest AS latest_category "
+                "FROM sightings WHERE ts < ? AND resolution < ? "
+                "WINDOW latest AS (PARTITION BY uuid, CAST(ts / ? AS INTEGER) ORDER BY ts DESC)) "
+                "GROUP BY uuid, bucket",
+                (self.bucket, self.bucket, cutoff, self.bucket, self.bucket),
+            )
+            downsampled = self.db.execute(
+                "DELETE FROM sightings WHERE ts < ? AND resolution < ?", (cutoff, self.bucket)
+            ).rowcount
+        return deleted, downsampled
+
+    def last_seen(self, uuid):
+        """
+        Return the most recent sighting of a device as a dict, or None.
+        """
+        row = self.db.execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM sightings WHERE uuid = ? ORDER BY ts DESC LIMIT 1", (uuid,)
+        ).fetchone()
+        return dict(zip(_COLUMNS, row)) if row else None
+
+    def range(self, uuid, start, end):
+        """
+        Return a device's sightings with start <= ts < end, oldest first.
+        """
+        rows = self.db.execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM sightings WHERE uuid = ? AND ts >= ? AND ts < ? ORDER BY ts",
+            (uuid, start, end),
+        )
+        return [dict(zip(_COLUMNS, row)) for row in rows]
+
+    def devices(self, start, end):
+        """
+        Return every device seen with start <= ts < end, with its last sighting time.
+        """
+        rows = self.db.execute(
+            "SELECT uuid, MAX(address), MAX(name), MAX(ts), SUM(count) FROM sightings "
+            "WHERE ts >= ? AND ts < ? GROUP BY uuid ORDER BY MAX(ts) DESC",
+            (start, end),
+        )
+        return [{"uuid": row[0], "address": row[1], "name": row[2], "last_seen": row[3], "count": row[4]}
+                for row in rows]
+
+    def close(self):
+        self.db.close()
+
+
+def _parse_time(value):
+    """
+    Accept "now", an age such as "30m", "2h" or "7d", epoch seconds, or an
+    ISO timestamp.
+    """
+    if value == "now":
+        return time.time()
+    if value[-1] in "smhd" and value[:-1].replace(".", "", 1).isdigit():
+        return time.time() - float(value[:-1]) * {"s": 1, "m": 60, "h": 3600, "d": 86400}[value[-1]]
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def _format_row(row):
+    when = datetime.fromtimestamp(row.get("ts", row.get("last_seen"))).isoformat(timespec="seconds")
+    rest = ", ".join(f"{key}={value}" for key, value in row.items() if key not in ("ts", "last_seen"))
+    return f"{when}  {rest}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the local device sighting history")
+    parser.add_argument("--db", default="ble_history.db")
+    commands = parser.add_subparsers(dest="command", required=True)
+    last = commands.add_parser("last-seen", help="most recent sighting of a device")
+    last.add_argument("uuid")
+    history = commands.add_parser("range", help="sightings of a device in a time range")
+    history.add_argument("uuid")
+    history.add_argument("--start", default="1h", help="age (2h, 7d), epoch or ISO time")
+    history.add_argument("--end", default="now", help="age (2h, 7d), epoch, ISO time or now")
+    seen = commands.add_parser("devices", help="devices seen in a time range")
+    seen.add_argument("--start", default="1h", help="age (2h, 7d), epoch or ISO time")
+    seen.add_argument("--end", default="now", help="age (2h, 7d), epoch, ISO time or now")
+    commands.add_parser("compact", help="apply retention and downsampling now")
+    args = parser.parse_args()
+
+    store = HistoryStore(args.db)
+    try:
+        if args.command == "last-seen":
+            row = store.last_seen(args.uuid)
+            print(_format_row(row) if row else "never seen")
+        elif args.command == "compact":
+            deleted, downsampled = store.compact()
+            print(f"Deleted {deleted} expired row(s), downsampled {downsampled} row(s)")
+        else:
+            start = _parse_time(args.start)
+            end = _parse_time(args.end)
+            rows = store.range(args.uuid, start, end) if args.command == "range" else store.devices(start, end)
+            for row in rows:
+                print(_format_row(row))
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # Output piped into e.g. `head`, which exited: point stdout at
+        # /dev/null so the interpreter's final flush does not fail again
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+    finally:
+        store.close()
+
+if __name__ == "__main__":
+    main()
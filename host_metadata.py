@@ -0,0 +1,171 @@
+import asyncio
+import os
+import socket
+import subprocess
+import time
+
+# How often the iwconfig-derived Wi-Fi fields are refreshed at most
+WIFI_TTL = 300.0
+# How often /proc/net/wireless is polled for association changes
+POLL_INTERVAL = 5.0
+
+# Function to get detailed Wi-Fi information
+def get_wifi_info():
+    wifi_info = {
+        "ssid": None,
+        "mac_address": None,
+        "signal_level": None
+    }
+    try:
+        result = subprocess.run(['iwconfig'], capture_output=True, text=True)
+        for line in result.stdout.split('\n'):
+            if 'ESSID' in line:
+                wifi_info['ssid'] = line.split('ESSID:')[1].strip().strip('"')
+            if 'Access Point' in line:
+                wifi_info['mac_address'] = line.split('Access Point:')[1].strip()
+            if 'Signal level' in line:
+                wifi_info['signal_level'] = line.split('Signal level=')[1].split(' ')[0].strip()
+    except Exception as e:
+        print(f"Error retrieving Wi-Fi info: {e}")
+    return wifi_info
+
+# Function to get the Linux device UUID
+def get_device_uuid():
+    try:
+        with open("/etc/machine-id", "r") as f:
+            return f.read().strip()
+    except Exception as e:
+        print(f"Error retrieving device UUID: {e}")
+        return "Unknown"
+
+# Function to get the primary local IP address without a DNS lookup
+def get_local_ip():
+    # Connecting a UDP socket sends nothing; it just asks the kernel which
+    # local address would route to the destination
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.connect(("10.255.255.255", 1))
+            return s.getsockname()[0]
+    except OSError:
+        return "127.0.0.1"
+
+# Function to read per-interface signal levels from /proc/net/wireless
+def read_proc_wireless(path="/proc/net/wireless"):
+    levels = {}
+    try:
+        with open(path, "r") as f:
+            for line in f.readlines()[2:]:  # skip the two header lines
+                interface, _, fields = line.partition(":")
+                fields = fields.split()
+                if len(fields) >= 3:
+                    levels[interface.strip()] = fields[2].rstrip(".")
+    except OSError:
+        pass
+    return levels
+
+# Function to read each interface's (operstate, carrier) from sysfs
+def read_link_states(path="/sys/class/net"):
+    states = {}
+    try:
+        interfaces = os.listdir(path)
+    except OSError:
+        return states
+    for interface in interfaces:
+        if interface == "lo":
+            continue
+        fields = []
+        for name in ("operstate", "carrier"):
+            try:
+                with open(os.path.join(path, interface, name), "r") as f:
+                    fields.append(f.read().strip())
+            except OSError:
+                fields.append(None)  # carrier is unreadable while the interface is down
+        states[interface] = tuple(fields)
+    return states
+
+# Wi-Fi fields served until the first refresh has run
+NO_WIFI_INFO = {"ssid": None, "mac_address": None, "signal_level": None}
+
+
+class MetadataProvider:
+    """
+    Cached host and network metadata for the upload payload.
+
+    Machine-id and hostname are read once per process. The iwconfig-derived
+    Wi-Fi fields are refreshed in a worker thread by run(), either when
+    `wifi_ttl` expires or when the network changes: the set of associated
+    interfaces in /proc/net/wireless, an interface's operstate or carrier
+    in sysfs (a roam to another SSID drops the carrier), or the local IP
+    address. In between, the signal level is taken from /proc/net/wireless.
+    get() only reads the cache and never blocks on a subprocess or DNS
+    lookup; until the first refresh the Wi-Fi fields are "Unknown".
+    """
+
+    def __init__(self, wifi_ttl=WIFI_TTL, poll_interval=POLL_INTERVAL):
+        self.wifi_ttl = wifi_ttl
+        self.poll_interval = poll_interval
+        self.hostname = socket.gethostname()
+        self.device_uuid = get_device_uuid()
+        self.ip_address = get_local_ip()
+        self.wifi_info = None
+        self._wireless = read_proc_wireless()
+        self._links = read_link_states()
+        self._wifi_refreshed = 0.0
+
+    def _refresh_wifi(self):
+        self.wifi_info = get_wifi_info()
+        self._wifi_refreshed = time.monotonic()
+
+    def _needs_refresh(self, wireless, links, ip_address):
+        if self.wifi_info is None:
+            return True
+        if set(wireless) != set(self._wireless):
+            return True  # an interface (dis)associated
+        if links != self._links or ip_address != self.ip_address:
+            return True  # link went up/down, lost carrier or moved network
+        return time.monotonic() - self._wifi_refreshed >= self.wifi_ttl
+
+    async def refresh(self):
+        """
+        Update the cached fields, running iwconfig in a thread only when needed.
+        """
+        wireless = read_proc_wireless()
+        links = read_link_states()
+        ip_address = get_local_ip()
+        if self._needs_refresh(wireless, links, ip_address):
+            await asyncio.to_thread(self._refresh_wifi)
+        self._wireless = wireless
+        self._links = links
+        self.ip_address = ip_address
+
+    async def run(self):
+        """
+        Keep the cache fresh in the background.
+        """
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"Error refreshing connection metadata: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def get(self):
+        """
+        Return the connection metadata dict from the cache.
+        """
+        # None only before run() (or refresh()) has completed once
+        wifi_info = self.wifi_info or NO_WIFI_INFO
+        signal_level = wifi_info['signal_level']
+        if self._wireless:
+            # /proc/net/wireless is cheap to read and more current than iwconfig
+            signal_level = next(iter(self._wireless.values()))
+
+        return {
+            "hostname": self.hostname,
+            "ip_address": self.ip_address,
+            "network_name": wifi_info['ssid'] if wifi_info['ssid'] else "Unknown",
+            "network_type": "Wi-Fi" if wifi_info['ssid'] else "Unknown",
+            "mac_address": wifi_info['mac_address'] if wifi_info['mac_address'] else "Unknown",
+            "signal_level": signal_level if signal_level else "Unknown",
+            "device_uuid": self.device_uuid
+        }
@@ -6,7 +6,7 @@ manufacturer_codes_4 = {
     0x0102: "Jawbone",
     0x0103: "Microsoft",
     0x0104: "Plantronics, Inc.",
-    0x0105: "Apple, Inc.",
+    0x0105: "Ubiquitous Computing Technology Corporation",  # iTag
     0x0106: "Broadcom Corporation",
     0x0107: "Samsung Electronics Co. Ltd.",
     0x0108: "Garmin International, Inc.",
@@ -22,5 +22,7 @@ manufacturer_codes_7 = {
     0x01A2: "Lattice Semiconductor",
     0x1447: "Silicon Laboratories (Silabs)",
     0x7427: "Abovelink Technology Co., Ltd.",
-    0x7171: "Sure-Fi Inc."
+    0x7171: "Sure-Fi Inc.",
+    0x0065: "HP, Inc.",
+    0x03FE: "Littelfuse"  # Lynk&Co
 }
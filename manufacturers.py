@@ -0,0 +1,136 @@
+import bisect
+import importlib
+import re
+import sys
+from array import array
+
+# Modules holding the built-in manufacturer tables, in merge order (later wins)
+TABLE_MODULES = ["m1", "m2", "m3", "m4", "m5", "m6", "m7"]
+
+_YAML_VALUE = re.compile(r"^\s*-?\s*value:\s*(0x[0-9A-Fa-f]+|\d+)\s*$")
+_YAML_NAME = re.compile(r"^\s*name:\s*(.*?)\s*$")
+
+
+class ManufacturerRegistry:
+    """
+    Compact lookup table of Bluetooth company identifiers.
+
+    Codes are kept in a sorted array('H') searched with bisect, with names in
+    a parallel list of interned strings, so repeated names share one object.
+    The built-in tables (m1-m7) are only imported on the first lookup.
+    """
+
+    def __init__(self, table_modules=TABLE_MODULES):
+        self.table_modules = table_modules
+        self._codes = None
+        self._names = None
+
+    def _ensure_loaded(self):
+        if self._codes is None:
+            merged = {}
+            for module_name in self.table_modules:
+                module = importlib.import_module(module_name)
+                table = getattr(module, f"manufacturer_codes_{module_name[1:]}")
+                merged.update(table)
+            self._build(merged)
+
+    def _build(self, mapping):
+        codes = sorted(code for code in mapping if 0 <= code <= 0xFFFF)
+        self._codes = array("H", codes)
+        self._names = [sys.intern(mapping[code]) for code in codes]
+
+    def _items(self):
+        self._ensure_loaded()
+        return zip(self._codes, self._names)
+
+    def get(self, code, default=None):
+        self._ensure_loaded()
+        index = bisect.bisect_left(self._codes, code)
+        if index < len(self._codes) and self._codes[index] == code:
+            return self._names[index]
+        return default
+
+    def __getitem__(self, code):
+        name = self.get(code)
+        if name is None:
+            raise KeyError(code)
+        return name
+
+    def __contains__(self, code):
+        return self.get(code) is not None
+
+    def __len__(self):
+        self._ensure_loaded()
+        return len(self._codes)
+
+    def update(self, mapping):
+        """
+        Add or replace entries from a {code: name} mapping.
+        """
+        merged = dict(self._items())
+        merged.update(mapping)
+        self._build(merged)
+
+    def load_file(self, path):
+        """
+        Merge a Bluetooth SIG company identifier list from a local file into
+        the table. Returns the number of entries read.
+        """
+        entries = load_company_identifiers(path)
+        self.update(entries)
+        return len(entries)
+
+
+def load_company_identifiers(path):
+    """
+    Read a company identifier list from a local file.
+    Supports the Bluetooth SIG company_identifiers.yaml layout
+    (`- value: 0x004C` followed by `name: 'Apple, Inc.'`) and simple
+    `code,name` / `code<TAB>name` lines, with codes in hex (0x...) or decimal
+    (leading zeros allowed). Lines that cannot be parsed are skipped and
+    counted in a printed summary. Returns a {code: name} dict.
+    """
+    entries = {}
+    skipped = 0
+    pending_code = None
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.lstrip().startswith("#"):
+                continue
+            match = _YAML_VALUE.match(line)
+            if match:
+                pending_code = _parse_code(match.group(1))
+                continue
+            match = _YAML_NAME.match(line)
+            if match and pending_code is not None:
+                entries[pending_code] = _unquote(match.group(1))
+                pending_code = None
+                continue
+            separator = "\t" if "\t" in line else ","
+            code, _, name = line.partition(separator)
+            try:
+                entries[_parse_code(code.strip())] = _unquote(name.strip())
+            except ValueError:
+                skipped += 1
+    if skipped:
+        print(f"Skipped {skipped} unparseable line(s) in {path}")
+    return entries
+
+
+def _parse_code(code):
+    # int(code, 0) would reject zero-padded decimal codes such as "0076"
+    return int(code, 16 if code.lower().startswith("0x") else 10)
+
+
+def _unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "'\"":
+        quote = value[0]
+        value = value[1:-1]
+        # YAML single-quoted strings escape quotes by doubling them
+        if quote == "'":
+            value = value.replace("''", "'")
+    return value
+
+
+# Shared registry used by ble.py and find_near_airtags.py
+registry = ManufacturerRegistry()
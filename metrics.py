@@ -0,0 +1,219 @@
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+# Default histogram buckets (seconds for latencies, counts for sizes)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_NULL_TIMER = nullcontext()
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "labels", "start")
+
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.name, time.perf_counter() - self.start, self.labels)
+
+
+class Metrics:
+    """
+    Minimal counters, gauges and histograms rendered in the Prometheus text
+    format, either served over HTTP or written to a file (e.g. for the
+    node_exporter textfile collector).
+
+    When disabled every call returns immediately, and time() hands back a
+    shared no-op context manager, so instrumented code pays only an attribute
+    check.
+    """
+
+    def __init__(self, enabled=False, prefix="ble_"):
+        self.enabled = enabled
+        self.prefix = prefix
+        self.help = {}
+        self.types = {}
+        self.values = {}  # (name, labels) -> float for counters and gauges
+        self.histograms = {}  # (name, labels) -> _Histogram
+        self.bucket_bounds = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name, kind, help_text, buckets=None):
+        self.types[name] = kind
+        self.help[name] = help_text
+        if buckets is not None:
+            self.bucket_bounds[name] = tuple(buckets)
+
+    def inc(self, name, value=1, labels=()):
+        if not self.enabled:
+            return
+        key = (name, labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def set(self, name, value, labels=()):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.values[(name, labels)] = value
+
+    def observe(self, name, value, labels=()):
+        if not self.enabled:
+            return
+        key = (name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = _Histogram(self.bucket_bounds.get(name, LATENCY_BUCKETS))
+            histogram.observe(value)
+
+    def time(self, stage):
+        """
+        Context manager recording the duration of a pipeline stage.
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, "stage_seconds", (("stage", stage),))
+
+    def collect(self):
+        """
+        Return the counters and histograms recorded since the last call and
+        reset them; a worker process hands these to the parent's merge().
+        Gauges are point-in-time values of the worker and are not included.
+        """
+        with self._lock:
+            counters = {key: value for key, value in self.values.items() if self.types.get(key[0]) != "gauge"}
+            histograms = {key: (histogram.counts, histogram.sum, histogram.count)
+                          for key, histogram in self.histograms.items()}
+            self.values.clear()
+            self.histograms.clear()
+        return counters, histograms
+
+    def merge(self, collected):
+        """
+        Add counters and histograms returned by another process's collect().
+        """
+        if not self.enabled or not collected:
+            return
+        counters, histograms = collected
+        with self._lock:
+            for key, value in counters.items():
+                self.values[key] = self.values.get(key, 0) + value
+            for key, (counts, total, count) in histograms.items():
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    histogram = self.histograms[key] = _Histogram(self.bucket_bounds.get(key[0], LATENCY_BUCKETS))
+                for index, bucket_count in enumerate(counts):
+                    histogram.counts[index] += bucket_count
+                histogram.sum += total
+                histogram.count += count
+
+    def render(self):
+        """
+        Return all metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        with self._lock:
+            names = sorted({key[0] for key in self.values} | {key[0] for key in self.histograms})
+            for name in names:
+                full_name = self.prefix + name
+                if name in self.help:
+                    lines.append(f"# HELP {full_name} {self.help[name]}")
+                lines.append(f"# TYPE {full_name} {self.types.get(name, 'untyped')}")
+                for (metric, labels), value in sorted(self.values.items()):
+                    if metric == name:
+                        lines.append(f"{full_name}{_label_text(labels)} {value}")
+                for (metric, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{full_name}_bucket{_label_text(labels + (('le', bound),))} {cumulative}")
+                    lines.append(f"{full_name}_bucket{_label_text(labels + (('le', '+Inf'),))} {histogram.count}")
+                    lines.append(f"{full_name}_sum{_label_text(labels)} {histogram.sum}")
+                    lines.append(f"{full_name}_count{_label_text(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_file(self, path):
+        """
+        Atomically write the rendered metrics to `path`.
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def serve(self, port, host="127.0.0.1"):
+        """
+        Serve /metrics from a daemon thread. Returns the server.
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+# Shared instance used by the scan pipeline; enabled by ble.main when configured
+metrics = Metrics()
+metrics.describe("stage_seconds", "histogram", "Latency of each scan pipeline stage in seconds.")
+metrics.describe("advertisements_total", "counter", "Advertisements received from the scanner.")
+metrics.describe("advertisements_dropped_total", "counter", "Advertisements dropped because the scanner queue was full.")
+metrics.describe("devices_per_cycle", "histogram", "Devices reported per flush.", buckets=SIZE_BUCKETS)
+metrics.describe("scanner_queue_depth", "gauge", "Advertisements waiting in the scanner queue.")
+metrics.describe("upload_queue_depth", "gauge", "Payloads waiting to be uploaded.")
+metrics.describe("uuid_cache_hits_total", "counter", "MAC -> UUID derivations served from the cache.")
+metrics.describe("uuid_cache_misses_total", "counter", "MAC -> UUID derivations computed.")
+metrics.describe("uuid_cache_size", "gauge", "Entries in the MAC -> UUID cache (not reported in process mode).")
+metrics.describe("payload_cache_hits_total", "counter", "Manufacturer/service data payloads decoded from the cache.")
+metrics.describe("payload_cache_misses_total", "counter", "Manufacturer/service data payloads parsed.")
+metrics.describe("upload_bytes_total", "counter", "Request body bytes sent to the webhook.")
+metrics.describe("upload_requests_total", "counter", "Upload requests by result.")
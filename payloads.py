@@ -0,0 +1,217 @@
+import struct
+from collections import OrderedDict
+
+# Decoded payloads kept per registry; beacons repeat identical frames, so
+# most advertisements are served from here
+CACHE_SIZE = 8192
+
+# Eddystone frames are carried in service data under this 16-bit UUID
+EDDYSTONE_UUID = "0000feaa-0000-1000-8000-00805f9b34fb"
+
+# Eddystone advertises its TX power at 0 m; calibrated power at 1 m is ~41 dB lower
+EDDYSTONE_1M_LOSS = 41
+
+_IBEACON = struct.Struct(">16sHHb")
+_EDDYSTONE_UID = struct.Struct(">b10s6s")
+_EDDYSTONE_TLM = struct.Struct(">BHhII")
+_INT16 = struct.Struct(">h")
+_UINT16 = struct.Struct(">H")
+
+# Apple Continuity message types
+_APPLE_TYPES = {
+    0x05: "airdrop",
+    0x07: "proximity_pairing",
+    0x09: "airplay_target",
+    0x0C: "handoff",
+    0x0F: "nearby_action",
+    0x10: "nearby_info",
+    0x12: "find_my",
+}
+# Find My status byte, bits 4-5
+_FIND_MY_DEVICES = ("apple_device", "airtag", "find_my_accessory", "airpods")
+_FIND_MY_BATTERY = ("full", "medium", "low", "critical")
+
+_URL_SCHEMES = ("http://www.", "https://www.", "http://", "https://")
+_URL_EXPANSIONS = (".com/", ".org/", ".edu/", ".net/", ".info/", ".biz/", ".gov/",
+                   ".com", ".org", ".edu", ".net", ".info", ".biz", ".gov")
+
+
+def decode_ibeacon(body):
+    proximity_uuid, major, minor, measured_power = _IBEACON.unpack_from(body)
+    return {"type": "ibeacon", "proximity_uuid": proximity_uuid.hex(), "major": major, "minor": minor,
+            "tx_power": measured_power}
+
+
+def decode_find_my(body):
+    status = body[0]
+    return {
+        "type": "find_my",
+        "device": _FIND_MY_DEVICES[(status >> 4) & 0x03],
+        "battery": _FIND_MY_BATTERY[(status >> 6) & 0x03],
+        # The full 25-byte frame is only sent while away from the owner
+        "separated": len(body) >= 25,
+    }
+
+
+def decode_apple(data):
+    """
+    Decode Apple (0x004C) manufacturer data: a sequence of type/length/value
+    Continuity messages. An iBeacon or Find My message wins over the others.
+    """
+    offset = 0
+    found = []
+    while offset + 2 <= len(data):
+        kind, length = data[offset], data[offset + 1]
+        body = data[offset + 2:offset + 2 + length]
+        if len(body) < length:
+            break
+        if kind == 0x02 and length == _IBEACON.size:
+            return decode_ibeacon(body)
+        if kind == 0x12 and length:
+            return decode_find_my(body)
+        found.append(_APPLE_TYPES.get(kind, f"0x{kind:02X}"))
+        offset += 2 + length
+    return {"type": "apple", "messages": found} if found else None
+
+
+def decode_eddystone(data):
+    """
+    Decode an Eddystone UID, URL, TLM or EID frame from service data.
+    """
+    frame = data[0]
+    if frame == 0x00:
+        tx_power, namespace, instance = _EDDYSTONE_UID.unpack_from(data, 1)
+        return {"type": "eddystone_uid", "namespace": namespace.hex(), "instance": instance.hex(),
+                "tx_power": tx_power - EDDYSTONE_1M_LOSS}
+    if frame == 0x10:
+        tx_power = struct.unpack_from(">b", data, 1)[0]
+        url = [_URL_SCHEMES[data[2]]]
+        for code in data[3:]:
+            url.append(_URL_EXPANSIONS[code] if code < len(_URL_EXPANSIONS) else chr(code))
+        return {"type": "eddystone_url", "url": "".join(url), "tx_power": tx_power - EDDYSTONE_1M_LOSS}
+    if frame == 0x20:
+        version, battery_mv, temperature, advertisements, uptime = _EDDYSTONE_TLM.unpack_from(data, 1)
+        return {"type": "eddystone_tlm", "version": version, "battery_mv": battery_mv,
+                "temperature": temperature / 256.0, "advertisements": advertisements, "uptime": uptime / 10.0}
+    if frame == 0x30:
+        return {"type": "eddystone_eid", "tx_power": struct.unpack_from(">b", data, 1)[0] - EDDYSTONE_1M_LOSS,
+                "eid": bytes(data[2:10]).hex()}
+    return None
+
+
+def decode_teltonika(data):
+    """
+    Decode Teltonika EYE sensor (0x089A) manufacturer data: a version byte, a
+    flags byte, then the sensor values announced by the flags, in flag order.
+    """
+    flags = data[1]
+    offset = 2
+    result = {"type": "teltonika_eye", "version": data[0], "low_battery": bool(flags & 0x40)}
+    if flags & 0x01:
+        result["temperature"] = _INT16.unpack_from(data, offset)[0] / 100.0
+        offset += 2
+    if flags & 0x02:
+        result["humidity"] = data[offset]
+        offset += 1
+    if flags & 0x04:
+        result["magnet"] = bool(flags & 0x08)
+    if flags & 0x10:
+        movement = _UINT16.unpack_from(data, offset)[0]
+        result["moving"] = bool(movement & 0x8000)
+        result["movement_count"] = movement & 0x7FFF
+        offset += 2
+    if flags & 0x20:
+        result["pitch"] = struct.unpack_from(">b", data, offset)[0]
+        result["roll"] = _INT16.unpack_from(data, offset + 1)[0]
+        offset += 3
+    if flags & 0x80:
+        result["battery_mv"] = 2000 + data[offset] * 10
+    return result
+
+
+class DecoderRegistry:
+    """
+    Pluggable decoders for manufacturer data (keyed by company ID) and
+    service data (keyed by service UUID).
+
+    A decoder takes a memoryview of the payload and returns a dict with at
+    least a "type" key (and "tx_power", the calibrated power at 1 m, when
+    the payload carries one), or None if it does not recognise the payload.
+    Results, including misses and malformed payloads, are cached in a
+    bounded LRU keyed by the payload bytes, so a repeating beacon frame is
+    parsed once. Cached dicts are shared and must not be modified.
+    """
+
+    def __init__(self, cache_size=CACHE_SIZE):
+        self.cache_size = cache_size
+        self.decoders = {}
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def register(self, key, decoder):
+        """
+        Register `decoder` for a company ID (int) or service UUID (str).
+        """
+        self.decoders[key] = decoder
+        self.cache.clear()
+
+    def decode(self, key, payload):
+        """
+        Decode one manufacturer or service data payload; None if unknown.
+        """
+        decoder = self.decoders.get(key)
+        if decoder is None or not payload:
+            return None
+        cache_key = (key, payload if isinstance(payload, bytes) else bytes(payload))
+        cached = self.cache.get(cache_key, self)
+        if cached is not self:
+            self.hits += 1
+            self.cache.move_to_end(cache_key)
+            return cached
+        self.misses += 1
+        try:
+            result = decoder(memoryview(cache_key[1]))
+        except (struct.error, IndexError):
+            result = None
+        self.cache[cache_key] = result
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return result
+
+    def decode_all(self, manufacturer_data, service_data=None):
+        """
+        Decode every recognised payload of an advertisement.
+        """
+        results = []
+        for source in (manufacturer_data, service_data):
+            if source:
+                for key, payload in source.items():
+                    result = self.decode(key, payload)
+                    if result is not None:
+                        results.append(result)
+        return results
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.cache)}
+
+
+def beacon_info(decoded):
+    """
+    Pick the beacon type and calibrated 1 m TX power out of decode_all()
+    results. Returns (type or None, tx_power or None).
+    """
+    beacon_type = tx_power = None
+    for result in decoded:
+        if beacon_type is None:
+            # Find My results name the kind of device (airtag, airpods, ...)
+            beacon_type = result.get("device", result["type"])
+        if tx_power is None:
+            tx_power = result.get("tx_power")
+    return beacon_type, tx_power
+
+
+decoders = DecoderRegistry()
+decoders.register(0x004C, decode_apple)
+decoders.register(0x089A, decode_teltonika)
+decoders.register(EDDYSTONE_UUID, decode_eddystone)
@@ -0,0 +1,306 @@
+import argparse
+import gzip
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from delta import SNAPSHOT_INTERVAL
+from distance import kalman_update
+
+# Observations older than this are ignored by the solver. Gateways in delta
+# mode only resend unchanged devices in their periodic snapshot (and report
+# departures explicitly), so their observations are kept for a snapshot
+# interval longer
+MAX_AGE = 30.0
+DELTA_MAX_AGE = SNAPSHOT_INTERVAL + MAX_AGE
+# A 2D fix needs at least three gateways
+MIN_GATEWAYS = 3
+
+
+def load_gateways(path):
+    """
+    Read gateway coordinates from a JSON file mapping each gateway's
+    device_uuid (machine-id) to [x, y] in meters.
+    Returns {device_uuid: np.array([x, y])}.
+    """
+    with open(path, "r") as f:
+        return {gateway: np.asarray(position[:2], dtype=np.float64) for gateway, position in json.load(f).items()}
+
+
+def iter_observations(payload):
+    """
+    Yield (device uuid, distance) pairs from one gateway payload, in either
+    the rows or the columns layout.
+    """
+    devices = payload.get("devices", [])
+    if payload.get("layout") == "columns":
+        pairs = zip(devices.get("uuid", []), devices.get("distance", []))
+    else:
+        pairs = ((device.get("uuid"), device.get("distance")) for device in devices)
+    for device_uuid, distance in pairs:
+        if device_uuid is not None and isinstance(distance, (int, float)) and distance > 0:
+            yield device_uuid, float(distance)
+
+
+def solve_positions(anchors, distances, weights):
+    """
+    Batched weighted linear least-squares trilateration.
+    Args:
+    - anchors: (N, K, 2) gateway coordinates per device, padded
+    - distances: (N, K) measured distances, padded
+    - weights: (N, K) weights, 0 for padding; column 0 is the reference gateway
+    Returns:
+    - (N, 2) positions
+    Each device's circle equations are linearized against its reference
+    gateway, 2 (p_i - p_0) . x = d_0^2 - d_i^2 + |p_i|^2 - |p_0|^2, and the
+    N 2x2 normal equations are solved in one np.linalg.solve call.
+    """
+    reference = anchors[:, :1, :]
+    a = 2.0 * (anchors[:, 1:, :] - reference)  # (N, K-1, 2)
+    b = (
+        distances[:, :1] ** 2 - distances[:, 1:] ** 2
+        + np.sum(anchors[:, 1:, :] ** 2, axis=2) - np.sum(reference ** 2, axis=2)
+    )  # (N, K-1)
+    w = weights[:, 1:]
+    aw = a * w[:, :, None]
+    normal = np.einsum("nki,nkj->nij", aw, a)
+    rhs = np.einsum("nki,nk->ni", aw, b)
+    # Regularize slightly so collinear gateways do not make the system singular
+    normal += np.eye(2) * 1e-9
+    return np.linalg.solve(normal, rhs[:, :, None])[:, :, 0]
+
+
+class PositionSmoother:
+    """
+    Per-device constant-position Kalman smoothing of solved fixes, using the
+    vectorized distance.kalman_update over all devices updated in a batch.
+    """
+
+    def __init__(self, process_variance=0.05, measurement_variance=1.0):
+        self.process_variance = process_variance
+        self.measurement_variance = measurement_variance
+        self.state = {}  # uuid -> (estimate (2,), error (2,))
+
+    def update(self, device_uuids, positions):
+        known = [i for i, device_uuid in enumerate(device_uuids) if device_uuid in self.state]
+        smoothed = positions.copy()
+        if known:
+            estimate = np.stack([self.state[device_uuids[i]][0] for i in known])
+            error = np.stack([self.state[device_uuids[i]][1] for i in known])
+            estimate, error = kalman_update(estimate, error, positions[known],
+                                            self.process_variance, self.measurement_variance)
+            smoothed[known] = estimate
+            for row, i in enumerate(known):
+                self.state[device_uuids[i]] = (estimate[row], error[row])
+        for i, device_uuid in enumerate(device_uuids):
+            if device_uuid not in self.state:
+                self.state[device_uuid] = (positions[i], np.full(2, self.measurement_variance))
+        return smoothed
+
+
+class PositioningEngine:
+    """
+    Collects per-gateway distances for each device UUID and periodically
+    solves every device seen by enough gateways in one batched solve.
+
+    Every post from a delta-mode gateway also refreshes the devices it has
+    reported and not removed, so a device it has not resent (because it did
+    not move) keeps its last distance. Full-mode gateways resend every
+    device they hear, so their observations simply expire after `max_age`.
+    Positions and smoothing state expire with a device's last observation.
+    """
+
+    def __init__(self, gateways, max_age=MAX_AGE, min_gateways=MIN_GATEWAYS, smoothing=True,
+                 delta_max_age=DELTA_MAX_AGE):
+        self.gateways = gateways
+        self.max_age = max_age
+        self.delta_max_age = delta_max_age
+        self.delta_gateways = set()
+        self.gateway_devices = {}  # gateway -> device uuids it has reported and not removed
+        self.min_gateways = min_gateways
+        self.smoother = PositionSmoother() if smoothing else None
+        self.observations = {}  # device uuid -> {gateway: (distance, time)}
+        self.positions = {}  # device uuid -> (x, y, time)
+        self.unknown_gateways = set()
+        self._lock = threading.Lock()
+
+    def ingest(self, payload, now=None):
+        """
+        Record the distances from one gateway payload (or a coalesced list of
+        them). Raises ValueError for anything that is not a payload object.
+        """
+        payloads = payload if isinstance(payload, list) else [payload]
+        if not all(isinstance(item, dict) for item in payloads):
+            raise ValueError("expected a payload object or a list of payload objects")
+        now = time.time() if now is None else now
+        for item in payloads:
+            self._ingest(item, now)
+
+    def _ingest(self, payload, now):
+        gateway = payload.get("device_uuid")
+        if gateway not in self.gateways:
+            self.unknown_gateways.add(gateway)
+            return
+        with self._lock:
+            if "report_type" in payload:
+                self.delta_gateways.add(gateway)
+            known = self.gateway_devices.setdefault(gateway, set())
+            for device_uuid in payload.get("removed", []):
+                self.observations.get(device_uuid, {}).pop(gateway, None)
+                known.discard(device_uuid)
+            if gateway in self.delta_gateways:
+                # The gateway is alive: devices it has not removed are still there
+                for device_uuid in known:
+                    seen = self.observations.get(device_uuid, {}).get(gateway)
+                    if seen is not None:
+                        self.observations[device_uuid][gateway] = (seen[0], now)
+            for device_uuid, distance in iter_observations(payload):
+                self.observations.setdefault(device_uuid, {})[gateway] = (distance, now)
+                known.add(device_uuid)
+
+    def solve(self, now=None):
+        """
+        Solve positions for every device with fresh distances from at least
+        `min_gateways` gateways. Returns the number of devices solved.
+        """
+        now = time.time() if now is None else now
+        cutoff = now - self.max_age
+        delta_cutoff = now - self.delta_max_age
+        device_uuids, rows = [], []
+        with self._lock:
+            for device_uuid, by_gateway in list(self.observations.items()):
+                fresh = [(distance, gateway) for gateway, (distance, seen) in by_gateway.items()
+                         if seen >= (delta_cutoff if gateway in self.delta_gateways else cutoff)]
+                if not fresh:
+                    del self.observations[device_uuid]
+                    for known in self.gateway_devices.values():
+                        known.discard(device_uuid)
+                    self.positions.pop(device_uuid, None)
+                    if self.smoother is not None:
+                        self.smoother.state.pop(device_uuid, None)
+                    continue
+                if len(fresh) >= self.min_gateways:
+                    fresh.sort()  # nearest gateway first: it becomes the reference
+                    device_uuids.append(device_uuid)
+                    rows.append(fresh)
+        if not rows:
+            return 0
+
+        width = max(len(row) for row in rows)
+        anchors = np.zeros((len(rows), width, 2))
+        distances = np.zeros((len(rows), width))
+        weights = np.zeros((len(rows), width))
+        for i, row in enumerate(rows):
+            for k, (distance, gateway) in enumerate(row):
+                anchors[i, k] = self.gateways[gateway]
+                distances[i, k] = distance
+                weights[i, k] = 1.0 / (distance * distance)  # nearer readings are more reliable
+
+        positions = solve_positions(anchors, distances, weights)
+        if self.smoother is not None:
+            positions = self.smoother.update(device_uuids, positions)
+        with self._lock:
+            for device_uuid, (x, y) in zip(device_uuids, positions.tolist()):
+                self.positions[device_uuid] = (x, y, now)
+        return len(device_uuids)
+
+    def snapshot(self):
+        with self._lock:
+            return {device_uuid: {"x": x, "y": y, "timestamp": ts} for device_uuid, (x, y, ts) in self.positions.items()}
+
+
+def decode_body(body, content_encoding=None):
+    if content_encoding == "gzip":
+        body = gzip.decompress(body)
+    return json.loads(body)
+
+
+def serve_http(engine, port, host="0.0.0.0"):
+    """
+    Accept gateway payloads on POST (same format as the webhook) and serve
+    the latest positions on GET.
+    """
+
+    class AggregatorHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            try:
+                engine.ingest(decode_body(body, self.headers.get("Content-Encoding")))
+                status = 200
+            except (ValueError, TypeError, AttributeError, OSError):
+                # Not JSON, not a payload object/array, or malformed devices
+                status = 400
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def do_GET(self):
+            body = json.dumps(engine.snapshot()).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), AggregatorHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def serve_udp(engine, port, host="0.0.0.0"):
+    """
+    Accept gateway payloads as single JSON (optionally gzipped) datagrams.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((host, port))
+
+    def receive():
+        while True:
+            datagram, _ = sock.recvfrom(65535)
+            try:
+                encoding = "gzip" if datagram[:2] == b"\x1f\x8b" else None
+                engine.ingest(decode_body(datagram, encoding))
+            except (ValueError, TypeError, AttributeError, OSError) as e:
+                print(f"Dropping malformed datagram: {e}")
+
+    threading.Thread(target=receive, daemon=True).start()
+    return sock
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-gateway BLE positioning aggregator")
+    parser.add_argument("--gateways", required=True, help="JSON file mapping gateway device_uuid to [x, y]")
+    parser.add_argument("--http-port", type=int, default=8090)
+    parser.add_argument("--udp-port", type=int, default=0, help="also accept payloads over UDP on this port")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between solves")
+    parser.add_argument("--max-age", type=float, default=MAX_AGE)
+    parser.add_argument("--delta-max-age", type=float, default=DELTA_MAX_AGE,
+                        help="max age for gateways in delta mode (at least their snapshot interval)")
+    parser.add_argument("--no-smoothing", action="store_true")
+    args = parser.parse_args()
+
+    engine = PositioningEngine(load_gateways(args.gateways), max_age=args.max_age, smoothing=not args.no_smoothing,
+                               delta_max_age=args.delta_max_age)
+    serve_http(engine, args.http_port)
+    if args.udp_port:
+        serve_udp(engine, args.udp_port)
+    print(f"Positioning aggregator listening on :{args.http_port}")
+    while True:
+        started = time.perf_counter()
+        solved = engine.solve()
+        if solved:
+            print(f"Solved {solved} device(s) in {(time.perf_counter() - started) * 1000:.1f} ms")
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import asyncio
+from collections import deque
+
+from metrics import metrics
+
+metrics.describe("processing_in_flight", "gauge", "Batches submitted to the processing stage and not yet collected.")
+metrics.describe("processing_batches_total", "counter", "Batches processed by the processing stage.")
+metrics.describe("processing_backpressure_waits_total", "counter",
+                 "Times the scan loop waited because max_pending batches were in flight.")
+
+# Set in a worker process on its first task
+_worker_started = False
+
+
+def _call_in_worker(function, collect, batch, *args):
+    """
+    Run `function` in a worker process and return its result together with
+    the counters and stage timings it recorded (or None when the parent has
+    metrics disabled), for the parent to merge.
+    """
+    global _worker_started
+    if not _worker_started:
+        # A forked worker inherits the parent's values; count from zero
+        _worker_started = True
+        metrics.collect()
+    metrics.enabled = collect
+    result = function(batch, *args)
+    return result, metrics.collect() if collect else None
+
+
+class ProcessingStage:
+    """
+    Runs the CPU-bound per-batch work (`function(batch, *args)` returning a
+    list) off the event loop.
+
+    - "inline": call the function directly on the event loop thread (small
+      deployments, no overhead).
+    - "thread": one worker thread; the function's module state (device
+      filters, caches) stays in this process and is only touched by it.
+    - "process": `workers` single-process pools; each batch is sharded by
+      device address, so every device always lands on the same worker and
+      its state stays consistent, while shards run in parallel. Workers
+      send the counters and stage timings they record (cache hits, filter
+      and classify latencies, ...) back with each result and they are
+      merged into the parent's metrics; gauges set in a worker are not.
+
+    Each worker runs its tasks in submission order. At most `max_pending`
+    batches are in flight; beyond that the caller waits, so backpressure
+    reaches the scanner queue, where drops are counted.
+
+    With an `on_result` callback, each result is handed to it as soon as its
+    batch (and every batch submitted before it) has finished, instead of
+    being returned by the next submit() or drain(); a batch that raised is
+    reported and skipped.
+    """
+
+    def __init__(self, function, mode="inline", workers=1, max_pending=4, on_result=None):
+        if mode not in ("inline", "thread", "process"):
+            raise ValueError(f"Unknown processing mode: {mode}")
+        self.function = function
+        self.mode = mode
+        self.max_pending = max_pending
+        self.on_result = on_result
+        self.pending = deque()
+        # concurrent.futures (and multiprocessing) only load when a mode needs them
+        if mode == "thread":
+            from concurrent.futures import ThreadPoolExecutor
+
+            self.executors = [ThreadPoolExecutor(max_workers=1)]
+        elif mode == "process":
+            from concurrent.futures import ProcessPoolExecutor
+
+            self.executors = [ProcessPoolExecutor(max_workers=1) for _ in range(max(1, workers))]
+        else:
+            self.executors = []
+
+    def _shards(self, batch):
+        shards = [[] for _ in self.executors]
+        count = len(shards)
+        for item in batch:
+            shards[hash(item.address) % count].append(item)
+        return shards
+
+    def _call(self, loop, executor, batch, args):
+        if self.mode == "process":
+            return loop.run_in_executor(executor, _call_in_worker, self.function, metrics.enabled, batch, *args)
+        return loop.run_in_executor(executor, self.function, batch, *args)
+
+    async def _run(self, batch, args):
+        loop = asyncio.get_running_loop()
+        if len(self.executors) == 1:
+            results = [await self._call(loop, self.executors[0], batch, args)]
+        else:
+            results = await asyncio.gather(*(
+                self._call(loop, executor, shard, args)
+                for executor, shard in zip(self.executors, self._shards(batch)) if shard
+            ))
+        if self.mode != "process":
+            return results[0]
+        for _, collected in results:
+            metrics.merge(collected)
+        return [record for result, _ in results for record in result]
+
+    async def submit(self, batch, *args):
+        """
+        Queue a batch for processing. Returns the results of every batch that
+        has finished in the meantime, oldest first (possibly an empty list;
+        always empty when results go to `on_result`).
+        """
+        if self.mode == "inline":
+            metrics.inc("processing_batches_total")
+            with metrics.time("process"):
+                result = self.function(batch, *args)
+            if self.on_result is not None:
+                self.on_result(result)
+                return []
+            return [result]
+
+        future = asyncio.ensure_future(self._timed(batch, args))
+        future.add_done_callback(self._completed)
+        self.pending.append(future)
+        if len(self.pending) >= self.max_pending:
+            metrics.inc("processing_backpressure_waits_total")
+            await asyncio.wait([self.pending[0]])
+        return self.poll()
+
+    def poll(self):
+        """
+        Return the results of the finished batches at the head of the queue,
+        oldest first, without waiting.
+        """
+        completed = []
+        if self.on_result is None:
+            while self.pending and self.pending[0].done():
+                completed.append(self.pending.popleft().result())
+        metrics.set("processing_in_flight", len(self.pending))
+        return completed
+
+    def _completed(self, future):
+        # Done callback: hand finished batches to on_result in submission order
+        if self.on_result is None:
+            return
+        while self.pending and self.pending[0].done():
+            done = self.pending.popleft()
+            if done.cancelled():
+                continue
+            try:
+                result = done.result()
+            except Exception as e:
+                print(f"Error processing batch: {e}")
+                continue
+            self.on_result(result)
+        metrics.set("processing_in_flight", len(self.pending))
+
+    async def _timed(self, batch, args):
+        with metrics.time("process"):
+            result = await self._run(batch, args)
+        metrics.inc("processing_batches_total")
+        return result
+
+    async def drain(self):
+        """
+        Wait for every in-flight batch and return their results, oldest first.
+        """
+        completed = []
+        while self.pending:
+            await asyncio.wait([self.pending[0]])
+            completed.extend(self.poll())
+        metrics.set("processing_in_flight", 0)
+        return completed
+
+    def close(self):
+        for future in self.pending:
+            future.cancel()
+        for executor in self.executors:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,309 @@
+import abc
+import asyncio
+import json
+import sys
+import time
+from collections import deque, namedtuple
+
+from device_tracker import new_filter
+from distance import DEFAULT_PATH_LOSS_EXPONENT, DEFAULT_TX_POWER
+from metrics import metrics
+from payloads import beacon_info, decoders as payload_decoders
+
+# Enter below ENTER_DISTANCE meters, leave above LEAVE_DISTANCE (the gap is
+# the hysteresis), dwell after DWELL_SECONDS inside; a device not heard for
+# LEAVE_TIMEOUT seconds leaves as well
+ENTER_DISTANCE = 2.0
+LEAVE_DISTANCE = 4.0
+DWELL_SECONDS = 30.0
+LEAVE_TIMEOUT = 10.0
+IDLE_TTL = 120.0
+
+metrics.describe("proximity_events_dropped_total", "counter",
+                 "Proximity events dropped because a sink's pending queue was full.")
+
+ProximityEvent = namedtuple(
+    "ProximityEvent",
+    ["kind", "address", "distance", "rssi", "timestamp", "dwell", "manufacturer_id", "beacon_type"],
+)
+
+
+class Watchlist:
+    """
+    Devices to watch, by manufacturer (company) ID or address prefix
+    ("AA:BB:CC"). An empty watchlist matches every device.
+    """
+
+    def __init__(self, manufacturer_ids=(), address_prefixes=()):
+        self.manufacturer_ids = frozenset(manufacturer_ids)
+        self.address_prefixes = tuple(prefix.upper() for prefix in address_prefixes)
+
+    def __bool__(self):
+        return bool(self.manufacturer_ids or self.address_prefixes)
+
+    def matches(self, advertisement):
+        if not self:
+            return True
+        if self.address_prefixes and advertisement.address.upper().startswith(self.address_prefixes):
+            return True
+        return not self.manufacturer_ids.isdisjoint(advertisement.manufacturer_data)
+
+
+class _DeviceState:
+    __slots__ = ("filter", "tx_power", "inside", "entered_at", "dwelled", "last_seen", "manufacturer_id",
+                 "beacon_type")
+
+    def __init__(self, rssi, tx_power, now, manufacturer_id, beacon_type):
+        self.filter = new_filter(rssi)
+        self.tx_power = tx_power
+        self.inside = False
+        self.entered_at = None
+        self.dwelled = False
+        self.last_seen = now
+        self.manufacturer_id = manufacturer_id
+        self.beacon_type = beacon_type
+
+
+class ProximityEngine:
+    """
+    Streaming enter/leave/dwell detection, fed one advertisement at a time
+    from the scanner's detection callback.
+
+    Each watched device keeps a slotted state entry with a scalar Kalman
+    filter of its RSSI (device_tracker.new_filter, same tuning as
+    DeviceTracker), converted to a log-distance estimate using the
+    advertised calibrated power when the payload carries one. A device enters when its smoothed distance drops to
+    `enter_distance`, leaves when it rises to `leave_distance` or it has not
+    been heard for `leave_timeout` seconds, and dwells once after
+    `dwell_seconds` inside. Events are handed to every sink as soon as they
+    happen; run() drives the timeouts and the sinks' delivery tasks.
+    """
+
+    def __init__(self, sinks=(), watchlist=None, enter_distance=ENTER_DISTANCE, leave_distance=LEAVE_DISTANCE,
+                 dwell_seconds=DWELL_SECONDS, leave_timeout=LEAVE_TIMEOUT, idle_ttl=IDLE_TTL,
+                 path_loss_exponent=DEFAULT_PATH_LOSS_EXPONENT):
+        if leave_distance < enter_distance:
+            raise ValueError("leave_distance must not be smaller than enter_distance")
+        self.sinks = list(sinks)
+        self.watchlist = watchlist or Watchlist()
+        self.enter_distance = enter_distance
+        self.leave_distance = leave_distance
+        self.dwell_seconds = dwell_seconds
+        self.leave_timeout = leave_timeout
+        self.idle_ttl = idle_ttl
+        self.path_loss_exponent = path_loss_exponent
+        self.devices = {}  # address -> _DeviceState
+        self.observed = 0
+
+    def __len__(self):
+        return len(self.devices)
+
+    def distance(self, state):
+        return 10 ** ((state.tx_power - state.filter.posteri_estimate) / (10 * self.path_loss_exponent))
+
+    def _emit(self, kind, address, state, now):
+        event = ProximityEvent(
+            kind=kind,
+            address=address,
+            distance=round(self.distance(state), 2),
+            rssi=round(state.filter.posteri_estimate, 1),
+            timestamp=now,
+            dwell=round(now - state.entered_at, 1) if state.entered_at is not None else 0.0,
+            manufacturer_id=state.manufacturer_id,
+            beacon_type=state.beacon_type,
+        )
+        for sink in self.sinks:
+            sink.emit(event)
+        return event
+
+    def observe(self, advertisement):
+        """
+        Feed one Advertisement; returns the events it triggered (usually none).
+        """
+        rssi = advertisement.rssi
+        if rssi is None or not self.watchlist.matches(advertisement):
+            return []
+        self.observed += 1
+        now = advertisement.timestamp
+        address = advertisement.address
+        state = self.devices.get(address)
+        if state is None:
+            manufacturer_data = advertisement.manufacturer_data
+            beacon_type, tx_power = beacon_info(
+                payload_decoders.decode_all(manufacturer_data, advertisement.service_data))
+            state = self.devices[address] = _DeviceState(
+                rssi, tx_power if tx_power is not None else DEFAULT_TX_POWER, now,
+                next(iter(manufacturer_data), None) if manufacturer_data else None, beacon_type)
+        else:
+            state.filter.update(rssi)
+            state.last_seen = now
+
+        events = []
+        distance = self.distance(state)
+        if not state.inside:
+            if distance <= self.enter_distance:
+                state.inside = True
+                state.entered_at = now
+                state.dwelled = False
+                events.append(self._emit("enter", address, state, now))
+        elif distance >= self.leave_distance:
+            events.append(self._emit("leave", address, state, now))
+            state.inside = False
+            state.entered_at = None
+        elif not state.dwelled and now - state.entered_at >= self.dwell_seconds:
+            state.dwelled = True
+            events.append(self._emit("dwell", address, state, now))
+        return events
+
+    def sweep(self, now=None):
+        """
+        Fire dwell and timeout-leave events for devices that went quiet, and
+        forget devices idle for longer than `idle_ttl`. Returns the events.
+        """
+        if now is None:
+            now = time.time()
+        events = []
+        stale = []
+        for address, state in self.devices.items():
+            if state.inside:
+                if now - state.last_seen >= self.leave_timeout:
+                    events.append(self._emit("leave", address, state, now))
+                    state.inside = False
+                    state.entered_at = None
+                elif not state.dwelled and now - state.entered_at >= self.dwell_seconds:
+                    state.dwelled = True
+                    events.append(self._emit("dwell", address, state, now))
+            elif now - state.last_seen >= self.idle_ttl:
+                stale.append(address)
+        for address in stale:
+            del self.devices[address]
+        return events
+
+    async def run(self, sweep_interval=0.25):
+        """
+        Run the sinks' delivery tasks and sweep for timeouts until cancelled.
+        """
+        tasks = [asyncio.create_task(sink.run()) for sink in self.sinks if hasattr(sink, "run")]
+        try:
+            while True:
+                await asyncio.sleep(sweep_interval)
+                self.sweep()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+def format_event(event):
+    return json.dumps(event._asdict(), separators=(",", ":"))
+
+
+class StdoutSink:
+    """
+    Prints each event as it happens, as a JSON line or a readable sentence.
+    """
+
+    def __init__(self, stream=None, as_json=False):
+        self.stream = stream or sys.stdout
+        self.as_json = as_json
+
+    def emit(self, event):
+        if self.as_json:
+            line = format_event(event)
+        else:
+            when = time.strftime("%H:%M:%S", time.localtime(event.timestamp))
+            kind = f" ({event.beacon_type})" if event.beacon_type else ""
+            line = (f"{when} {event.kind.upper():5} {event.address}{kind}: {event.distance:.2f} m, "
+                    f"RSSI {event.rssi}" + (f", inside for {event.dwell:.0f} s" if event.kind != "enter" else ""))
+        print(line, file=self.stream, flush=True)
+
+
+class QueuedSink(abc.ABC):
+    """
+    Base for sinks that deliver off the callback path: emit() only appends
+    to a bounded deque and run() delivers whatever is pending with
+    deliver(events), which subclasses implement. When the deque is full the
+    oldest event is dropped; drops are counted in `dropped` and
+    proximity_events_dropped_total, and reported by run(). A failed
+    delivery is counted in `failures` and reported, and run() carries on.
+    """
+
+    def __init__(self, max_pending=1000):
+        self.pending = deque(maxlen=max_pending)
+        self.failures = 0
+        self.dropped = 0
+        self._reported_dropped = 0
+        self._ready = asyncio.Event()
+
+    def emit(self, event):
+        if len(self.pending) == self.pending.maxlen:
+            self.dropped += 1
+            metrics.inc("proximity_events_dropped_total", labels=(("sink", type(self).__name__),))
+        self.pending.append(event)
+        self._ready.set()
+
+    @abc.abstractmethod
+    async def deliver(self, events):
+        """
+        Deliver a list of ProximityEvent.
+        """
+
+    async def run(self):
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            events = list(self.pending)
+            self.pending.clear()
+            if self.dropped != self._reported_dropped:
+                print(f"Dropped {self.dropped - self._reported_dropped} proximity event(s) in "
+                      f"{type(self).__name__}: delivery is falling behind")
+                self._reported_dropped = self.dropped
+            try:
+                await self.deliver(events)
+            except Exception as e:
+                self.failures += 1
+                print(f"Error delivering {len(events)} proximity event(s) via {type(self).__name__}: {e}")
+
+
+class WebhookSink(QueuedSink):
+    """
+    POSTs pending events as a JSON array to a (local) webhook.
+    """
+
+    def __init__(self, url, timeout=2.0, max_pending=1000):
+        super().__init__(max_pending)
+        self.url = url
+        self.timeout = timeout
+
+    def _post(self, body):
+        import urllib.request
+
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+    async def deliver(self, events):
+        body = json.dumps([event._asdict() for event in events], separators=(",", ":")).encode("utf-8")
+        await asyncio.to_thread(self._post, body)
+
+
+class UnixSocketSink(QueuedSink):
+    """
+    Writes events as JSON lines to a listener on a Unix domain socket,
+    reconnecting on the next delivery after a failure.
+    """
+
+    def __init__(self, path, max_pending=1000):
+        super().__init__(max_pending)
+        self.path = path
+        self._writer = None
+
+    async def deliver(self, events):
+        if self._writer is None:
+            _, self._writer = await asyncio.open_unix_connection(self.path)
+        try:
+            self._writer.write("".join(format_event(event) + "\n" for event in events).encode("utf-8"))
+            await self._writer.drain()
+        except OSError:
+            self._writer.close()
+            self._writer = None
+            raise
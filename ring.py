@@ -0,0 +1,470 @@
+import argparse
+import asyncio
+import mmap
+import os
+import struct
+import tempfile
+import uuid
+
+from scanner import Advertisement, StreamingScanner, advertisement_from_bleak
+
+# The publisher and its consumers share this file, memory-mapped; /dev/shm
+# keeps it in RAM on Linux
+RING_PATH = os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+                         "ble-advertisements.ring")
+RING_CAPACITY = 32768
+RECORD_SIZE = 256
+POLL_INTERVAL = 0.02
+
+MAGIC = b"BLERING2"
+# magic, capacity, record size, generation (bumped by every publisher start),
+# sequence number of the last record written
+_HEADER = struct.Struct("<8sIIQQ")
+_GENERATION_OFFSET = 16
+_WRITE_SEQ_OFFSET = 24
+_SEQ = struct.Struct("<Q")
+# seq, timestamp, rssi, tx_power, flags, address/name/adapter/extra lengths,
+# address, name, adapter; manufacturer and service data follow in the extra area
+_RECORD = struct.Struct("<QdhbBBBBH36s32s8s")
+_EXTRA_SIZE = RECORD_SIZE - _RECORD.size
+
+_HAS_RSSI = 0x01
+_HAS_TX_POWER = 0x02
+_TRUNCATED = 0x04
+
+# Entries of the extra area: a tag byte followed by the entry
+_MANUFACTURER = 0x01  # company ID (H), length (B), data
+_SERVICE_DATA_16 = 0x02  # 16-bit UUID (H), length (B), data
+_SERVICE_DATA_128 = 0x03  # 128-bit UUID (16s), length (B), data
+_SERVICE_UUID_16 = 0x04  # 16-bit UUID (H)
+_SERVICE_UUID_128 = 0x05  # 128-bit UUID (16s)
+_TAG_U16 = struct.Struct("<BH")
+_TAG_U16_LEN = struct.Struct("<BHB")
+_TAG_U128 = struct.Struct("<B16s")
+_TAG_U128_LEN = struct.Struct("<B16sB")
+
+_BASE_UUID_SUFFIX = "-0000-1000-8000-00805f9b34fb"
+
+
+def _short_uuid(service):
+    """
+    Return the 16-bit form of a Bluetooth base UUID, or None.
+    """
+    if len(service) == 36 and service.startswith("0000") and service.endswith(_BASE_UUID_SUFFIX):
+        return int(service[4:8], 16)
+    return None
+
+
+def _long_uuid(value):
+    return f"0000{value:04x}{_BASE_UUID_SUFFIX}"
+
+
+def _encode_text(value, size):
+    data = value.encode("utf-8") if value else b""
+    if len(data) > size:
+        # Do not cut a multi-byte character in half
+        data = data[:size].decode("utf-8", "ignore").encode("utf-8")
+    return data, len(data)
+
+
+def _encode_extra(advertisement):
+    """
+    Pack manufacturer data, service data and service UUIDs into the extra
+    area. Returns (bytes, truncated).
+    """
+    entries = []
+    for company, data in (advertisement.manufacturer_data or {}).items():
+        entries.append(_TAG_U16_LEN.pack(_MANUFACTURER, company, len(data)) + bytes(data))
+    for service, data in (advertisement.service_data or {}).items():
+        short = _short_uuid(service)
+        if short is not None:
+            entries.append(_TAG_U16_LEN.pack(_SERVICE_DATA_16, short, len(data)) + bytes(data))
+        else:
+            entries.append(_TAG_U128_LEN.pack(_SERVICE_DATA_128, uuid.UUID(service).bytes, len(data)) + bytes(data))
+    for service in advertisement.service_uuids or ():
+        short = _short_uuid(service)
+        if short is not None:
+            entries.append(_TAG_U16.pack(_SERVICE_UUID_16, short))
+        else:
+            entries.append(_TAG_U128.pack(_SERVICE_UUID_128, uuid.UUID(service).bytes))
+    parts = []
+    used = 0
+    for entry in entries:
+        if used + len(entry) > _EXTRA_SIZE:
+            return b"".join(parts), True
+        parts.append(entry)
+        used += len(entry)
+    return b"".join(parts), False
+
+
+def decode_record(view):
+    """
+    Decode one record (a memoryview of RECORD_SIZE bytes) into an Advertisement.
+    """
+    (_, timestamp, rssi, tx_power, flags, address_length, name_length, adapter_length, extra_length,
+     address, name, adapter) = _RECORD.unpack_from(view)
+    manufacturer_data = {}
+    service_data = {}
+    service_uuids = []
+    extra = view[_RECORD.size:_RECORD.size + extra_length]
+    offset = 0
+    while offset < extra_length:
+        tag = extra[offset]
+        if tag == _MANUFACTURER or tag == _SERVICE_DATA_16:
+            _, key, length = _TAG_U16_LEN.unpack_from(extra, offset)
+            offset += _TAG_U16_LEN.size
+            data = bytes(extra[offset:offset + length])
+            offset += length
+            if tag == _MANUFACTURER:
+                manufacturer_data[key] = data
+            else:
+                service_data[_long_uuid(key)] = data
+        elif tag == _SERVICE_DATA_128:
+            _, key, length = _TAG_U128_LEN.unpack_from(extra, offset)
+            offset += _TAG_U128_LEN.size
+            service_data[str(uuid.UUID(bytes=key))] = bytes(extra[offset:offset + length])
+            offset += length
+        elif tag == _SERVICE_UUID_16:
+            service_uuids.append(_long_uuid(_TAG_U16.unpack_from(extra, offset)[1]))
+            offset += _TAG_U16.size
+        else:
+            service_uuids.append(str(uuid.UUID(bytes=_TAG_U128.unpack_from(extra, offset)[1])))
+            offset += _TAG_U128.size
+    extra.release()
+    return Advertisement(
+        timestamp=timestamp,
+        address=address[:address_length].decode("utf-8"),
+        name=name[:name_length].decode("utf-8", "replace") if name_length else None,
+        rssi=rssi if flags & _HAS_RSSI else None,
+        manufacturer_data=manufacturer_data,
+        service_uuids=service_uuids,
+        tx_power=tx_power if flags & _HAS_TX_POWER else None,
+        adapter=adapter[:adapter_length].decode("utf-8") if adapter_length else None,
+        service_data=service_data,
+    )
+
+
+def _map_ring(path):
+    """
+    Map an existing ring file read-write; None if there is none at `path`.
+    """
+    try:
+        fd = os.open(path, os.O_RDWR)
+    except FileNotFoundError:
+        return None
+    try:
+        if os.fstat(fd).st_size < _HEADER.size:
+            return None
+        ring = mmap.mmap(fd, 0)
+    finally:
+        os.close(fd)
+    if ring[:len(MAGIC)] != MAGIC:
+        ring.close()
+        return None
+    return ring
+
+
+def _create_ring(path, capacity, generation):
+    """
+    Create a ring file next to `path`, write its header and move it into
+    place atomically. Returns its read-write map.
+    """
+    size = _HEADER.size + capacity * RECORD_SIZE
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", dir=os.path.dirname(path) or ".")
+    try:
+        os.fchmod(fd, 0o644)
+        os.ftruncate(fd, size)
+        ring = mmap.mmap(fd, size)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    finally:
+        os.close(fd)
+    _HEADER.pack_into(ring, 0, MAGIC, capacity, RECORD_SIZE, generation, 0)
+    os.replace(tmp_path, path)
+    return ring
+
+
+class RingWriter:
+    """
+    Single publisher of a fixed-record ring buffer of advertisements in a
+    memory-mapped file.
+
+    Each slot holds one RECORD_SIZE record stamped with its sequence number.
+    A slot's sequence is cleared before the record is rewritten and set
+    afterwards, and the header's write sequence is bumped last, so readers
+    can tell a record that was overwritten under them. Names are truncated to
+    32 bytes, and manufacturer/service data that does not fit the record is
+    dropped (the record is flagged as truncated).
+
+    Every start bumps the header's generation. A ring of the same capacity
+    is reused in place; otherwise a new file replaces it atomically and the
+    old file's generation is bumped too, so readers still mapping it reopen
+    the path instead of faulting on a resized mapping.
+    """
+
+    def __init__(self, path=RING_PATH, capacity=RING_CAPACITY):
+        self.path = path
+        self.capacity = capacity
+        self.truncated = 0
+        previous = _map_ring(path)
+        self.generation = (_SEQ.unpack_from(previous, _GENERATION_OFFSET)[0] if previous is not None else 0) + 1
+        if previous is not None and len(previous) == _HEADER.size + capacity * RECORD_SIZE:
+            self._map = previous
+            # Reset the head before announcing the generation, so a reader
+            # never pairs the new generation with the old head
+            _SEQ.pack_into(self._map, _WRITE_SEQ_OFFSET, 0)
+            _SEQ.pack_into(self._map, _GENERATION_OFFSET, self.generation)
+        else:
+            self._map = _create_ring(path, capacity, self.generation)
+            if previous is not None:
+                _SEQ.pack_into(previous, _GENERATION_OFFSET, self.generation)
+                previous.close()
+        self.write_seq = 0
+
+    def write(self, advertisement):
+        seq = self.write_seq + 1
+        offset = _HEADER.size + (seq - 1) % self.capacity * RECORD_SIZE
+        address, address_length = _encode_text(advertisement.address, 36)
+        name, name_length = _encode_text(advertisement.name, 32)
+        adapter, adapter_length = _encode_text(advertisement.adapter, 8)
+        extra, truncated = _encode_extra(advertisement)
+        flags = ((_HAS_RSSI if advertisement.rssi is not None else 0)
+                 | (_HAS_TX_POWER if advertisement.tx_power is not None else 0)
+                 | (_TRUNCATED if truncated else 0))
+        self.truncated += truncated
+        _RECORD.pack_into(self._map, offset, 0, advertisement.timestamp,
+                          advertisement.rssi if advertisement.rssi is not None else 0,
+                          advertisement.tx_power if advertisement.tx_power is not None else 0,
+                          flags, address_length, name_length, adapter_length, len(extra), address, name, adapter)
+        self._map[offset + _RECORD.size:offset + _RECORD.size + len(extra)] = extra
+        _SEQ.pack_into(self._map, offset, seq)
+        _SEQ.pack_into(self._map, _WRITE_SEQ_OFFSET, seq)
+        self.write_seq = seq
+
+    def close(self):
+        self._map.close()
+
+
+class RingReader:
+    """
+    One consumer's cursor into a ring written by RingWriter.
+
+    Readers never block the writer or each other; each keeps its own
+    position. A reader that falls more than `capacity` records behind skips
+    ahead to the oldest record still in the ring, and records overwritten
+    while being read are discarded; both are counted in `lost`. When the
+    header's generation changes (the publisher restarted), the reader
+    reopens the path and starts from the first record of the new run;
+    these are counted in `restarts`.
+    """
+
+    def __init__(self, path=RING_PATH, from_start=False):
+        self.path = path
+        self._open()
+        head = self.head()
+        self.next_seq = max(1, head - self.capacity + 1) if from_start else head + 1
+        self.lost = 0
+        self.overruns = 0
+        self.restarts = 0
+
+    def _open(self):
+        fd = os.open(self.path, os.O_RDONLY)
+        try:
+            self._map = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        finally:
+            os.close(fd)
+        self._view = memoryview(self._map)
+        magic, self.capacity, record_size, self.generation, _ = _HEADER.unpack_from(self._view)
+        if magic != MAGIC or record_size != RECORD_SIZE:
+            self.close()
+            raise ValueError(f"{self.path} is not an advertisement ring")
+
+    def _current_generation(self):
+        return _SEQ.unpack_from(self._view, _GENERATION_OFFSET)[0]
+
+    def _follow_restart(self):
+        """
+        Reopen the ring if the publisher restarted since the last read.
+        """
+        if self._current_generation() == self.generation:
+            return
+        self.close()
+        self._open()
+        self.next_seq = 1
+        self.restarts += 1
+
+    def head(self):
+        return _SEQ.unpack_from(self._view, _WRITE_SEQ_OFFSET)[0]
+
+    def pending(self):
+        return max(0, self.head() - self.next_seq + 1)
+
+    def _slot(self, seq):
+        offset = _HEADER.size + (seq - 1) % self.capacity * RECORD_SIZE
+        return self._view[offset:offset + RECORD_SIZE]
+
+    def views(self, max_records=None):
+        """
+        Yield (seq, memoryview) for each new record, without copying. A view
+        is only valid until the writer wraps around to its slot; check it
+        with is_current(seq, view) after reading what you need, and release
+        views before close().
+        """
+        self._follow_restart()
+        head = self.head()
+        if head < self.next_seq - 1:
+            # The publisher is restarting in place (head reset, generation
+            # not yet bumped)
+            self.next_seq = 1
+        if head - self.next_seq + 1 > self.capacity:
+            skipped = head - self.capacity + 1 - self.next_seq
+            self.lost += skipped
+            self.overruns += 1
+            self.next_seq += skipped
+        end = head if max_records is None else min(head, self.next_seq + max_records - 1)
+        while self.next_seq <= end:
+            seq = self.next_seq
+            self.next_seq += 1
+            view = self._slot(seq)
+            if _SEQ.unpack_from(view)[0] != seq:
+                view.release()
+                self.lost += 1
+                continue
+            yield seq, view
+
+    def is_current(self, seq, view):
+        """
+        True if the record at `view` was not overwritten since it was yielded.
+        """
+        if _SEQ.unpack_from(view)[0] == seq and self._current_generation() == self.generation:
+            return True
+        self.lost += 1
+        return False
+
+    def read(self, max_records=None):
+        """
+        Return the new records as Advertisements.
+        """
+        advertisements = []
+        for seq, view in self.views(max_records):
+            with view:
+                advertisement = decode_record(view)
+                if self.is_current(seq, view):
+                    advertisements.append(advertisement)
+        return advertisements
+
+    def close(self):
+        self._view.release()
+        self._map.close()
+
+
+class RingScanner(StreamingScanner):
+    """
+    Scanner backend that consumes a ring published by another process
+    instead of using the radio, with the same batching interface as
+    StreamingScanner. Ring overruns are counted in `dropped`.
+    """
+
+    def __init__(self, path=RING_PATH, flush_interval=5.0, max_batch_size=500, max_queue_size=10000,
+                 poll_interval=POLL_INTERVAL):
+        super().__init__(flush_interval, max_batch_size, max_queue_size)
+        self.path = path
+        self.poll_interval = poll_interval
+        self.reader = None
+        self._task = None
+
+    async def _poll(self):
+        lost = 0
+        while True:
+            if not self.paused:
+                for advertisement in self.reader.read(self.queue.maxsize or None):
+                    try:
+                        self.queue.put_nowait(advertisement)
+                    except asyncio.QueueFull:
+                        self.dropped += 1
+                self.dropped += self.reader.lost - lost
+                lost = self.reader.lost
+            await asyncio.sleep(self.poll_interval)
+
+    async def start(self):
+        self.reader = RingReader(self.path)
+        self._task = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+    async def pause(self):
+        self.paused = True
+
+    async def resume(self):
+        self.paused = False
+
+
+async def publish(writer, adapters=None):
+    """
+    Scan on each adapter and write every advertisement to the ring straight
+    from the detection callback. Runs until cancelled.
+    """
+    from bleak import BleakScanner
+
+    scanners = []
+    for adapter in adapters or [None]:
+        def callback(device, advertisement_data, adapter=adapter):
+            writer.write(advertisement_from_bleak(device, advertisement_data, adapter=adapter))
+        scanners.append(BleakScanner(detection_callback=callback, **({"adapter": adapter} if adapter else {})))
+    await asyncio.gather(*(scanner.start() for scanner in scanners))
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await asyncio.gather(*(scanner.stop() for scanner in scanners), return_exceptions=True)
+
+
+async def tail(path, poll_interval=POLL_INTERVAL):
+    """
+    Print every advertisement published to the ring, reporting overruns.
+    """
+    reader = RingReader(path)
+    lost = 0
+    try:
+        while True:
+            for advertisement in reader.read():
+                print(f"{advertisement.timestamp:.3f} {advertisement.address} {advertisement.rssi} "
+                      f"{advertisement.name or ''} {advertisement.manufacturer_data or ''}")
+            if reader.lost != lost:
+                print(f"Overrun: {reader.lost - lost} advertisement(s) lost")
+                lost = reader.lost
+            await asyncio.sleep(poll_interval)
+    finally:
+        reader.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish the advertisement stream to a shared ring, or tail it")
+    parser.add_argument("command", choices=("publish", "tail"))
+    parser.add_argument("--path", default=RING_PATH)
+    parser.add_argument("--capacity", type=int, default=RING_CAPACITY, help="records kept in the ring")
+    parser.add_argument("--adapter", action="append", help="HCI adapter to scan on (repeatable)")
+    args = parser.parse_args()
+    try:
+        if args.command == "publish":
+            writer = RingWriter(args.path, args.capacity)
+            print(f"Publishing advertisements to {args.path} ({args.capacity} records)")
+            try:
+                asyncio.run(publish(writer, args.adapter))
+            finally:
+                writer.close()
+        else:
+            asyncio.run(tail(args.path))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
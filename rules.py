@@ -0,0 +1,233 @@
+import json
+import os
+import re
+from collections import OrderedDict
+
+# Default rules file, next to this module
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules.json")
+CACHE_SIZE = 10000
+
+# Base UUID used to expand 16-bit service UUIDs ("180d")
+_BASE_UUID = "0000{}-0000-1000-8000-00805f9b34fb"
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _normalize_service_uuid(value):
+    value = value.lower()
+    return _BASE_UUID.format(value) if len(value) == 4 else value
+
+
+def _parse_company_id(value):
+    return int(value, 0) if isinstance(value, str) else int(value)
+
+
+class Rule:
+    """
+    One declarative rule. Every condition present must hold (AND); each
+    condition matches if any of its listed values does (OR).
+
+    Supported keys: prefix, substring, regex (device name), manufacturer
+    (manufacturer name), manufacturer_id, service_uuid, min_rssi, max_rssi.
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.category = spec.get("category")
+        prefixes = _as_list(spec.get("prefix"))
+        name_patterns = (
+            ["^" + re.escape(prefix) for prefix in prefixes]
+            + [re.escape(substring) for substring in _as_list(spec.get("substring"))]
+            + _as_list(spec.get("regex"))
+        )
+        # Set when the name condition is literal prefixes only
+        self.name_prefixes = tuple(prefixes) if prefixes and len(name_patterns) == len(prefixes) else None
+        self.name_pattern = "|".join(f"(?:{pattern})" for pattern in name_patterns) or None
+        self.name_regex = re.compile(self.name_pattern) if self.name_pattern else None
+        self.manufacturer_names = frozenset(_as_list(spec.get("manufacturer")))
+        self.manufacturer_ids = frozenset(_parse_company_id(code) for code in _as_list(spec.get("manufacturer_id")))
+        self.service_uuids = frozenset(_normalize_service_uuid(value) for value in _as_list(spec.get("service_uuid")))
+        self.min_rssi = spec.get("min_rssi")
+        self.max_rssi = spec.get("max_rssi")
+
+    def matches_static(self, name, manufacturer_name, manufacturer_ids, service_uuids):
+        if self.name_regex is not None and not (name and self.name_regex.search(name)):
+            return False
+        if self.manufacturer_names and manufacturer_name not in self.manufacturer_names:
+            return False
+        if self.manufacturer_ids and self.manufacturer_ids.isdisjoint(manufacturer_ids):
+            return False
+        if self.service_uuids and self.service_uuids.isdisjoint(service_uuids):
+            return False
+        return True
+
+    def matches_rssi(self, rssi):
+        if self.min_rssi is None and self.max_rssi is None:
+            return True
+        if not isinstance(rssi, (int, float)):
+            return False
+        if self.min_rssi is not None and rssi < self.min_rssi:
+            return False
+        if self.max_rssi is not None and rssi > self.max_rssi:
+            return False
+        return True
+
+
+class RuleSet:
+    """
+    An ordered list of rules indexed by the conditions they require. Every
+    condition of a rule must hold, so each rule is filed under just one of
+    them: its manufacturer IDs, else its service UUIDs, else its
+    manufacturer names, else its literal name prefixes. A device only
+    evaluates the rules filed under its own IDs, UUIDs, manufacturer and
+    name prefixes, plus the rules matched on a name substring or regex
+    (gated by one combined regex) and the RSSI-only rules. Lookups cost a
+    few dict probes, however many rules there are.
+    """
+
+    def __init__(self, specs):
+        self.rules = [Rule(spec) for spec in specs]
+        self.by_manufacturer_id = {}
+        self.by_service_uuid = {}
+        self.by_manufacturer_name = {}
+        self.by_prefix = {}  # prefix length -> {prefix: rule indices}
+        self.by_name = []  # rules matched on a name substring or regex
+        self.unconditional = []  # rules with only RSSI conditions
+        patterns = []
+        for index, rule in enumerate(self.rules):
+            if rule.manufacturer_ids:
+                for key in rule.manufacturer_ids:
+                    self.by_manufacturer_id.setdefault(key, []).append(index)
+            elif rule.service_uuids:
+                for key in rule.service_uuids:
+                    self.by_service_uuid.setdefault(key, []).append(index)
+            elif rule.manufacturer_names:
+                for key in rule.manufacturer_names:
+                    self.by_manufacturer_name.setdefault(key, []).append(index)
+            elif rule.name_prefixes is not None:
+                for prefix in rule.name_prefixes:
+                    self.by_prefix.setdefault(len(prefix), {}).setdefault(prefix, []).append(index)
+            elif rule.name_regex is not None:
+                self.by_name.append(index)
+                patterns.append(rule.name_pattern)
+            else:
+                self.unconditional.append(index)
+        self.any_name = re.compile("|".join(f"(?:{pattern})" for pattern in patterns)) if patterns else None
+
+    def candidates(self, name, manufacturer_name, manufacturer_ids, service_uuids):
+        """
+        Indices of the rules whose non-RSSI conditions match, in rule order.
+        """
+        found = list(self.unconditional)
+        for key in manufacturer_ids:
+            found.extend(self.by_manufacturer_id.get(key, ()))
+        for key in service_uuids:
+            found.extend(self.by_service_uuid.get(key, ()))
+        found.extend(self.by_manufacturer_name.get(manufacturer_name, ()))
+        if name:
+            for length, prefixes in self.by_prefix.items():
+                found.extend(prefixes.get(name[:length], ()))
+            if self.any_name is not None and self.any_name.search(name):
+                found.extend(self.by_name)
+        if not found:
+            return ()
+        return tuple(
+            index for index in sorted(set(found))
+            if self.rules[index].matches_static(name, manufacturer_name, manufacturer_ids, service_uuids)
+        )
+
+    def first(self, candidates, rssi):
+        for index in candidates:
+            rule = self.rules[index]
+            if rule.matches_rssi(rssi):
+                return rule
+        return None
+
+
+class RuleEngine:
+    """
+    Device classifier and skip filter driven by a JSON rules file.
+
+    The file holds an ordered "categories" list (first match wins, falling
+    back to "default_category") and a "skip" list. Static match results are
+    cached per device address; the file is reloaded when its mtime changes.
+    """
+
+    def __init__(self, path=RULES_PATH, cache_size=CACHE_SIZE):
+        self.path = path
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self._mtime = None
+        self.load()
+
+    def load(self):
+        with open(self.path, "r") as f:
+            spec = json.load(f)
+        self._mtime = os.stat(self.path).st_mtime
+        self.default_category = spec.get("default_category", "Unknown Device")
+        self.categories = RuleSet(spec.get("categories", []))
+        self.skip = RuleSet(spec.get("skip", []))
+        self.cache.clear()
+
+    def reload_if_changed(self):
+        """
+        Reload the rules if the file was modified. Returns True if reloaded.
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        try:
+            self.load()
+        except (OSError, ValueError, re.error) as e:
+            # Keep the old rules rather than running with none
+            print(f"Error reloading rules from {self.path}: {e}")
+            self._mtime = mtime
+            return False
+        print(f"Reloaded rules from {self.path}")
+        return True
+
+    def _candidates(self, address, name, manufacturer_name, manufacturer_ids, service_uuids):
+        key = (name, manufacturer_name, manufacturer_ids, service_uuids)
+        cached = self.cache.get(address) if address is not None else None
+        if cached is not None and cached[0] == key:
+            self.cache.move_to_end(address)
+            return cached[1], cached[2]
+
+        skip = self.skip.candidates(name, manufacturer_name, manufacturer_ids, service_uuids)
+        categories = self.categories.candidates(name, manufacturer_name, manufacturer_ids, service_uuids)
+        if address is not None:
+            self.cache[address] = (key, skip, categories)
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return skip, categories
+
+    def categorize(self, name=None, manufacturer_name=None, manufacturer_ids=(), service_uuids=(), rssi=None):
+        """
+        Return the category for a device, ignoring the skip rules.
+        """
+        candidates = self.categories.candidates(
+            name, manufacturer_name, frozenset(manufacturer_ids),
+            frozenset(_normalize_service_uuid(value) for value in service_uuids),
+        )
+        rule = self.categories.first(candidates, rssi)
+        return rule.category if rule is not None else self.default_category
+
+    def evaluate(self, name=None, address=None, manufacturer_name=None, manufacturer_ids=(),
+                 service_uuids=(), rssi=None):
+        """
+        Classify one device. Returns (skip, category).
+        """
+        manufacturer_ids = frozenset(manufacturer_ids)
+        service_uuids = frozenset(_normalize_service_uuid(value) for value in service_uuids)
+        skip, categories = self._candidates(address, name, manufacturer_name, manufacturer_ids, service_uuids)
+        if self.skip.first(skip, rssi) is not None:
+            return True, None
+        rule = self.categories.first(categories, rssi)
+        return False, rule.category if rule is not None else self.default_category
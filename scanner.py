@@ -0,0 +1,233 @@
+import asyncio
+import time
+from collections import namedtuple
+
+# A single advertisement as seen by the scanner callback. `adapter` is the
+# HCI controller it was heard on; `adapter_rssi` maps adapter -> RSSI once
+# MultiAdapterScanner has merged the copies heard by several controllers.
+# `service_data` maps service UUID -> payload bytes (e.g. Eddystone frames).
+Advertisement = namedtuple(
+    "Advertisement",
+    ["timestamp", "address", "name", "rssi", "manufacturer_data", "service_uuids", "tx_power",
+     "adapter", "adapter_rssi", "service_data"],
+    defaults=(None, None, None),
+)
+
+# Copies of one address heard within this many seconds are merged
+DEDUP_WINDOW = 1.0
+
+
+def advertisement_from_bleak(device, advertisement_data, timestamp=None, adapter=None):
+    """
+    Convert a bleak (BLEDevice, AdvertisementData) pair into an Advertisement.
+    """
+    return Advertisement(
+        timestamp=timestamp if timestamp is not None else time.time(),
+        address=device.address,
+        name=advertisement_data.local_name or device.name,
+        rssi=advertisement_data.rssi,
+        manufacturer_data=dict(advertisement_data.manufacturer_data),
+        service_uuids=list(advertisement_data.service_uuids),
+        tx_power=advertisement_data.tx_power,
+        adapter=adapter,
+        service_data=dict(advertisement_data.service_data),
+    )
+
+
+class StreamingScanner:
+    """
+    Long-running BLE scanner built on the BleakScanner detection callback.
+
+    Advertisements are pushed into an asyncio queue as they arrive and handed
+    out in batches, either every `flush_interval` seconds or as soon as
+    `max_batch_size` advertisements are waiting, whichever comes first. The
+    radio keeps scanning between batches, so there are no gaps between scan
+    windows.
+
+    `flush_interval` may be changed between batches (see scheduler.py). If
+    `urgent` is set, it is called for each advertisement taken off the queue,
+    and when it returns True the current batch is flushed within
+    `urgent_delay` seconds instead of waiting for the full interval.
+    """
+
+    def __init__(self, flush_interval=5.0, max_batch_size=500, max_queue_size=10000, adapter=None):
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+        self.adapter = adapter
+        self.queue = asyncio.Queue(maxsize=max_queue_size)
+        self.dropped = 0
+        self.paused = False
+        self.urgent = None
+        self.urgent_delay = 0.5
+        self._scanner = None
+
+    def _detection_callback(self, device, advertisement_data):
+        try:
+            self.queue.put_nowait(advertisement_from_bleak(device, advertisement_data, adapter=self.adapter))
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def start(self):
+        from bleak import BleakScanner
+
+        kwargs = {"detection_callback": self._detection_callback}
+        if self.adapter:
+            kwargs["adapter"] = self.adapter
+        self._scanner = BleakScanner(**kwargs)
+        await self._scanner.start()
+
+    async def stop(self):
+        if self._scanner is not None:
+            if not self.paused:
+                await self._scanner.stop()
+            self._scanner = None
+
+    async def pause(self):
+        """
+        Turn the radio off without tearing the scanner down.
+        """
+        if self._scanner is not None and not self.paused:
+            await self._scanner.stop()
+        self.paused = True
+
+    async def resume(self):
+        if self._scanner is not None and self.paused:
+            await self._scanner.start()
+        self.paused = False
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    async def next_batch(self):
+        """
+        Wait for the next batch of advertisements.
+        Returns a (possibly empty) list once the flush interval elapses or the
+        batch reaches `max_batch_size`.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        urgent = self.urgent
+        batch = []
+        while len(batch) < self.max_batch_size:
+            # Drain whatever is already queued without yielding to the loop
+            while len(batch) < self.max_batch_size and not self.queue.empty():
+                advertisement = self.queue.get_nowait()
+                batch.append(advertisement)
+                if urgent is not None and urgent(advertisement):
+                    deadline = min(deadline, loop.time() + self.urgent_delay)
+            if len(batch) >= self.max_batch_size:
+                break
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                advertisement = await asyncio.wait_for(self.queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            batch.append(advertisement)
+            if urgent is not None and urgent(advertisement):
+                deadline = min(deadline, loop.time() + self.urgent_delay)
+        return batch
+
+    def exhausted(self):
+        """
+        True once no more advertisements will arrive; a live scanner never is.
+        """
+        return False
+
+    async def batches(self):
+        """
+        Async generator yielding batches of advertisements until exhausted.
+        """
+        while not self.exhausted():
+            yield await self.next_batch()
+
+
+class MultiAdapterScanner(StreamingScanner):
+    """
+    Runs one scanner per HCI controller (hci0, hci1, ...) under the same
+    event loop, all feeding a single shared queue. Each batch is
+    de-duplicated per address within `dedup_window` seconds: the copies
+    heard by different controllers are merged into one Advertisement that
+    carries the strongest RSSI and an `adapter_rssi` map. Repeats heard by
+    the same controller are separate transmissions and are all kept.
+
+    `scanner_factory(adapter)` builds the per-adapter scanners; it defaults to
+    StreamingScanner and can return capture.ReplayScanner instances for tests.
+    """
+
+    def __init__(self, adapters, flush_interval=5.0, max_batch_size=500, max_queue_size=10000,
+                 dedup_window=DEDUP_WINDOW, scanner_factory=None):
+        super().__init__(flush_interval, max_batch_size, max_queue_size)
+        self.adapters = list(adapters)
+        self.dedup_window = dedup_window
+        if scanner_factory is None:
+            scanner_factory = lambda adapter: StreamingScanner(adapter=adapter)
+        self.scanners = []
+        for adapter in self.adapters:
+            scanner = scanner_factory(adapter)
+            scanner.queue = self.queue  # share one stream
+            self.scanners.append(scanner)
+        self.duplicates = 0
+        self._recent = {}  # address -> (window start, index in the batch or None, adapter -> RSSI)
+
+    async def start(self):
+        await asyncio.gather(*(scanner.start() for scanner in self.scanners))
+
+    async def stop(self):
+        await asyncio.gather(*(scanner.stop() for scanner in self.scanners), return_exceptions=True)
+
+    async def pause(self):
+        await asyncio.gather(*(scanner.pause() for scanner in self.scanners))
+        self.paused = True
+
+    async def resume(self):
+        await asyncio.gather(*(scanner.resume() for scanner in self.scanners))
+        self.paused = False
+
+    def exhausted(self):
+        return all(scanner.exhausted() for scanner in self.scanners)
+
+    def _merge(self, batch):
+        merged = []
+        recent = self._recent
+        window = self.dedup_window
+        for advertisement in batch:
+            entry = recent.get(advertisement.address)
+            # Only a copy from another controller is a duplicate; a repeat
+            # from a controller already in the window is a new transmission
+            if (entry is not None and advertisement.timestamp - entry[0] <= window
+                    and advertisement.adapter not in entry[2]):
+                self.duplicates += 1
+                index, adapter_rssi = entry[1], entry[2]
+                adapter_rssi[advertisement.adapter] = advertisement.rssi
+                # Copies of an advertisement already handed out in an
+                # earlier batch are simply dropped
+                if index is not None:
+                    current = merged[index]
+                    # Keep the strongest copy's RSSI
+                    if advertisement.rssi is not None and (current.rssi is None or advertisement.rssi > current.rssi):
+                        merged[index] = current._replace(rssi=advertisement.rssi)
+                continue
+
+            adapter_rssi = {advertisement.adapter: advertisement.rssi}
+            recent[advertisement.address] = (advertisement.timestamp, len(merged), adapter_rssi)
+            merged.append(advertisement._replace(adapter_rssi=adapter_rssi))
+
+        # Windows still open carry over into the next batch, but indices do
+        # not, and the maps already handed out are no longer updated
+        cutoff = (batch[-1].timestamp if batch else time.time()) - window
+        self._recent = {
+            address: (start, None, dict(adapter_rssi))
+            for address, (start, _, adapter_rssi) in recent.items() if start >= cutoff
+        }
+        return merged
+
+    async def next_batch(self):
+        batch = await super().next_batch()
+        self.dropped = sum(scanner.dropped for scanner in self.scanners)
+        return self._merge(batch)
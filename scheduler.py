@@ -0,0 +1,150 @@
+import asyncio
+import time
+
+from metrics import metrics
+
+metrics.describe("scheduler_flush_interval_seconds", "gauge", "Flush interval chosen by the adaptive scheduler.")
+metrics.describe("scheduler_duty_cycle", "gauge", "Fraction of each scan period the radio is on.")
+metrics.describe("scheduler_new_device_rate", "gauge", "New devices per second seen in the last flush.")
+metrics.describe("scheduler_rssi_variance", "gauge", "Mean squared change of per-device mean RSSI between flushes.")
+
+# Default bounds and thresholds
+MIN_FLUSH_INTERVAL = 1.0
+MAX_FLUSH_INTERVAL = 30.0
+SCAN_PERIOD = 4.0  # seconds per duty cycle period
+MIN_DUTY_CYCLE = 0.75  # radio is never off for more than a quarter of a period
+NEW_DEVICE_RATE = 0.2  # new devices per second that count as busy
+RSSI_VARIANCE = 16.0  # (dBm)^2 of mean-RSSI change that counts as busy
+BACKLOG = 10  # queued uploads beyond which flushes are stretched
+KNOWN_TTL = 120.0  # seconds before an unseen device counts as new again
+
+
+class AdaptiveScheduler:
+    """
+    Tunes the flush cadence and the scan duty cycle from observed churn.
+
+    After each flush the scheduler looks at the new-device rate, the RSSI
+    variance (mean squared change of each device's mean RSSI since its
+    previous flush) and the upload queue depth. When either activity
+    signal crosses its threshold it drops straight to the shortest flush
+    interval and keeps the radio on; when quiet it stretches the interval
+    by `growth` per flush and lowers the duty cycle step by step. A growing
+    upload backlog stretches flushes too, so more cycles are coalesced.
+
+    Detection latency is protected by the scanner's `urgent` hook: an
+    advertisement from an unknown address flushes the current batch within
+    the scanner's urgent_delay, however long the interval has grown.
+    """
+
+    def __init__(self, min_flush=MIN_FLUSH_INTERVAL, max_flush=MAX_FLUSH_INTERVAL, scan_period=SCAN_PERIOD,
+                 min_duty=MIN_DUTY_CYCLE, new_device_rate=NEW_DEVICE_RATE, rssi_variance=RSSI_VARIANCE,
+                 backlog=BACKLOG, growth=2.0, duty_step=0.05, known_ttl=KNOWN_TTL):
+        self.min_flush = min_flush
+        self.max_flush = max_flush
+        self.scan_period = scan_period
+        self.min_duty = min_duty
+        self.new_device_threshold = new_device_rate
+        self.rssi_variance_threshold = rssi_variance
+        self.backlog = backlog
+        self.growth = growth
+        self.duty_step = duty_step
+        self.known_ttl = known_ttl
+
+        self.flush_interval = min_flush
+        self.duty_cycle = 1.0
+        self.new_device_rate = 0.0
+        self.rssi_variance = 0.0
+        self.known = {}  # address -> last seen (monotonic)
+        self.last_rssi = {}  # device uuid -> mean RSSI at its previous flush
+        self._new_devices = 0
+        self._last_decision = time.monotonic()
+        self._next_prune = self._last_decision + known_ttl
+
+    def is_new(self, advertisement):
+        """
+        Scanner `urgent` hook: True for addresses the scheduler has not seen.
+        """
+        return advertisement.address not in self.known
+
+    def observe_batch(self, batch, now=None):
+        """
+        Record the addresses of a raw batch of advertisements.
+        """
+        now = time.monotonic() if now is None else now
+        known = self.known
+        for advertisement in batch:
+            if advertisement.address not in known:
+                self._new_devices += 1
+            known[advertisement.address] = now
+        if now >= self._next_prune:
+            cutoff = now - self.known_ttl
+            self.known = {address: seen for address, seen in known.items() if seen >= cutoff}
+            self._next_prune = now + self.known_ttl
+
+    def observe_records(self, records):
+        """
+        Update the RSSI variance from a processed device list.
+        """
+        total, count = 0.0, 0
+        last_rssi = self.last_rssi
+        for record in records:
+            mean = record.rssi_mean
+            if mean is None:
+                continue
+            previous = last_rssi.get(record.uuid)
+            if previous is not None:
+                total += (mean - previous) ** 2
+                count += 1
+            last_rssi[record.uuid] = mean
+        self.rssi_variance = total / count if count else 0.0
+        if len(last_rssi) > 4 * max(1, len(self.known)):
+            self.last_rssi = {}  # forget departed devices now and then
+
+    def decide(self, queue_depth=0, now=None):
+        """
+        Choose the next flush interval and duty cycle. Returns (flush_interval, duty_cycle).
+        """
+        now = time.monotonic() if now is None else now
+        elapsed = max(now - self._last_decision, 1e-3)
+        self._last_decision = now
+        self.new_device_rate = self._new_devices / elapsed
+        self._new_devices = 0
+
+        busy = self.new_device_rate >= self.new_device_threshold or self.rssi_variance >= self.rssi_variance_threshold
+        if busy:
+            self.flush_interval = self.min_flush
+            self.duty_cycle = 1.0
+        else:
+            self.flush_interval = min(self.max_flush, self.flush_interval * self.growth)
+            self.duty_cycle = max(self.min_duty, self.duty_cycle - self.duty_step)
+        if queue_depth > self.backlog:
+            self.flush_interval = min(self.max_flush, max(self.flush_interval, self.min_flush) * 2)
+
+        metrics.set("scheduler_flush_interval_seconds", self.flush_interval)
+        metrics.set("scheduler_duty_cycle", self.duty_cycle)
+        metrics.set("scheduler_new_device_rate", self.new_device_rate)
+        metrics.set("scheduler_rssi_variance", self.rssi_variance)
+        return self.flush_interval, self.duty_cycle
+
+    def attach(self, scanner):
+        """
+        Let the scheduler drive `scanner`: flush early on new devices and
+        start from the shortest flush interval.
+        """
+        scanner.urgent = self.is_new
+        scanner.flush_interval = self.flush_interval
+
+    async def run_duty_cycle(self, scanner):
+        """
+        Switch the radio on and off according to the current duty cycle.
+        """
+        while True:
+            if self.duty_cycle >= 1.0:
+                await scanner.resume()
+                await asyncio.sleep(self.scan_period)
+                continue
+            on_time = self.scan_period * self.duty_cycle
+            await scanner.resume()
+            await asyncio.sleep(on_time)
+            await scanner.pause()
+            await asyncio.sleep(self.scan_period - on_time)
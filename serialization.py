@@ -0,0 +1,132 @@
+import json
+import math
+from dataclasses import dataclass
+from operator import attrgetter
+from json.encoder import encode_basestring_ascii
+
+# Field order of a device record
+DEVICE_FIELDS = ("name", "address", "rssi", "distance", "manufacturer", "uuid", "timestamp", "category",
+                 "count", "rssi_min", "rssi_max", "rssi_mean", "first_seen", "last_seen", "beacon_type")
+# Columns of the columnar layout; the per-device timestamp is the payload's
+# batch timestamp, so it is not repeated
+COLUMN_FIELDS = tuple(field for field in DEVICE_FIELDS if field != "timestamp")
+
+
+@dataclass
+class DeviceRecord:
+    """
+    One device in an upload payload. Slotted, so a payload of thousands of
+    devices does not carry a dict per device; `timestamp` is the batch
+    timestamp shared by every record of a cycle. `rssi` is the last RSSI of
+    the window, the count/min/max/mean fields summarize all of its samples,
+    and first_seen/last_seen are epoch seconds. `beacon_type` is the decoded
+    payload type (see payloads.py), e.g. "ibeacon" or "airtag", or None.
+    """
+
+    __slots__ = DEVICE_FIELDS
+    name: object
+    address: str
+    rssi: object
+    distance: object
+    manufacturer: str
+    uuid: str
+    timestamp: str
+    category: str
+    count: int
+    rssi_min: object
+    rssi_max: object
+    rssi_mean: object
+    first_seen: float
+    last_seen: float
+    beacon_type: object
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in DEVICE_FIELDS}
+
+
+def _encode_value(value):
+    if isinstance(value, str):
+        return encode_basestring_ascii(value)
+    if value is None:
+        return "null"
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if isinstance(value, float):
+        return repr(value) if math.isfinite(value) else "null"
+    if isinstance(value, int):
+        return int.__repr__(value)
+    return json.dumps(value, separators=(",", ":"))
+
+
+_RECORD_TEMPLATE = "{" + ",".join(f'"{field}":%s' for field in DEVICE_FIELDS) + "}"
+
+
+_record_values = attrgetter(*DEVICE_FIELDS)
+
+
+def _encode_record(record):
+    return _RECORD_TEMPLATE % tuple(map(_encode_value, _record_values(record)))
+
+
+def _finite(value):
+    return None if isinstance(value, float) and not math.isfinite(value) else value
+
+
+def to_columns(devices):
+    """
+    Convert a list of DeviceRecord into parallel arrays, one per field.
+    NaN and infinite floats become None (null), as in the rows layout.
+    """
+    return {field: [_finite(getattr(device, field)) for device in devices] for field in COLUMN_FIELDS}
+
+
+# The optional orjson module, imported by the first encode_payload() call;
+# False when it is not installed
+_orjson = None
+
+
+def _load_orjson():
+    global _orjson
+    if _orjson is None:
+        try:
+            import orjson
+        except ImportError:
+            orjson = False
+        _orjson = orjson
+    return _orjson
+
+
+def _orjson_default(value):
+    if isinstance(value, DeviceRecord):
+        return value.to_dict()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def encode_payload(payload, layout="rows"):
+    """
+    Serialize an upload payload to UTF-8 JSON bytes.
+
+    `payload["devices"]` is a list of DeviceRecord. With layout="rows" it is
+    encoded as a list of objects (the original wire format); with
+    layout="columns" as an object of parallel arrays, marked with
+    "layout": "columns". Uses orjson when installed, otherwise a hand-rolled
+    encoder for the device records.
+    """
+    orjson = _load_orjson()
+    devices = payload.get("devices", [])
+    if layout == "columns":
+        payload = dict(payload, devices=to_columns(devices), layout="columns")
+        if orjson:
+            return orjson.dumps(payload)
+        return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+    if orjson:
+        return orjson.dumps(payload, default=_orjson_default)
+
+    head = json.dumps({key: value for key, value in payload.items() if key != "devices"}, separators=(",", ":"))
+    body = ",".join(_encode_record(device) if isinstance(device, DeviceRecord)
+                    else json.dumps(device, separators=(",", ":")) for device in devices)
+    separator = "," if len(head) > 2 else ""
+    return f'{head[:-1]}{separator}"devices":[{body}]}}'.encode("utf-8")
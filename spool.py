@@ -0,0 +1,141 @@
+import sqlite3
+import time
+
+# Default caps: keep at most ~64 MB or one week of unsent batches
+MAX_BYTES = 64 * 1024 * 1024
+MAX_AGE = 7 * 24 * 3600.0
+
+
+class Spool:
+    """
+    Disk-backed store-and-forward queue of serialized upload batches.
+
+    Batches are appended to a SQLite database in WAL mode before upload and
+    read back oldest-first in chunks, so thousands of spooled batches never
+    have to be held in memory. Batches older than the age cap are evicted,
+    and once the size cap is exceeded so are the oldest batches, except
+    those handed out by peek() and not yet acknowledged. The row count and byte total are kept in memory and
+    adjusted by what each DELETE actually removed.
+    """
+
+    def __init__(self, path, max_bytes=MAX_BYTES, max_age=MAX_AGE, check_every=100):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.check_every = check_every
+        self.evicted = 0
+        self._appends = 0
+        self._in_flight = set()
+
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        # In WAL mode NORMAL only fsyncs at checkpoints, batching the syncs
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS spool ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, created REAL NOT NULL, body BLOB NOT NULL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS spool_created ON spool (created)")
+        self.db.commit()
+        self.count, self.bytes = self.db.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM spool").fetchone()
+        self.enforce_limits()
+
+    def __len__(self):
+        return self.count
+
+    def _delete(self, where, params, spare_in_flight=True):
+        """
+        Delete the matching rows, sparing in-flight ones unless told not to,
+        and update the in-memory totals. Returns the number of rows deleted.
+        """
+        if spare_in_flight and self._in_flight:
+            where += f" AND id NOT IN ({','.join('?' * len(self._in_flight))})"
+            params = (*params, *self._in_flight)
+        rows = self.db.execute(f"DELETE FROM spool WHERE {where} RETURNING id, LENGTH(body)", params).fetchall()
+        self.count -= len(rows)
+        self.bytes -= sum(length for _, length in rows)
+        self._in_flight.difference_update(row_id for row_id, _ in rows)
+        return len(rows)
+
+    def append(self, body, now=None):
+        """
+        Persist one serialized batch (bytes).
+        """
+        with self.db:
+            self.db.execute(
+                "INSERT INTO spool (created, body) VALUES (?, ?)",
+                (time.time() if now is None else now, body),
+            )
+        self.count += 1
+        self.bytes += len(body)
+        self._appends += 1
+        if self._appends % self.check_every == 0 or self.bytes > self.max_bytes:
+            self.enforce_limits(now)
+
+    def peek(self, limit):
+        """
+        Return up to `limit` of the oldest batches as (id, body) pairs. They
+        are protected from size eviction until the next peek() or their
+        ack(); the age cap still applies, so a batch that keeps failing
+        cannot pin the head of the spool.
+        """
+        entries = self.db.execute("SELECT id, body FROM spool ORDER BY id LIMIT ?", (limit,)).fetchall()
+        self._in_flight = {entry[0] for entry in entries}
+        return entries
+
+    def iter_batches(self, chunk_size=100):
+        """
+        Stream every spooled batch oldest-first as (id, body), one chunk at a time.
+        """
+        last_id = 0
+        while True:
+            rows = self.db.execute(
+                "SELECT id, body FROM spool WHERE id > ? ORDER BY id LIMIT ?", (last_id, chunk_size)
+            ).fetchall()
+            if not rows:
+                return
+            yield from rows
+            last_id = rows[-1][0]
+
+    def ack(self, entries):
+        """
+        Remove batches returned by peek() once they have been uploaded.
+        """
+        if not entries:
+            return
+        ids = [entry[0] for entry in entries]
+        self._in_flight.difference_update(ids)
+        with self.db:
+            self._delete(f"id IN ({','.join('?' * len(ids))})", ids)
+
+    def enforce_limits(self, now=None):
+        """
+        Evict the oldest batches beyond the age and size caps.
+        Returns the number of batches evicted.
+        """
+        now = time.time() if now is None else now
+        evicted = 0
+        with self.db:
+            evicted += self._delete("created < ?", (now - self.max_age,), spare_in_flight=False)
+
+            if self.bytes > self.max_bytes:
+                excess = self.bytes - self.max_bytes
+                freed = 0
+                last_id = None
+                for row_id, length in self.db.execute("SELECT id, LENGTH(body) FROM spool ORDER BY id"):
+                    if row_id in self._in_flight:
+                        continue
+                    freed += length
+                    last_id = row_id
+                    if freed >= excess:
+                        break
+                if last_id is not None:
+                    evicted += self._delete("id <= ?", (last_id,))
+
+        if evicted:
+            self.evicted += evicted
+            print(f"Spool over its caps, evicted {evicted} oldest batch(es)")
+        return evicted
+
+    def close(self):
+        self.db.close()
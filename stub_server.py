@@ -0,0 +1,64 @@
+import gzip
+import json
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Accepts uploader POSTs and prints a one-line summary of each request.
+    The decoded bodies are kept in `server.received` as (headers, document),
+    and while `server.fail_next` is positive requests are answered with
+    `server.fail_status` (503 by default) to exercise the uploader's retries.
+    """
+
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real endpoint
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.server.fail_next > 0:
+            self.server.fail_next -= 1
+            self.send_response(self.server.fail_status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        size = len(body)
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        document = json.loads(body)
+        self.server.received.append((dict(self.headers), document))
+        payloads = document if isinstance(document, list) else [document]
+        devices = sum(
+            len(payload["devices"]["uuid"]) if payload.get("layout") == "columns" else len(payload.get("devices", []))
+            for payload in payloads
+        )
+        print(f"{self.path}: {len(payloads)} payload(s), {devices} device(s), {size} bytes on the wire")
+
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host="127.0.0.1", port=8080):
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.received = []
+    server.fail_next = 0
+    server.fail_status = 503
+    return server
+
+
+def serve(host="127.0.0.1", port=8080):
+    server = make_server(host, port)
+    print(f"Stub webhook listening on http://{host}:{port}/api/devices")
+    server.serve_forever()
+
+
+def main():
+    serve(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8080)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+import ble
+from bench import offline_metadata
+from capture import ReplayScanner
+from processing import ProcessingStage
+from scanner import Advertisement
+from uploader import Uploader
+
+
+class RecordingUploader(Uploader):
+    """
+    Uploader stand-in that keeps each submitted payload with the replay time
+    it was queued at.
+    """
+
+    def __init__(self, scanner):
+        super().__init__("http://127.0.0.1:9/unused")
+        self.scanner = scanner
+        self.payloads = []
+
+    def submit(self, payload):
+        now = asyncio.get_running_loop().time() - self.scanner.replay_started
+        self.payloads.append((now, payload))
+
+    async def run(self):
+        pass
+
+
+def advertisement(timestamp, address):
+    return Advertisement(timestamp=timestamp, address=address, name=None, rssi=-60,
+                         manufacturer_data={0x0075: b"\x42\x04"}, service_uuids=[], tx_power=None)
+
+
+def slow_process_batch(advertisements, timestamp):
+    # Keeps the batch in flight across a few quiet flushes
+    time.sleep(0.3)
+    return ble.process_batch(advertisements, timestamp)
+
+
+def run_stream(advertisements, mode, flush_interval, report_mode="full", function=ble.process_batch):
+    async def run():
+        scanner = ReplayScanner(advertisements, speed=1.0, flush_interval=flush_interval)
+        uploader = RecordingUploader(scanner)
+        stage = ProcessingStage(function, mode)
+        try:
+            with offline_metadata():
+                await ble.stream_and_list_devices(uploader, scanner=scanner, stage=stage,
+                                                  report_mode=report_mode, capture_path=None)
+        finally:
+            stage.close()
+        return uploader.payloads
+    return asyncio.run(run())
+
+
+def test_thread_mode_publishes_without_waiting_for_the_next_batch():
+    start = time.time()
+    advertisements = [advertisement(start, f"16:00:00:00:00:{index:02X}") for index in range(5)]
+    advertisements.append(advertisement(start + 1.5, "16:00:00:00:01:00"))
+
+    payloads = run_stream(advertisements, "thread", flush_interval=0.1)
+
+    first_time, first_payload = payloads[0]
+    assert len(first_payload["devices"]) == 5
+    # Published a tick or two after the first flush, not when the next advertisement arrives
+    assert first_time < 0.6
+
+
+def test_delta_snapshot_waits_for_the_batch_in_flight():
+    start = time.time()
+    advertisements = [advertisement(start, f"17:00:00:00:00:{index:02X}") for index in range(5)]
+    advertisements.append(advertisement(start + 1.0, "17:00:00:00:01:00"))
+
+    payloads = run_stream(advertisements, "thread", flush_interval=0.1, report_mode="delta",
+                          function=slow_process_batch)
+
+    _, first_payload = payloads[0]
+    assert first_payload["report_type"] == "snapshot"
+    assert len(first_payload["devices"]) == 5
+    assert all(payload["report_type"] == "delta" for _, payload in payloads[1:])
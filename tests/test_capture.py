@@ -0,0 +1,62 @@
+import asyncio
+
+from capture import CaptureWriter, ReplayScanner, read_capture, synthetic_advertisements
+from capture import decode_advertisement, encode_advertisement
+from scanner import Advertisement
+
+EDDYSTONE = "0000feaa-0000-1000-8000-00805f9b34fb"
+
+
+def test_encode_decode_round_trip():
+    advertisement = Advertisement(timestamp=1718000000.123, address="AA:BB:CC:DD:EE:FF", name="Tag", rssi=-61,
+                                  manufacturer_data={0x004C: b"\x12\x02\x00\x01"}, service_uuids=[EDDYSTONE],
+                                  tx_power=-59, adapter="hci1", service_data={EDDYSTONE: b"\x10\x00"})
+    assert decode_advertisement(encode_advertisement(advertisement)) == advertisement
+
+    minimal = Advertisement(timestamp=1.0, address="AA", name=None, rssi=None, manufacturer_data={},
+                            service_uuids=[], tx_power=None, service_data={})
+    assert decode_advertisement(encode_advertisement(minimal)) == minimal
+
+
+def test_capture_file_round_trip(tmp_path):
+    path = str(tmp_path / "capture.jsonl")
+    advertisements = [advertisement._replace(timestamp=round(advertisement.timestamp, 3), service_data={})
+                      for advertisement in synthetic_advertisements(10, 50)]
+    writer = CaptureWriter(path)
+    writer.write(advertisements[0])
+    writer.write_batch(advertisements[1:])
+    writer.close()
+
+    assert writer.count == 50
+    assert list(read_capture(path)) == advertisements
+
+
+def replay(scanner):
+    async def run():
+        received = []
+        async with scanner:
+            async for batch in scanner.batches():
+                received.extend(batch)
+        return received
+    return asyncio.run(run())
+
+
+def test_replay_at_max_speed_delivers_everything_in_order():
+    advertisements = list(synthetic_advertisements(20, 300))
+    scanner = ReplayScanner(advertisements, speed=None, flush_interval=0.01, max_batch_size=50,
+                            max_queue_size=10, adapter="hci0")
+
+    received = replay(scanner)
+
+    assert received == [advertisement._replace(adapter="hci0") for advertisement in advertisements]
+    assert scanner.dropped == 0
+
+
+def test_replay_while_paused_counts_missed():
+    advertisements = [Advertisement(timestamp=100.0 + index * 0.01, address="AA", name=None, rssi=-60,
+                                    manufacturer_data={}, service_uuids=[], tx_power=None) for index in range(5)]
+    scanner = ReplayScanner(advertisements, speed=1.0, flush_interval=0.01)
+    scanner.paused = True
+
+    assert replay(scanner) == []
+    assert scanner.missed == 5
@@ -0,0 +1,33 @@
+from delta import DeltaReporter
+from serialization import DEVICE_FIELDS, DeviceRecord
+
+
+def record(uuid, rssi=-60, distance=1.0, name="tag"):
+    values = dict.fromkeys(DEVICE_FIELDS)
+    values.update(uuid=uuid, address=uuid, rssi=rssi, distance=distance, name=name, manufacturer="m",
+                  category="c")
+    return DeviceRecord(**values)
+
+
+def test_first_report_is_a_snapshot_then_only_changes():
+    reporter = DeltaReporter(snapshot_interval=100, absent_timeout=30)
+    kind, devices, removed = reporter.diff([record("a"), record("b")], now=0)
+    assert kind == "snapshot" and {device.uuid for device in devices} == {"a", "b"} and removed == []
+    kind, devices, removed = reporter.diff([record("a", rssi=-61), record("b", rssi=-70)], now=5)
+    assert kind == "delta" and [device.uuid for device in devices] == ["b"]
+
+
+def test_removals_are_reported_on_empty_flushes():
+    reporter = DeltaReporter(snapshot_interval=1000, absent_timeout=30)
+    reporter.diff([record("a"), record("b")], now=0)
+    reporter.diff([record("b")], now=20)
+    assert reporter.diff([], now=31) == ("delta", [], ["a"])
+    assert reporter.diff([], now=51) == ("delta", [], ["b"])
+    assert reporter.diff([], now=60) == ("delta", [], [])
+
+
+def test_snapshot_on_a_quiet_flush_carries_devices_still_present():
+    reporter = DeltaReporter(snapshot_interval=100, absent_timeout=300)
+    reporter.diff([record("a"), record("b")], now=0)
+    kind, devices, removed = reporter.diff([], now=100)
+    assert kind == "snapshot" and {device.uuid for device in devices} == {"a", "b"} and removed == []
@@ -0,0 +1,56 @@
+import hashlib
+import uuid
+
+import pytest
+
+from device_ids import DeviceIdCache, derive_uuid, is_resolvable_private_address, parse_address
+
+# Bluetooth Core Specification sample data for the ah() random address hash:
+# IRK ec0234a3..., prand 0x708194 -> hash 0x0dfbaa
+IRK = bytes.fromhex("ec0234a357c8ad05341010a60a397d9b")
+RPA = "70:81:94:0D:FB:AA"
+IDENTITY = "C0:11:22:33:44:55"
+
+
+def test_derive_uuid_matches_the_original_derivation():
+    address = "AA:BB:CC:DD:EE:FF"
+    assert derive_uuid(address) == str(uuid.UUID(hashlib.sha256(address.encode()).hexdigest()[0:32]))
+    assert derive_uuid(address, b"salt") != derive_uuid(address)
+
+
+def test_parse_address():
+    assert parse_address(RPA) == bytes.fromhex("7081940dfbaa")
+    assert parse_address("12345678-1234-1234-1234-123456789abc") is None
+    assert is_resolvable_private_address(parse_address(RPA))
+    assert not is_resolvable_private_address(parse_address(IDENTITY))
+
+
+def test_resolves_the_spec_sample_address():
+    pytest.importorskip("cryptography")
+    cache = DeviceIdCache(irks={IDENTITY: IRK})
+
+    assert cache.resolve(RPA) == IDENTITY
+    assert cache.get(RPA) == derive_uuid(IDENTITY)
+    assert cache.get(IDENTITY) == derive_uuid(IDENTITY)
+    assert cache.resolved == 1
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 1, "resolved": 1}
+
+
+def test_unresolved_rpa_keeps_its_own_uuid():
+    pytest.importorskip("cryptography")
+    cache = DeviceIdCache(irks={IDENTITY: IRK})
+    other = "70:81:94:0D:FB:AB"  # hash does not match
+
+    assert cache.get(other) == derive_uuid(other)
+    assert cache.get(other) == derive_uuid(other)
+    assert cache.resolved == 0
+    assert cache.rpa_cache == {other: None}
+
+
+def test_cache_is_bounded_lru():
+    cache = DeviceIdCache(max_size=2)
+    for address in ("00:00:00:00:00:01", "00:00:00:00:00:02", "00:00:00:00:00:01", "00:00:00:00:00:03"):
+        cache.get(address)
+
+    assert list(cache.cache) == ["00:00:00:00:00:01", "00:00:00:00:00:03"]
+    assert (cache.hits, cache.misses) == (1, 3)
@@ -0,0 +1,50 @@
+import time
+
+import pytest
+
+from device_tracker import DeviceTracker, new_filter
+from kalman_filter import KalmanFilter
+
+
+def test_first_sample_starts_the_filter():
+    tracker = DeviceTracker()
+    assert tracker.update("AA", -70, now=0.0) == -70.0
+    assert tracker.get("AA") == -70.0 and tracker.get("BB") is None
+    assert new_filter(-65).posteri_estimate == -65.0
+
+
+def test_smoothing_carries_across_updates():
+    tracker = DeviceTracker()
+    samples = [-70, -60, -80, -62, -75]
+    reference = KalmanFilter(0.1, 5.0, 5.0)
+    reference.posteri_estimate = -70.0
+    expected = [-70.0] + [reference.update(rssi) for rssi in samples[1:]]
+
+    estimates = [tracker.update("AA", rssi, now=float(index)) for index, rssi in enumerate(samples)]
+    assert estimates == pytest.approx(expected)
+    # Smoothed, not just the latest sample
+    assert -75 < estimates[-1] < -62
+    # Devices keep separate filters
+    assert tracker.update("BB", -40, now=5.0) == -40.0
+    assert tracker.get("AA") == pytest.approx(expected[-1])
+
+
+def test_idle_entries_are_evicted():
+    tracker = DeviceTracker(idle_ttl=30.0)
+    tracker.update("AA", -70, now=0.0)
+    tracker.update("BB", -60, now=20.0)
+    assert tracker.evict_idle(now=40.0) == 1
+    assert "AA" not in tracker and "BB" in tracker and len(tracker) == 1
+    # A returning device starts over from its new sample
+    assert tracker.update("AA", -50, now=41.0) == -50.0
+
+
+def test_update_evicts_idle_entries_periodically():
+    tracker = DeviceTracker(idle_ttl=30.0)
+    start = time.monotonic()
+    tracker.update("AA", -70, now=start)
+    tracker.update("BB", -60, now=start + 10.0)
+    assert "AA" in tracker
+    # The next update after the eviction interval drops what went idle
+    tracker.update("BB", -60, now=start + 100.0)
+    assert "AA" not in tracker and "BB" in tracker
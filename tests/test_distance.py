@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+import ble
+import find_near_airtags
+from distance import estimate_distances, kalman_update, log_distance, ratio_distance
+from kalman_filter import KalmanFilter
+
+RSSI = [-30, -45, -59, -59.5, -72, -88, -100]
+
+
+def test_ratio_model_matches_ble_scalar():
+    expected = [ble.distance_from_rssi(rssi) for rssi in RSSI]
+    assert ratio_distance(RSSI) == pytest.approx(expected)
+    # The scalar version's "unknown" sentinel carries over
+    assert ratio_distance([0, -59]).tolist() == [-1.0, ble.distance_from_rssi(-59)]
+
+
+def test_log_model_matches_find_near_airtags_scalar():
+    expected = [find_near_airtags.estimate_distance(rssi) for rssi in RSSI]
+    assert log_distance(RSSI) == pytest.approx(expected)
+
+
+def test_per_device_calibration():
+    tx_power = [-59, -65, -70]
+    n = [2.0, 2.5, 3.0]
+    rssi = [-70, -70, -70]
+    expected = [find_near_airtags.estimate_distance(r, t, e) for r, t, e in zip(rssi, tx_power, n)]
+    assert estimate_distances(rssi, tx_power, n) == pytest.approx(expected)
+    expected = [ble.distance_from_rssi(r, t) for r, t in zip(rssi, tx_power)]
+    assert estimate_distances(rssi, tx_power, model="ratio") == pytest.approx(expected)
+    with pytest.raises(ValueError):
+        estimate_distances(rssi, model="cubic")
+
+
+def test_kalman_update_matches_the_scalar_filter():
+    filters = [KalmanFilter(0.1, 5.0, 5.0) for _ in range(3)]
+    estimate, error = np.array([-60.0, -70.0, -80.0]), np.ones(3)
+    for kf, start in zip(filters, estimate):
+        kf.posteri_estimate = start
+    for measurement in ([-62, -68, -90], [-58, -75, -85]):
+        estimate, error = kalman_update(estimate, error, measurement, 0.1, 5.0)
+        expected = [kf.update(rssi) for kf, rssi in zip(filters, measurement)]
+        assert estimate == pytest.approx(expected)
+    assert error == pytest.approx([kf.posteri_error_estimate for kf in filters])
@@ -0,0 +1,32 @@
+import asyncio
+
+import bleak
+from bleak.backends.device import BLEDevice
+from bleak.backends.scanner import AdvertisementData
+
+import find_near_airtags
+
+
+def sighting(address, rssi, manufacturer_data):
+    return address, (BLEDevice(address, None, None),
+                     AdvertisementData(local_name="tag", manufacturer_data=manufacturer_data, service_data={},
+                                       service_uuids=[], tx_power=None, rssi=rssi, platform_data=()))
+
+
+def test_scan_reads_rssi_and_payloads_from_advertisement_data(monkeypatch, capsys):
+    calls = []
+
+    async def discover(timeout, return_adv=False, **kwargs):
+        assert return_adv
+        calls.append(kwargs.get("adapter"))
+        rssi = -60 if kwargs.get("adapter") == "hci0" else -70
+        return dict([sighting("AA:BB:CC:DD:EE:01", rssi, {0x0059: b"\x01\x02"})])
+
+    monkeypatch.setattr(bleak.BleakScanner, "discover", staticmethod(discover))
+    asyncio.run(find_near_airtags.scan_for_ble_devices(0, retries=2, adapters=["hci0", "hci1"]))
+
+    assert sorted(calls) == ["hci0", "hci0", "hci1", "hci1"]
+    output = capsys.readouterr().out
+    assert "Address: AA:BB:CC:DD:EE:01" in output
+    assert "RSSI: -65.0 (min -70, max -60, 4 samples)" in output
+    assert "Manufactorer Identifier: 0x0059" in output
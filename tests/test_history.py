@@ -0,0 +1,73 @@
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+import history
+from history import HistoryStore
+
+DAY = 24 * 3600.0
+
+
+def record(ts, name=None, category=None, count=1, rssi_mean=None, uuid="u1"):
+    return SimpleNamespace(uuid=uuid, last_seen=ts, address="AA:BB", name=name, category=category, count=count,
+                           rssi_mean=rssi_mean, rssi_min=rssi_mean, rssi_max=rssi_mean, distance=None)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    yield store
+    store.close()
+
+
+def test_compact_keeps_latest_name_and_category(store):
+    now = 10 * DAY
+    base = now - 2 * DAY  # bucket-aligned and past the downsampling age
+    store.insert_records([
+        record(base + 10, name="zeta", category="phone", rssi_mean=-50),
+        record(base + 20, name="alpha", category="beacon", rssi_mean=-70),
+    ])
+
+    assert store.compact(now) == (0, 2)
+    (row,) = store.range("u1", 0, now)
+    assert (row["ts"], row["name"], row["category"], row["count"]) == (base + 20, "alpha", "beacon", 2)
+
+
+def test_compact_mean_ignores_rows_without_rssi(store):
+    now = 10 * DAY
+    base = now - 2 * DAY
+    store.insert_records([
+        record(base + 10, count=3, rssi_mean=-60),
+        record(base + 20, count=5, rssi_mean=None),
+        record(base + 30, count=1, rssi_mean=-80),
+    ])
+
+    store.compact(now)
+    (row,) = store.range("u1", 0, now)
+    assert row["count"] == 9
+    assert row["rssi_mean"] == pytest.approx(-65.0)
+
+
+def test_compact_cutoff_does_not_split_a_bucket(store):
+    bucket_start = 10 * DAY
+    now = bucket_start + DAY + 100  # raw cutoff falls 100 s into the bucket
+    store.insert_records([record(bucket_start + 50, rssi_mean=-60), record(bucket_start + 150, rssi_mean=-70)])
+
+    assert store.compact(now) == (0, 0)
+    store.compact(bucket_start + DAY + store.bucket)
+    assert [row["count"] for row in store.range("u1", 0, now)] == [2]
+
+
+def test_cli_survives_closed_pipe(tmp_path):
+    path = str(tmp_path / "history.db")
+    store = HistoryStore(path)
+    store.insert_records([record(1000.0 + index, uuid=f"u{index}") for index in range(5000)])
+    store.close()
+
+    result = subprocess.run(
+        f"{sys.executable} {history.__file__} --db {path} devices --start 0 | head -1",
+        shell=True, capture_output=True, text=True)
+    assert len(result.stdout.splitlines()) == 1
+    assert "BrokenPipeError" not in result.stderr
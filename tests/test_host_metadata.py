@@ -0,0 +1,58 @@
+import asyncio
+
+import host_metadata
+from host_metadata import MetadataProvider
+
+
+def make_provider(monkeypatch, links, ip_address="192.168.1.2"):
+    calls = []
+
+    def fake_wifi_info():
+        calls.append(1)
+        return {"ssid": f"net{len(calls)}", "mac_address": "00:11:22:33:44:55", "signal_level": "-50"}
+
+    state = {"links": links, "ip": ip_address}
+    monkeypatch.setattr(host_metadata, "get_wifi_info", fake_wifi_info)
+    monkeypatch.setattr(host_metadata, "read_proc_wireless", lambda: {"wlan0": "-50"})
+    monkeypatch.setattr(host_metadata, "read_link_states", lambda: state["links"])
+    monkeypatch.setattr(host_metadata, "get_local_ip", lambda: state["ip"])
+    return MetadataProvider(), calls, state
+
+
+def test_get_serves_unknown_before_first_refresh(monkeypatch):
+    provider, calls, _ = make_provider(monkeypatch, {"wlan0": ("up", "1")})
+
+    metadata = provider.get()
+
+    assert calls == []
+    assert metadata["network_name"] == "Unknown"
+    assert metadata["device_uuid"] == provider.device_uuid
+
+
+def test_refresh_only_reruns_iwconfig_on_changes(monkeypatch):
+    provider, calls, state = make_provider(monkeypatch, {"wlan0": ("up", "1")})
+
+    asyncio.run(provider.refresh())
+    asyncio.run(provider.refresh())
+    assert len(calls) == 1
+    assert provider.get()["network_name"] == "net1"
+
+    # Roaming drops the carrier even though the interface set is unchanged
+    state["links"] = {"wlan0": ("dormant", "0")}
+    asyncio.run(provider.refresh())
+    assert len(calls) == 2
+
+    state["ip"] = "10.0.0.7"
+    asyncio.run(provider.refresh())
+    assert len(calls) == 3
+    assert provider.get()["ip_address"] == "10.0.0.7"
+
+
+def test_read_link_states(tmp_path):
+    for interface, operstate, carrier in (("eth0", "up", "1"), ("wlan0", "down", None), ("lo", "unknown", "1")):
+        (tmp_path / interface).mkdir()
+        (tmp_path / interface / "operstate").write_text(operstate + "\n")
+        if carrier is not None:
+            (tmp_path / interface / "carrier").write_text(carrier + "\n")
+
+    assert host_metadata.read_link_states(str(tmp_path)) == {"eth0": ("up", "1"), "wlan0": ("down", None)}
@@ -0,0 +1,94 @@
+import sys
+import types
+
+import pytest
+
+from manufacturers import ManufacturerRegistry, load_company_identifiers, registry
+
+
+@pytest.fixture
+def fake_tables(monkeypatch):
+    # Two built-in style table modules; the later one wins on conflicts
+    monkeypatch.setitem(sys.modules, "m8", types.SimpleNamespace(
+        manufacturer_codes_8={0x0001: "First", 0x0002: "Old name"}))
+    monkeypatch.setitem(sys.modules, "m9", types.SimpleNamespace(
+        manufacturer_codes_9={0x0002: "New name", 0x10000: "Out of range"}))
+    return ["m8", "m9"]
+
+
+def test_builtin_tables_load_lazily(fake_tables):
+    # Nothing is imported until the first lookup
+    missing = ManufacturerRegistry(table_modules=["no_such_table_module"])
+    with pytest.raises(ModuleNotFoundError):
+        missing.get(0x004C)
+
+    tables = ManufacturerRegistry(table_modules=fake_tables)
+    assert tables.get(0x0002) == "New name"
+    assert tables[0x0001] == "First"
+    assert 0x10000 not in tables and len(tables) == 2
+    with pytest.raises(KeyError):
+        tables[0x0003]
+
+
+def test_shared_registry_knows_apple():
+    assert registry.get(0x004C) == "Apple, Inc."
+    assert registry.get(0xFFFE, "Unknown") == "Unknown"
+
+
+def test_update_adds_and_replaces_entries(fake_tables):
+    tables = ManufacturerRegistry(table_modules=fake_tables)
+    tables.update({0x0001: "Renamed", 0x0003: "Third"})
+    assert [tables.get(code) for code in (0x0001, 0x0002, 0x0003)] == ["Renamed", "New name", "Third"]
+    # Repeated names share one interned string
+    tables.update({0x0004: "".join(["Th", "ird"])})
+    assert tables.get(0x0004) is tables.get(0x0003)
+
+
+def test_sig_yaml_layout(tmp_path):
+    path = tmp_path / "company_identifiers.yaml"
+    path.write_text(
+        "company_identifiers:\n"
+        "  - value: 0x004C\n"
+        "    name: 'Apple, Inc.'\n"
+        "  - value: 0x0075\n"
+        "    name: 'Samsung Electronics Co. Ltd.'\n"
+        "  - value: 0x0A12\n"
+        "    name: 'Children''s Toys ''R'' Us'\n"
+        "  - value: 0076\n"
+        "    name: \"Double quoted\"\n",
+        encoding="utf-8",
+    )
+    assert load_company_identifiers(str(path)) == {
+        0x004C: "Apple, Inc.",
+        0x0075: "Samsung Electronics Co. Ltd.",
+        0x0A12: "Children's Toys 'R' Us",
+        76: "Double quoted",
+    }
+
+
+def test_csv_and_tsv_lines(tmp_path, capsys):
+    path = tmp_path / "companies.txt"
+    path.write_text(
+        "# code,name\n"
+        "0x004C,Apple, Inc.\n"
+        "0076\tZero padded decimal\n"
+        "117,Samsung\n"
+        "\n"
+        "code,name\n",
+        encoding="utf-8",
+    )
+    assert load_company_identifiers(str(path)) == {
+        0x004C: "Apple, Inc.",
+        76: "Zero padded decimal",
+        117: "Samsung",
+    }
+    assert "Skipped 1 unparseable line(s)" in capsys.readouterr().out
+
+
+def test_load_file_merges_into_the_registry(tmp_path, fake_tables):
+    path = tmp_path / "companies.csv"
+    path.write_text("0x0002,From file\n0x0005,Fifth\n", encoding="utf-8")
+    tables = ManufacturerRegistry(table_modules=fake_tables)
+    assert tables.load_file(str(path)) == 2
+    assert tables.get(0x0002) == "From file" and tables.get(0x0005) == "Fifth"
+    assert tables.get(0x0001) == "First"
@@ -0,0 +1,71 @@
+import urllib.request
+
+from metrics import SIZE_BUCKETS, Metrics
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics()
+    metrics.inc("events_total")
+    metrics.observe("sizes", 3)
+    with metrics.time("scan"):
+        pass
+
+    assert metrics.values == {} and metrics.histograms == {}
+    assert metrics.render() == "\n"
+
+
+def test_render_counters_gauges_and_histograms():
+    metrics = Metrics(enabled=True)
+    metrics.describe("events_total", "counter", "Events seen.")
+    metrics.describe("sizes", "histogram", "Batch sizes.", buckets=SIZE_BUCKETS)
+    metrics.inc("events_total", 2)
+    metrics.inc("events_total")
+    metrics.set("depth", 7, labels=(("queue", "upload"),))
+    metrics.observe("sizes", 3)
+    metrics.observe("sizes", 30000)
+    with metrics.time("scan"):
+        pass
+
+    lines = metrics.render().splitlines()
+    assert "# HELP ble_events_total Events seen." in lines
+    assert "# TYPE ble_events_total counter" in lines
+    assert "ble_events_total 3" in lines
+    assert 'ble_depth{queue="upload"} 7' in lines
+    assert 'ble_sizes_bucket{le="1"} 0' in lines
+    assert 'ble_sizes_bucket{le="5"} 1' in lines
+    assert 'ble_sizes_bucket{le="+Inf"} 2' in lines
+    assert "ble_sizes_sum 30003.0" in lines
+    assert 'ble_stage_seconds_count{stage="scan"} 1' in lines
+
+
+def test_collect_and_merge_move_counters_between_instances():
+    worker = Metrics(enabled=True)
+    worker.describe("depth", "gauge", "Queue depth.")
+    worker.inc("events_total", 4)
+    worker.set("depth", 9)
+    worker.observe("latency", 0.002)
+    parent = Metrics(enabled=True)
+    parent.inc("events_total", 1)
+
+    parent.merge(worker.collect())
+    parent.merge(worker.collect())
+
+    assert parent.values == {("events_total", ()): 5}
+    assert parent.histograms[("latency", ())].count == 1
+    assert worker.values == {} and worker.histograms == {}
+
+
+def test_write_file_and_serve(tmp_path):
+    metrics = Metrics(enabled=True)
+    metrics.inc("events_total")
+    path = tmp_path / "ble.prom"
+    metrics.write_file(str(path))
+    assert path.read_text() == metrics.render()
+
+    server = metrics.serve(0)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics", timeout=5) as response:
+            assert response.read().decode() == metrics.render()
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,76 @@
+import struct
+
+from payloads import EDDYSTONE_UUID, DecoderRegistry, beacon_info, decode_eddystone, decoders
+
+PROXIMITY_UUID = bytes(range(16))
+
+
+def ibeacon(major=1, minor=2, power=-59):
+    return b"\x02\x15" + PROXIMITY_UUID + struct.pack(">HHb", major, minor, power)
+
+
+def test_ibeacon():
+    assert decoders.decode(0x004C, ibeacon()) == {
+        "type": "ibeacon", "proximity_uuid": PROXIMITY_UUID.hex(), "major": 1, "minor": 2, "tx_power": -59}
+
+
+def test_find_my_airtag_separated():
+    result = decoders.decode(0x004C, b"\x12\x19" + bytes([0x10]) + bytes(24))
+    assert result == {"type": "find_my", "device": "airtag", "battery": "full", "separated": True}
+    assert beacon_info([result]) == ("airtag", None)
+
+
+def test_other_apple_messages_are_listed():
+    assert decoders.decode(0x004C, b"\x10\x02\x01\x02\x0c\x01\x00") == {
+        "type": "apple", "messages": ["nearby_info", "handoff"]}
+
+
+def test_eddystone_frames():
+    uid = decode_eddystone(b"\x00" + struct.pack(">b", -20) + bytes(range(10)) + bytes(range(6)))
+    assert uid == {"type": "eddystone_uid", "namespace": bytes(range(10)).hex(), "instance": bytes(range(6)).hex(),
+                   "tx_power": -61}
+    url = decoders.decode(EDDYSTONE_UUID, b"\x10" + struct.pack(">b", -21) + b"\x03example\x07")
+    assert url == {"type": "eddystone_url", "url": "https://example.com", "tx_power": -62}
+    tlm = decode_eddystone(b"\x20\x00" + struct.pack(">HhII", 3000, 0x1880, 42, 600))
+    assert tlm == {"type": "eddystone_tlm", "version": 0, "battery_mv": 3000, "temperature": 24.5,
+                   "advertisements": 42, "uptime": 60.0}
+
+
+def test_teltonika_eye():
+    result = decoders.decode(0x089A, bytes([0x01, 0x83]) + struct.pack(">h", 2350) + bytes([45, 100]))
+    assert result == {"type": "teltonika_eye", "version": 1, "low_battery": False, "temperature": 23.5,
+                      "humidity": 45, "battery_mv": 3000}
+
+
+def test_decode_all_and_beacon_info():
+    results = decoders.decode_all({0x004C: ibeacon(power=-65), 0x0006: b"\x01"},
+                                  {EDDYSTONE_UUID: b"\x10\x00\x03example\x07"})
+    assert [result["type"] for result in results] == ["ibeacon", "eddystone_url"]
+    assert beacon_info(results) == ("ibeacon", -65)
+    assert beacon_info([]) == (None, None)
+
+
+def test_malformed_payloads_are_cached_misses():
+    registry = DecoderRegistry()
+    registry.register(EDDYSTONE_UUID, decode_eddystone)
+    truncated = b"\x00\x10\x01"
+
+    assert registry.decode(EDDYSTONE_UUID, truncated) is None
+    assert registry.decode(EDDYSTONE_UUID, memoryview(truncated)) is None
+    assert registry.stats() == {"hits": 1, "misses": 1, "size": 1}
+    assert registry.decode("unknown", truncated) is None
+    assert registry.decode(EDDYSTONE_UUID, b"") is None
+    assert registry.stats()["size"] == 1
+
+
+def test_cache_is_bounded_lru():
+    calls = []
+    registry = DecoderRegistry(cache_size=2)
+    registry.register(1, lambda payload: calls.append(bytes(payload)) or {"type": "x"})
+
+    for payload in (b"a", b"b", b"a", b"c", b"b"):
+        registry.decode(1, payload)
+
+    # "b" was least recently used when "c" arrived, so it is parsed again
+    assert calls == [b"a", b"b", b"c", b"b"]
+    assert list(registry.cache) == [(1, b"c"), (1, b"b")]
@@ -0,0 +1,74 @@
+import json
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pytest
+
+from positioning import PositioningEngine, serve_http
+
+GATEWAYS = {"g1": np.array([0.0, 0.0]), "g2": np.array([10.0, 0.0]), "g3": np.array([0.0, 10.0])}
+
+
+def payload(gateway, distance, report_type=None, removed=()):
+    document = {"device_uuid": gateway, "devices": [{"uuid": "tag", "distance": distance}] if distance else []}
+    if report_type:
+        document.update(report_type=report_type, removed=list(removed))
+    return document
+
+
+def test_stationary_device_survives_between_delta_snapshots():
+    engine = PositioningEngine(GATEWAYS, max_age=30, smoothing=False)
+    for gateway, distance in (("g1", 5.0), ("g2", 8.0), ("g3", 8.0)):
+        engine.ingest(payload(gateway, distance, "snapshot"), now=0)
+    assert engine.solve(now=0) == 1
+    # 200 s later nothing moved, so the gateways sent no device updates
+    assert engine.solve(now=200) == 1
+    # A removal from one gateway leaves too few gateways
+    engine.ingest(payload("g3", None, "delta", removed=["tag"]), now=210)
+    assert engine.solve(now=210) == 0
+
+
+def test_full_mode_observations_expire_after_max_age():
+    engine = PositioningEngine(GATEWAYS, max_age=30, smoothing=False)
+    for gateway, distance in (("g1", 5.0), ("g2", 8.0), ("g3", 8.0)):
+        engine.ingest(payload(gateway, distance), now=0)
+    assert engine.solve(now=31) == 0
+
+
+def test_full_mode_device_expires_while_gateways_keep_posting():
+    engine = PositioningEngine(GATEWAYS, max_age=30)
+    for gateway, distance in (("g1", 5.0), ("g2", 8.0), ("g3", 8.0)):
+        engine.ingest(payload(gateway, distance), now=0)
+    assert engine.solve(now=0) == 1
+    # The device left: the gateways keep posting without it
+    for now in range(10, 1001, 10):
+        for gateway in GATEWAYS:
+            engine.ingest(payload(gateway, None), now=now)
+    assert engine.solve(now=1000) == 0
+    assert engine.observations == {} and engine.positions == {} and engine.smoother.state == {}
+
+
+def test_ingest_accepts_arrays_and_rejects_other_json():
+    engine = PositioningEngine(GATEWAYS)
+    engine.ingest([payload("g1", 5.0), payload("g2", 8.0)])
+    assert set(engine.observations["tag"]) == {"g1", "g2"}
+    for document in (3, "x", [1, 2], None):
+        with pytest.raises(ValueError):
+            engine.ingest(document)
+
+
+def test_http_handler_returns_400_for_non_payloads():
+    server = serve_http(PositioningEngine(GATEWAYS), 0, host="127.0.0.1")
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    try:
+        for body, status in ((b"[]", 200), (json.dumps([payload("g1", 5.0)]).encode(), 200), (b"42", 400),
+                             (b"not json", 400)):
+            try:
+                with urllib.request.urlopen(urllib.request.Request(url, data=body)) as response:
+                    assert response.status == status
+            except urllib.error.HTTPError as e:
+                assert e.code == status
+    finally:
+        server.shutdown()
+        server.server_close()
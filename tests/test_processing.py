@@ -0,0 +1,113 @@
+import asyncio
+import time
+from collections import namedtuple
+
+import pytest
+
+from metrics import metrics
+from processing import ProcessingStage
+
+Item = namedtuple("Item", ["address"])
+
+
+def count_items(batch, label):
+    # Runs in the worker: records a counter and a stage timing there
+    metrics.inc("items_total", len(batch))
+    with metrics.time("count"):
+        return [(label, item.address) for item in batch]
+
+
+@pytest.fixture
+def enabled_metrics():
+    metrics.enabled = True
+    metrics.collect()
+    yield metrics
+    metrics.collect()
+    metrics.enabled = False
+
+
+def run_stage(mode, workers, batches):
+    async def run():
+        stage = ProcessingStage(count_items, mode, workers)
+        try:
+            results = []
+            for batch in batches:
+                results.extend(await stage.submit(batch, "x"))
+            results.extend(await stage.drain())
+            return results
+        finally:
+            stage.close()
+    return asyncio.run(run())
+
+
+def test_process_mode_merges_worker_metrics(enabled_metrics):
+    batches = [[Item(f"AA:{batch}:{index}") for index in range(5)] for batch in range(3)]
+    results = run_stage("process", 2, batches)
+
+    assert sorted(record for result in results for record in result) == sorted(
+        ("x", item.address) for batch in batches for item in batch)
+    assert metrics.values[("items_total", ())] == 15
+    assert metrics.histograms[("stage_seconds", (("stage", "count"),))].count >= 3
+    assert metrics.values[("processing_batches_total", ())] == 3
+
+
+def test_thread_mode_records_directly(enabled_metrics):
+    results = run_stage("thread", 1, [[Item("AA"), Item("BB")]])
+
+    assert results == [[("x", "AA"), ("x", "BB")]]
+    assert metrics.values[("items_total", ())] == 2
+    assert metrics.histograms[("stage_seconds", (("stage", "count"),))].count == 1
+
+
+def slow_first(batch, label):
+    if batch[0].address == "slow":
+        time.sleep(0.2)
+    return [(label, item.address) for item in batch]
+
+
+def test_on_result_publishes_as_soon_as_a_batch_finishes():
+    async def run():
+        delivered = []
+        stage = ProcessingStage(count_items, "thread", on_result=delivered.append)
+        try:
+            assert await stage.submit([Item("AA")], "x") == []
+            # No further submit: the done callback hands the result over
+            for _ in range(100):
+                if delivered:
+                    break
+                await asyncio.sleep(0.01)
+            return delivered, stage.pending
+        finally:
+            stage.close()
+
+    delivered, pending = asyncio.run(run())
+    assert delivered == [[("x", "AA")]]
+    assert not pending
+
+
+def test_on_result_keeps_submission_order():
+    async def run():
+        delivered = []
+        stage = ProcessingStage(slow_first, "process", workers=2, on_result=delivered.append)
+        try:
+            await stage.submit([Item("slow")], "x")
+            await stage.submit([Item("fast")], "x")
+            assert await stage.drain() == []
+            return delivered
+        finally:
+            stage.close()
+
+    assert asyncio.run(run()) == [[("x", "slow")], [("x", "fast")]]
+
+
+def test_poll_collects_finished_batches_without_waiting():
+    async def run():
+        stage = ProcessingStage(count_items, "thread")
+        try:
+            await stage.submit([Item("AA")], "x")
+            await asyncio.wait([stage.pending[0]])
+            return stage.poll(), stage.poll()
+        finally:
+            stage.close()
+
+    assert asyncio.run(run()) == ([[("x", "AA")]], [])
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from device_tracker import DeviceTracker
+from proximity import ProximityEngine, QueuedSink
+from scanner import Advertisement
+
+
+class ListSink:
+    def __init__(self):
+        self.events = []
+
+    def emit(self, event):
+        self.events.append(event)
+
+
+def advertisement(timestamp, rssi, address="AA:BB:CC:DD:EE:01"):
+    return Advertisement(timestamp=timestamp, address=address, name=None, rssi=rssi, manufacturer_data={},
+                         service_uuids=[], tx_power=None)
+
+
+def test_smoothing_matches_device_tracker():
+    engine = ProximityEngine()
+    tracker = DeviceTracker()
+    for index, rssi in enumerate((-70, -50, -65, -55, -60)):
+        engine.observe(advertisement(100.0 + index, rssi))
+        expected = tracker.update("AA:BB:CC:DD:EE:01", rssi, now=0.0)
+
+    state = engine.devices["AA:BB:CC:DD:EE:01"]
+    assert state.filter.posteri_estimate == expected
+
+
+def test_enter_dwell_and_timeout_leave():
+    sink = ListSink()
+    engine = ProximityEngine([sink], dwell_seconds=5.0, leave_timeout=3.0)
+
+    engine.observe(advertisement(100.0, -55))  # ~0.6 m from the default -59 dBm
+    engine.observe(advertisement(106.0, -55))
+    engine.sweep(now=110.0)
+
+    assert [event.kind for event in sink.events] == ["enter", "dwell", "leave"]
+    assert sink.events[-1].dwell == 10.0
+
+
+def test_queued_sink_counts_dropped_events(capsys):
+    delivered = []
+
+    class Recorder(QueuedSink):
+        async def deliver(self, events):
+            delivered.extend(events)
+
+    sink = Recorder(max_pending=2)
+    for index in range(5):
+        sink.emit(index)
+    assert sink.dropped == 3
+
+    async def deliver_once():
+        task = asyncio.create_task(sink.run())
+        await asyncio.sleep(0)
+        task.cancel()
+
+    asyncio.run(deliver_once())
+    assert delivered == [3, 4]
+    assert "Dropped 3 proximity event(s) in Recorder" in capsys.readouterr().out
+
+
+def test_queued_sink_requires_deliver():
+    with pytest.raises(TypeError):
+        QueuedSink()
+
+
+def test_queued_sink_survives_any_delivery_error(capsys):
+    delivered = []
+
+    class Flaky(QueuedSink):
+        async def deliver(self, events):
+            if not delivered and events == ["bad"]:
+                delivered.append(None)
+                raise ValueError("cannot encode event")
+            delivered.extend(events)
+
+    sink = Flaky()
+
+    async def deliver_twice():
+        task = asyncio.create_task(sink.run())
+        sink.emit("bad")
+        await asyncio.sleep(0)
+        sink.emit("good")
+        await asyncio.sleep(0)
+        task.cancel()
+
+    asyncio.run(deliver_twice())
+    assert sink.failures == 1
+    assert delivered == [None, "good"]
+    assert "Error delivering 1 proximity event(s) via Flaky: cannot encode event" in capsys.readouterr().out
@@ -0,0 +1,112 @@
+import os
+
+import pytest
+
+from ring import RingReader, RingWriter
+from scanner import Advertisement
+
+EDDYSTONE = "0000feaa-0000-1000-8000-00805f9b34fb"
+CUSTOM = "12345678-1234-5678-1234-567812345678"
+
+
+def advertisement(index, **fields):
+    values = dict(timestamp=1000.0 + index, address=f"AA:BB:CC:DD:EE:{index % 256:02X}", name=f"dev{index}",
+                  rssi=-40 - index % 50, manufacturer_data={}, service_uuids=[], tx_power=None)
+    values.update(fields)
+    return Advertisement(**values)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "test.ring")
+
+
+def test_round_trip(path):
+    writer = RingWriter(path, capacity=8)
+    reader = RingReader(path)
+    sent = advertisement(1, manufacturer_data={0x004C: b"\x12\x02\x00\x01"}, service_data={EDDYSTONE: b"\x10\x00"},
+                         service_uuids=[EDDYSTONE, CUSTOM], tx_power=-12, adapter="hci1")
+    writer.write(sent)
+    writer.write(advertisement(2, rssi=None, name=None))
+
+    first, second = reader.read()
+    assert first == sent._replace(adapter_rssi=None)
+    assert second.rssi is None and second.name is None
+    assert reader.read() == []
+    reader.close()
+    writer.close()
+
+
+def test_oversized_payload_is_flagged_truncated(path):
+    writer = RingWriter(path, capacity=4)
+    reader = RingReader(path)
+    writer.write(advertisement(1, manufacturer_data={1: bytes(100), 2: bytes(100)}))
+
+    (received,) = reader.read()
+    assert writer.truncated == 1
+    assert list(received.manufacturer_data) == [1]
+    reader.close()
+    writer.close()
+
+
+def test_slow_reader_skips_overwritten_records(path):
+    writer = RingWriter(path, capacity=4)
+    reader = RingReader(path)
+    for index in range(10):
+        writer.write(advertisement(index))
+
+    received = reader.read()
+    assert [item.name for item in received] == ["dev6", "dev7", "dev8", "dev9"]
+    assert reader.lost == 6
+    assert reader.overruns == 1
+    reader.close()
+    writer.close()
+
+
+def test_reader_follows_restart_in_place(path):
+    writer = RingWriter(path, capacity=8)
+    reader = RingReader(path)
+    for index in range(5):
+        writer.write(advertisement(index))
+    assert len(reader.read()) == 5
+    writer.close()
+
+    writer = RingWriter(path, capacity=8)
+    assert writer.generation == 2
+    writer.write(advertisement(42))
+
+    assert [item.name for item in reader.read()] == ["dev42"]
+    assert reader.restarts == 1
+    reader.close()
+    writer.close()
+
+
+def test_capacity_change_replaces_file_for_mapped_readers(path):
+    writer = RingWriter(path, capacity=8)
+    reader = RingReader(path)
+    writer.write(advertisement(1))
+    assert len(reader.read()) == 1
+    old_inode = os.stat(path).st_ino
+    writer.close()
+
+    # A smaller ring must not shrink the file the reader still maps
+    writer = RingWriter(path, capacity=2)
+    assert os.stat(path).st_ino != old_inode
+    # The old mapping is still backed end to end (a shrunk file would SIGBUS here)
+    assert reader._map[len(reader._map) - 1] == 0
+    writer.write(advertisement(2))
+    writer.write(advertisement(3))
+
+    assert [item.name for item in reader.read()] == ["dev2", "dev3"]
+    assert reader.capacity == 2
+    assert reader.restarts == 1
+    assert [name for name in os.listdir(os.path.dirname(path))] == ["test.ring"]
+    reader.close()
+    writer.close()
+
+
+def test_rejects_other_files(path):
+    with open(path, "wb") as f:
+        f.write(b"not a ring" * 10)
+    with pytest.raises(ValueError):
+        RingReader(path)
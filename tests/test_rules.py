@@ -0,0 +1,61 @@
+import json
+import random
+
+import pytest
+
+from rules import RuleEngine, RuleSet
+
+SPECS = [
+    {"category": "tracker", "manufacturer_id": "0x004C", "prefix": "Tag"},
+    {"category": "heart", "service_uuid": "180d"},
+    {"category": "bose", "manufacturer": "Bose Corporation"},
+    {"category": "hrm", "prefix": ["HRM", "HR-"]},
+    {"category": "envy", "substring": "ENVY"},
+    {"category": "mixed", "prefix": "Mi", "regex": "Band\\d"},
+    {"category": "near", "min_rssi": -50},
+    {"category": "tracker2", "manufacturer_id": [76, 0x0075]},
+]
+HEART = "0000180d-0000-1000-8000-00805f9b34fb"
+
+
+def linear_candidates(rule_set, *args):
+    return tuple(index for index, rule in enumerate(rule_set.rules) if rule.matches_static(*args))
+
+
+@pytest.mark.parametrize("device", [
+    ("Tag 1", None, frozenset({0x004C}), frozenset()),
+    ("Tag 1", None, frozenset({0x0006}), frozenset()),
+    (None, None, frozenset({0x0075}), frozenset({HEART})),
+    ("HR-7", "Bose Corporation", frozenset(), frozenset()),
+    ("HRM", None, frozenset(), frozenset()),
+    ("My ENVY", None, frozenset(), frozenset()),
+    ("Mi Band", None, frozenset(), frozenset()),
+    ("Band7", None, frozenset(), frozenset()),
+    ("", None, frozenset(), frozenset()),
+])
+def test_index_matches_linear_scan(device):
+    rule_set = RuleSet(SPECS)
+    assert rule_set.candidates(*device) == linear_candidates(rule_set, *device)
+
+
+def test_index_matches_linear_scan_on_random_devices():
+    rule_set = RuleSet(SPECS)
+    rng = random.Random(1)
+    names = [None, "Tag", "Tag 9", "HRM-1", "HR-2", "H", "ENVY x", "Mi Band3", "Band1", "Mi", "other"]
+    for _ in range(500):
+        device = (rng.choice(names), rng.choice([None, "Bose Corporation", "Apple, Inc."]),
+                  frozenset(rng.sample([0x004C, 0x0075, 0x0006], rng.randrange(3))),
+                  frozenset(rng.sample([HEART, "0000feaa-0000-1000-8000-00805f9b34fb"], rng.randrange(2))))
+        assert rule_set.candidates(*device) == linear_candidates(rule_set, *device)
+
+
+def test_engine_first_match_wins(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"categories": SPECS, "skip": [{"manufacturer": "Apple, Inc."}]}))
+    engine = RuleEngine(str(path))
+
+    assert engine.evaluate(name="Tag 3", manufacturer_ids=[0x004C], rssi=-40) == (False, "tracker")
+    assert engine.evaluate(name="x", manufacturer_ids=[0x004C], rssi=-70) == (False, "tracker2")
+    assert engine.evaluate(name="x", rssi=-40) == (False, "near")
+    assert engine.evaluate(name="x", rssi=-70) == (False, "Unknown Device")
+    assert engine.evaluate(name="HRM", manufacturer_name="Apple, Inc.") == (True, None)
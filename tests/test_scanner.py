@@ -0,0 +1,56 @@
+import asyncio
+
+from capture import ReplayScanner
+from scanner import Advertisement, MultiAdapterScanner
+
+
+def advertisement(timestamp, rssi, address="AA:BB:CC:DD:EE:01", adapter=None):
+    return Advertisement(timestamp=timestamp, address=address, name=None, rssi=rssi, manufacturer_data={},
+                         service_uuids=[], tx_power=None, adapter=adapter)
+
+
+def collect(scanner):
+    async def run():
+        batches = []
+        async with scanner:
+            async for batch in scanner.batches():
+                batches.append(batch)
+        return [item for batch in batches for item in batch]
+    return asyncio.run(run())
+
+
+def test_two_adapters_merge_copies_but_keep_repeats():
+    # One device advertising every 0.3 s, heard by both controllers
+    streams = {
+        "hci0": [advertisement(1000.0 + 0.3 * index, -60) for index in range(5)],
+        "hci1": [advertisement(1000.005 + 0.3 * index, -70 + index) for index in range(5)],
+    }
+    scanner = MultiAdapterScanner(
+        ["hci0", "hci1"], flush_interval=0.05, dedup_window=1.0,
+        scanner_factory=lambda adapter: ReplayScanner(streams[adapter], speed=10.0, adapter=adapter))
+
+    merged = collect(scanner)
+
+    assert len(merged) == 5
+    assert scanner.duplicates == 5
+
+
+def test_merge_keeps_strongest_copy_and_same_adapter_repeats():
+    scanner = MultiAdapterScanner(["hci0", "hci1"], scanner_factory=lambda adapter: ReplayScanner([]))
+    batch = [
+        advertisement(10.0, -70, adapter="hci0"),
+        advertisement(10.01, -55, adapter="hci1"),
+        advertisement(10.2, -72, adapter="hci0"),
+        advertisement(10.3, -50, address="11:22:33:44:55:66", adapter="hci1"),
+    ]
+
+    merged = scanner._merge(batch)
+
+    assert [(item.address, item.rssi) for item in merged] == [
+        ("AA:BB:CC:DD:EE:01", -55), ("AA:BB:CC:DD:EE:01", -72), ("11:22:33:44:55:66", -50)]
+    assert merged[0].adapter_rssi == {"hci0": -70, "hci1": -55}
+    assert scanner.duplicates == 1
+
+    # A late copy of the last transmission from the other controller is dropped
+    assert scanner._merge([advertisement(10.25, -60, adapter="hci1")]) == []
+    assert merged[1].adapter_rssi == {"hci0": -72}
@@ -0,0 +1,91 @@
+import time
+from collections import namedtuple
+from types import SimpleNamespace
+
+import pytest
+
+from scheduler import AdaptiveScheduler
+from scanner import Advertisement
+
+Record = namedtuple("Record", ["uuid", "rssi_mean"])
+
+
+def advertisement(address):
+    return Advertisement(timestamp=0.0, address=address, name=None, rssi=-60,
+                         manufacturer_data={}, service_uuids=[], tx_power=None)
+
+
+@pytest.fixture
+def scheduler():
+    return AdaptiveScheduler(min_flush=1.0, max_flush=30.0, min_duty=0.75, duty_step=0.05,
+                             new_device_rate=0.2, rssi_variance=16.0, backlog=10, known_ttl=120.0)
+
+
+@pytest.fixture
+def start(scheduler):
+    # Decisions are driven by an injected clock starting after construction
+    return time.monotonic()
+
+
+def test_quiet_grows_the_interval_and_steps_the_duty_cycle_down(scheduler, start):
+    decisions = [scheduler.decide(now=start + step) for step in range(1, 8)]
+    assert [interval for interval, _ in decisions] == [2.0, 4.0, 8.0, 16.0, 30.0, 30.0, 30.0]
+    assert [duty for _, duty in decisions] == pytest.approx([0.95, 0.9, 0.85, 0.8, 0.75, 0.75, 0.75])
+
+
+def test_new_devices_drop_to_the_shortest_interval_at_full_duty(scheduler, start):
+    for step in range(1, 4):
+        scheduler.decide(now=start + step)
+    assert scheduler.flush_interval == 8.0 and scheduler.duty_cycle < 1.0
+
+    scheduler.observe_batch([advertisement(f"AA:{index}") for index in range(5)], now=start + 4)
+    assert scheduler.decide(now=start + 4) == (1.0, 1.0)
+    assert scheduler.new_device_rate == pytest.approx(5.0)
+
+
+def test_rssi_variance_counts_as_busy(scheduler, start):
+    scheduler.decide(now=start + 1)
+    scheduler.observe_records([Record("a", -70.0), Record("b", -60.0)])
+    assert scheduler.rssi_variance == 0.0
+    scheduler.observe_records([Record("a", -75.0), Record("b", -55.0), Record("c", None)])
+    assert scheduler.rssi_variance == 25.0
+    assert scheduler.decide(now=start + 2) == (1.0, 1.0)
+
+
+def test_backlog_stretches_the_interval(scheduler, start):
+    assert scheduler.decide(queue_depth=11, now=start + 1)[0] == 4.0
+    assert scheduler.decide(queue_depth=10, now=start + 2)[0] == 8.0
+    # Even when busy, a backlog doubles the shortest interval
+    scheduler.observe_batch([advertisement("AA")], now=start + 3)
+    assert scheduler.decide(queue_depth=50, now=start + 3) == (2.0, 1.0)
+
+
+def test_known_addresses_expire_and_count_as_new_again(scheduler, start):
+    scheduler.observe_batch([advertisement("AA"), advertisement("BB")], now=start)
+    scheduler.observe_batch([advertisement("BB")], now=start + 100)
+    assert not scheduler.is_new(advertisement("AA"))
+
+    scheduler.observe_batch([advertisement("CC")], now=start + 200)
+    assert set(scheduler.known) == {"BB", "CC"}
+    assert scheduler.is_new(advertisement("AA"))
+    scheduler.decide(now=start + 201)
+    scheduler.observe_batch([advertisement("AA"), advertisement("BB")], now=start + 202)
+    scheduler.decide(now=start + 203)
+    assert scheduler.new_device_rate == pytest.approx(0.5)
+
+
+def test_departed_devices_are_forgotten_by_observe_records(scheduler, start):
+    scheduler.observe_batch([advertisement("AA")], now=start)
+    scheduler.observe_records([Record(str(index), -60.0) for index in range(4)])
+    assert len(scheduler.last_rssi) == 4
+    scheduler.observe_records([Record(str(index), -60.0) for index in range(4, 9)])
+    assert scheduler.last_rssi == {}
+
+
+def test_attach_installs_the_urgent_hook(scheduler, start):
+    scanner = SimpleNamespace(urgent=None, flush_interval=5.0)
+    scheduler.attach(scanner)
+    assert scanner.flush_interval == 1.0
+    assert scanner.urgent(advertisement("AA"))
+    scheduler.observe_batch([advertisement("AA")], now=start)
+    assert not scanner.urgent(advertisement("AA"))
@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+import serialization
+from serialization import DEVICE_FIELDS, DeviceRecord, encode_payload
+
+
+def record(**fields):
+    values = dict.fromkeys(DEVICE_FIELDS)
+    values.update(address="AA:BB", uuid="u1", timestamp="2026-01-01T00:00:00", count=1)
+    values.update(fields)
+    return DeviceRecord(**values)
+
+
+@pytest.fixture(params=["stdlib", "orjson"])
+def encoder(request, monkeypatch):
+    if request.param == "stdlib":
+        monkeypatch.setattr(serialization, "_orjson", False)
+    else:
+        pytest.importorskip("orjson")
+    return request.param
+
+
+@pytest.mark.parametrize("layout", ["rows", "columns"])
+def test_non_finite_floats_encode_as_null(encoder, layout):
+    payload = {"timestamp": "t", "devices": [record(distance=float("nan"), rssi_mean=float("inf"), rssi=-60)]}
+
+    decoded = json.loads(encode_payload(payload, layout), parse_constant=pytest.fail)
+
+    devices = decoded["devices"]
+    if layout == "columns":
+        assert decoded["layout"] == "columns"
+        assert devices["distance"] == [None] and devices["rssi_mean"] == [None] and devices["rssi"] == [-60]
+        assert "timestamp" not in devices
+    else:
+        assert devices[0]["distance"] is None and devices[0]["rssi_mean"] is None and devices[0]["rssi"] == -60
+
+
+def test_rows_layout_keeps_the_original_wire_format(encoder):
+    payload = {"timestamp": "t", "hostname": "h", "devices": [record(name="Tag", rssi=-60, distance=1.5)]}
+
+    decoded = json.loads(encode_payload(payload))
+
+    assert list(decoded) == ["timestamp", "hostname", "devices"]
+    assert decoded["devices"] == [record(name="Tag", rssi=-60, distance=1.5).to_dict()]
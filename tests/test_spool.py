@@ -0,0 +1,64 @@
+import pytest
+
+from spool import Spool
+
+
+@pytest.fixture
+def spool(tmp_path):
+    spool = Spool(str(tmp_path / "spool.db"), max_bytes=1000, max_age=60, check_every=1)
+    yield spool
+    spool.close()
+
+
+def test_peek_ack_keeps_count_and_bytes(spool):
+    for index in range(5):
+        spool.append(b"x" * 10, now=100.0 + index)
+    assert len(spool) == 5 and spool.bytes == 50
+    entries = spool.peek(2)
+    spool.ack(entries)
+    assert len(spool) == 3 and spool.bytes == 30
+    assert [entry[0] for entry in spool.peek(10)] == [3, 4, 5]
+
+
+def test_size_cap_evicts_oldest_but_not_in_flight(spool):
+    for index in range(5):
+        spool.append(b"x" * 150, now=100.0 + index)
+    in_flight = spool.peek(2)
+    # 1050 bytes > 1000: the oldest batch that is not in flight goes
+    spool.append(b"x" * 300, now=106.0)
+    assert [row_id for row_id, _ in spool.iter_batches()] == [1, 2, 4, 5, 6]
+    assert spool.bytes == 900 and len(spool) == 5
+    # Acknowledging rows that survived eviction subtracts them exactly once
+    spool.ack(in_flight)
+    assert spool.bytes == 600 and len(spool) == 3
+
+
+def test_age_cap_and_ack_of_evicted_rows_never_go_negative(spool):
+    spool.append(b"a" * 10, now=0.0)
+    spool.append(b"b" * 10, now=0.0)
+    entries = spool.peek(1)
+    spool.peek(0)  # a later peek releases the earlier batch
+    assert spool.enforce_limits(now=1000.0) == 2
+    spool.ack(entries)
+    assert spool.bytes == 0 and len(spool) == 0
+
+
+def test_totals_are_restored_on_reopen(tmp_path):
+    path = str(tmp_path / "spool.db")
+    spool = Spool(path)
+    spool.append(b"x" * 7)
+    spool.append(b"y" * 5)
+    spool.close()
+    spool = Spool(path)
+    assert len(spool) == 2 and spool.bytes == 12
+    spool.close()
+
+
+def test_age_cap_evicts_a_stuck_in_flight_head(spool):
+    spool.append(b"h" * 10, now=0.0)
+    for index in range(11):
+        # The uploader keeps re-peeking the head while new batches arrive
+        spool.peek(1)
+        spool.append(b"n" * 10, now=1000.0 + index)
+    assert [row_id for row_id, _ in spool.iter_batches()] == list(range(2, 13))
+    assert spool.evicted == 1 and len(spool) == 11 and spool.bytes == 110
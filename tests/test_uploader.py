@@ -0,0 +1,98 @@
+import asyncio
+import gzip
+import json
+import threading
+
+import pytest
+
+from spool import Spool
+from stub_server import make_server
+from uploader import Uploader
+
+
+@pytest.fixture
+def stub():
+    server = make_server(port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def endpoint(server):
+    return f"http://127.0.0.1:{server.server_address[1]}/api/devices"
+
+
+def upload(uploader, payloads):
+    async def run():
+        for payload in payloads:
+            uploader.submit(payload)
+        return await uploader.flush()
+
+    try:
+        return asyncio.run(run())
+    finally:
+        uploader.close()
+
+
+def payloads(count):
+    return [{"timestamp": str(index), "devices": []} for index in range(count)]
+
+
+def test_default_sends_one_plain_object_per_request(stub):
+    assert upload(Uploader(endpoint(stub)), payloads(3))
+    assert [document["timestamp"] for _, document in stub.received] == ["0", "1", "2"]
+    for headers, document in stub.received:
+        assert isinstance(document, dict)
+        assert "Content-Encoding" not in headers
+
+
+def test_coalescing_and_gzip_are_opt_in(stub):
+    uploader = Uploader(endpoint(stub), max_coalesce=10, compress=True)
+    assert upload(uploader, payloads(3))
+    assert len(stub.received) == 1
+    headers, document = stub.received[0]
+    assert headers["Content-Encoding"] == "gzip"
+    assert [payload["timestamp"] for payload in document] == ["0", "1", "2"]
+    # The body on the wire really is gzip
+    body, _ = uploader.encode([json.dumps(payloads(1)[0]).encode()])
+    assert json.loads(gzip.decompress(body)) == payloads(1)[0]
+
+
+def test_retries_until_the_server_accepts(stub):
+    stub.fail_next = 2
+    uploader = Uploader(endpoint(stub), max_retries=3, backoff_base=0.01)
+    assert upload(uploader, payloads(1))
+    assert uploader.sent_requests == 1
+    assert len(stub.received) == 1 and stub.fail_next == 0
+
+
+def test_gives_up_after_max_retries(stub):
+    stub.fail_next = 10
+    uploader = Uploader(endpoint(stub), max_retries=1, backoff_base=0.01)
+    assert not upload(uploader, payloads(1))
+    assert uploader.failed == 1
+    assert stub.received == []
+
+
+def test_client_errors_drop_the_batch_instead_of_retrying(stub, tmp_path):
+    stub.fail_next = 1
+    stub.fail_status = 400
+    spool = Spool(str(tmp_path / "spool.db"))
+    uploader = Uploader(endpoint(stub), max_retries=3, backoff_base=0.01, spool=spool)
+    assert upload(uploader, payloads(2))
+    # The rejected head is gone, the next batch went out on the first try
+    assert uploader.rejected == 1 and uploader.sent_requests == 1
+    assert [document["timestamp"] for _, document in stub.received] == ["1"]
+    assert len(spool) == 0
+    spool.close()
+
+
+@pytest.mark.parametrize("status", [408, 429])
+def test_timeouts_and_rate_limits_are_retried(stub, status):
+    stub.fail_next = 1
+    stub.fail_status = status
+    uploader = Uploader(endpoint(stub), max_retries=3, backoff_base=0.01)
+    assert upload(uploader, payloads(1))
+    assert uploader.rejected == 0 and len(stub.received) == 1
@@ -0,0 +1,179 @@
+import asyncio
+import gzip
+import random
+from collections import deque
+
+from metrics import metrics
+from serialization import encode_payload
+
+# Client errors that are worth retrying: the request timed out or was rate limited
+RETRYABLE_CLIENT_ERRORS = (408, 429)
+
+
+class Uploader:
+    """
+    Asynchronous, batching HTTP uploader.
+
+    Payloads are handed over with submit(), which never blocks: they go into
+    a bounded outbound queue, and when the queue is full the oldest payload is
+    dropped. The run() task drains the queue and POSTs over a keep-alive
+    connection pool in a worker thread, retrying with exponential backoff.
+    A batch the server rejects with a 4xx (other than 408 and 429) is dropped
+    and counted in `rejected`, since resending it cannot succeed.
+
+    By default every payload is sent on its own as a plain JSON object, the
+    original wire format. Receivers that understand it can opt in to
+    coalescing up to `max_coalesce` scan cycles into one request (sent as a
+    JSON array) and to gzip-compressed bodies (`compress`).
+
+    With a `spool` (see spool.Spool) every payload is persisted before upload
+    and only removed once the server accepted it; while the link is down
+    batches stay on disk and are replayed oldest-first when it returns.
+    """
+
+    def __init__(self, endpoint, max_queue_size=100, max_coalesce=1, compress=False,
+                 compress_level=6, max_retries=5, backoff_base=1.0, backoff_max=60.0,
+                 timeout=10.0, pool_size=2, spool=None, layout="rows"):
+        self.endpoint = endpoint
+        self.layout = layout
+        self.spool = spool
+        self.max_coalesce = max_coalesce
+        self.compress = compress
+        self.compress_level = compress_level
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.queue = deque(maxlen=max_queue_size)
+        self.dropped = 0
+        self.failed = 0
+        self.rejected = 0
+        self.sent_requests = 0
+        self.sent_bytes = 0
+        self._wakeup = asyncio.Event()
+
+        # Imported here so commands that never upload do not pay for requests
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self._request_errors = requests.RequestException
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def submit(self, payload):
+        """
+        Queue a payload for upload without waiting for the network.
+        """
+        with metrics.time("serialize"):
+            serialized = encode_payload(payload, self.layout)
+        if self.spool is not None:
+            self.spool.append(serialized)
+        else:
+            if len(self.queue) == self.queue.maxlen:
+                self.dropped += 1  # deque(maxlen) discards the oldest entry
+            self.queue.append(serialized)
+        self._wakeup.set()
+
+    def encode(self, payloads):
+        """
+        Join (and optionally compress) a list of serialized payloads into a
+        request body. Returns (body, headers).
+        """
+        body = payloads[0] if len(payloads) == 1 else b"[" + b",".join(payloads) + b"]"
+        headers = {"Content-Type": "application/json"}
+        if self.compress:
+            body = gzip.compress(body, compresslevel=self.compress_level)
+            headers["Content-Encoding"] = "gzip"
+        return body, headers
+
+    def _post(self, body, headers):
+        response = self.session.post(self.endpoint, data=body, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        return response.status_code
+
+    def _backoff(self, attempt):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def send(self, payloads, keep_on_failure=False):
+        """
+        Upload one coalesced request, retrying with exponential backoff.
+        Returns True once the payloads are done with: accepted, or rejected
+        by the server and dropped.
+        """
+        body, headers = self.encode(payloads)
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            try:
+                with metrics.time("upload"):
+                    status = await loop.run_in_executor(None, self._post, body, headers)
+                self.sent_requests += 1
+                self.sent_bytes += len(body)
+                metrics.inc("upload_bytes_total", len(body))
+                metrics.inc("upload_requests_total", labels=(("result", "ok"),))
+                print(f"Posted {len(payloads)} payload(s) to webhook, response status: {status}")
+                return True
+            except self._request_errors as e:
+                status = getattr(e.response, "status_code", None)
+                if status is not None and 400 <= status < 500 and status not in RETRYABLE_CLIENT_ERRORS:
+                    metrics.inc("upload_requests_total", labels=(("result", "rejected"),))
+                    self.rejected += len(payloads)
+                    print(f"Webhook rejected {len(payloads)} payload(s), dropping them: {e}")
+                    return True
+                metrics.inc("upload_requests_total", labels=(("result", "error"),))
+                if attempt == self.max_retries:
+                    print(f"Error posting to webhook, giving up: {e}")
+                    break
+                delay = self._backoff(attempt)
+                print(f"Error posting to webhook, retrying in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+        if not keep_on_failure:
+            self.failed += len(payloads)
+        return False
+
+    def pending(self):
+        """
+        Number of payloads waiting to be uploaded.
+        """
+        return len(self.spool) if self.spool is not None else len(self.queue)
+
+    async def _send_next(self):
+        if self.spool is not None:
+            entries = self.spool.peek(self.max_coalesce)
+            if not entries:
+                return True
+            ok = await self.send([entry[1] for entry in entries], keep_on_failure=True)
+            if ok:
+                self.spool.ack(entries)
+            return ok
+
+        payloads = []
+        while self.queue and len(payloads) < self.max_coalesce:
+            payloads.append(self.queue.popleft())
+        return await self.send(payloads)
+
+    async def run(self):
+        """
+        Upload queued payloads forever.
+        """
+        while True:
+            if not self.pending():
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            if not await self._send_next() and self.spool is not None:
+                # Link is down; leave the batches spooled and try again later
+                await asyncio.sleep(self.backoff_max)
+
+    async def flush(self):
+        """
+        Upload everything still queued. Returns False if an upload failed.
+        """
+        while self.pending():
+            if not await self._send_next():
+                return False
+        return True
+
+    def close(self):
+        self.session.close()